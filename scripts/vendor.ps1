@@ -1,2 +1,2 @@
 New-Item -ItemType Directory -Path "src/web/dist" -Force
-Copy-Item -Path "viewer/dist/appendix-viewer.js" -Destination "src/web/dist/_appendix-viewer.js"
+Copy-Item -Path "viewer/dist/_appendix-*.js" -Destination "src/web/dist/"
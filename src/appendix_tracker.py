@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from bs4 import BeautifulSoup
+
+if TYPE_CHECKING:
+    from anki.notes import Note
+
+APPENDIX_TEXT_RE = re.compile(r"🔗Appendix (\d+)")
+
+
+def appendix_numbers_in_field(html: str) -> frozenset[int]:
+    """Return the appendix numbers linked in the given field HTML."""
+    # Cheap pre-check so fields without appendices never reach the HTML parser
+    if not APPENDIX_TEXT_RE.search(html):
+        return frozenset()
+    numbers = set()
+    soup = BeautifulSoup(html, "html.parser")
+    for s in soup.find_all(string=APPENDIX_TEXT_RE):
+        if not s.parent or s.parent.name != "a":
+            continue
+        match = APPENDIX_TEXT_RE.match(str(s))
+        if match:
+            numbers.add(int(match.group(1)))
+    return frozenset(numbers)
+
+
+def max_appendix_number_in_field(html: str) -> int:
+    """Return the highest appendix number linked in the given field HTML, or 0."""
+    return max(appendix_numbers_in_field(html), default=0)
+
+
+def _field_hash(html: str) -> bytes:
+    return hashlib.blake2b(html.encode("utf-8"), digest_size=16).digest()
+
+
+@dataclass
+class _NoteState:
+    field_hashes: list[bytes] = field(default_factory=list)
+    field_numbers: list[frozenset[int]] = field(default_factory=list)
+    # Highest number handed out for an inserted link. Links are inserted through
+    # the webview, so several numbers can be issued (e.g. a multi-file drop)
+    # before the note's fields reflect any of them. Only dropped once a link is
+    # removed from the note, so the numbers can be handed out again.
+    reserved: int = 0
+
+    def numbers(self) -> frozenset[int]:
+        return frozenset().union(*self.field_numbers)
+
+
+class AppendixTracker:
+    """
+    Caches the appendix numbers of recently edited notes.
+
+    Entries are keyed by note id and validated against a hash of each field,
+    so only fields that changed since the last call are parsed again.
+    """
+
+    def __init__(self, max_notes: int = 64) -> None:
+        self.max_notes = max_notes
+        self._states: OrderedDict[int, _NoteState] = OrderedDict()
+
+    @staticmethod
+    def _note_key(note: Note) -> int:
+        # Notes in the Add window have no id yet
+        return note.id or id(note)
+
+    def _state_for(self, note: Note) -> _NoteState:
+        key = self._note_key(note)
+        state = self._states.get(key)
+        if state is None:
+            state = _NoteState()
+            self._states[key] = state
+            if len(self._states) > self.max_notes:
+                self._states.popitem(last=False)
+        else:
+            self._states.move_to_end(key)
+
+        fields = note.fields
+        if len(state.field_hashes) != len(fields):
+            state.field_hashes = [b""] * len(fields)
+            state.field_numbers = [frozenset()] * len(fields)
+        dropped: set[int] = set()
+        for i, html in enumerate(fields):
+            digest = _field_hash(html)
+            if digest != state.field_hashes[i]:
+                state.field_hashes[i] = digest
+                dropped |= state.field_numbers[i]
+                state.field_numbers[i] = appendix_numbers_in_field(html)
+        # Numbers that moved between fields are still in use
+        if dropped and not dropped <= state.numbers():
+            state.reserved = 0
+
+        return state
+
+    def next_number(self, note: Note) -> int:
+        """Return the number the next appendix of the note would get."""
+        state = self._state_for(note)
+        return max(max(state.numbers(), default=0), state.reserved) + 1
+
+    def reserve(self, note: Note) -> int:
+        """Return the next appendix number of the note and mark it as taken.
+
+        Only call this for a link that is actually inserted into the note.
+        """
+        number = self.next_number(note)
+        self._states[self._note_key(note)].reserved = number
+        return number
+
+    def mark_used(self, note: Note, number: int) -> None:
+        """Record that a link with the given number was inserted into the note."""
+        state = self._state_for(note)
+        state.reserved = max(state.reserved, number)
+
+    def forget(self, note: Note) -> None:
+        self._states.pop(self._note_key(note), None)
+
+    def clear(self) -> None:
+        self._states.clear()
+
+
+tracker = AppendixTracker()
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Sequence
+
+from anki.collection import Collection, OpChangesWithCount
+from anki.notes import NoteId
+from anki.utils import ids2str
+from aqt import gui_hooks, mw
+from aqt.browser import Browser
+from aqt.editor import pics
+from aqt.operations import CollectionOp
+from aqt.qt import QAction, QInputDialog, QMenu, qconnect
+from aqt.utils import tooltip
+
+from .consts import consts
+from .image_appendix import convert_images
+from .renumber import renumber_appendices
+
+ALL_FIELDS = "All fields"
+
+
+def report_progress(label: str) -> Callable[[int, int], None]:
+    def on_progress(done: int, total: int) -> None:
+        mw.taskman.run_on_main(
+            lambda: mw.progress.update(
+                label=f"{label} ({done}/{total})...", value=done, max=total
+            )
+        )
+
+    return on_progress
+
+
+def on_renumber_appendices(browser: Browser) -> None:
+    note_ids: Sequence[NoteId] = browser.selected_notes()
+    if not note_ids:
+        tooltip("No notes selected", parent=browser)
+        return
+    on_progress = report_progress("Renumbering appendices")
+
+    def op(col: Collection) -> OpChangesWithCount:
+        return renumber_appendices(col, note_ids, on_progress)
+
+    def on_success(changes: OpChangesWithCount) -> None:
+        tooltip(f"Renumbered appendices in {changes.count} note(s)", parent=browser)
+
+    CollectionOp(parent=browser, op=op).success(on_success).run_in_background()
+
+
+def field_names_of_notes(note_ids: Sequence[NoteId]) -> list[str]:
+    names: dict[str, None] = {}
+    for mid in mw.col.db.list(
+        f"select distinct mid from notes where id in {ids2str(note_ids)}"
+    ):
+        notetype = mw.col.models.get(mid)
+        if notetype:
+            names.update(dict.fromkeys(mw.col.models.field_names(notetype)))
+    return list(names)
+
+
+def on_convert_images(browser: Browser, to_appendices: bool) -> None:
+    note_ids: Sequence[NoteId] = browser.selected_notes()
+    if not note_ids:
+        tooltip("No notes selected", parent=browser)
+        return
+    title = (
+        "Convert Images to Appendices"
+        if to_appendices
+        else "Convert Appendices to Images"
+    )
+    field_name, ok = QInputDialog.getItem(
+        browser,
+        title,
+        "Field to convert:",
+        [ALL_FIELDS, *field_names_of_notes(note_ids)],
+        0,
+        False,
+    )
+    if not ok:
+        return
+    field = None if field_name == ALL_FIELDS else field_name
+    on_progress = report_progress("Converting notes")
+
+    def op(col: Collection) -> OpChangesWithCount:
+        return convert_images(
+            col, note_ids, field, to_appendices, pics, progress=on_progress
+        )
+
+    def on_success(changes: OpChangesWithCount) -> None:
+        tooltip(f"Converted {changes.count} note(s)", parent=browser)
+
+    CollectionOp(parent=browser, op=op).success(on_success).run_in_background()
+
+
+def on_browser_menus_did_init(browser: Browser) -> None:
+    menu = QMenu(consts.name, browser)
+    renumber_action = QAction("Renumber Appendices", browser)
+    menu.addAction(renumber_action)
+    qconnect(renumber_action.triggered, lambda: on_renumber_appendices(browser))
+    to_appendices_action = QAction("Convert Images to Appendices...", browser)
+    menu.addAction(to_appendices_action)
+    qconnect(to_appendices_action.triggered, lambda: on_convert_images(browser, True))
+    to_images_action = QAction("Convert Appendices to Images...", browser)
+    menu.addAction(to_images_action)
+    qconnect(to_images_action.triggered, lambda: on_convert_images(browser, False))
+    browser.form.menu_Notes.addSeparator()
+    browser.form.menu_Notes.addMenu(menu)
+
+
+def init_hooks() -> None:
+    gui_hooks.browser_menus_did_init.append(on_browser_menus_did_init)
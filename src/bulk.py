@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import Callable
+
+from anki.collection import Collection, OpChangesWithCount
+from anki.notes import Note, NoteId
+
+ProgressCallback = Callable[[int, int], None]
+
+# Number of notes loaded and saved at a time
+BULK_CHUNK_SIZE = 500
+
+
+def update_notes_in_chunks(
+    col: Collection,
+    note_ids: Sequence[NoteId],
+    undo_label: str,
+    update_note: Callable[[Note], bool],
+    progress: ProgressCallback | None = None,
+) -> OpChangesWithCount:
+    """
+    Call `update_note` on each note, which returns whether it changed the note.
+    Changed notes are saved in chunks merged into a single undo entry; the
+    returned count is the number of notes that changed.
+    """
+    undo_entry = col.add_custom_undo_entry(undo_label)
+    updated = 0
+    for start in range(0, len(note_ids), BULK_CHUNK_SIZE):
+        if progress:
+            progress(start, len(note_ids))
+        notes: list[Note] = []
+        for note_id in note_ids[start : start + BULK_CHUNK_SIZE]:
+            note = col.get_note(note_id)
+            if update_note(note):
+                notes.append(note)
+        if notes:
+            col.update_notes(notes)
+            col.merge_undo_entries(undo_entry)
+            updated += len(notes)
+    changes = col.merge_undo_entries(undo_entry)
+    return OpChangesWithCount(changes=changes, count=updated)
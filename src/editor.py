@@ -1,15 +1,16 @@
 import json
-import re
 import urllib.parse
-from typing import Any, Callable
+from typing import Any, Callable, Optional
 
 from anki.hooks import wrap
 from aqt import gui_hooks
 from aqt.editor import Editor, pics
-from bs4 import BeautifulSoup
 
+from .appendix_tracker import tracker
 from .config import config
 from .gui.pdf_selector import PdfSelectorDialog
+from .image_appendix import appendix_link_html
+from .perf import timed
 
 appendix_mode_enabled = False
 
@@ -42,9 +43,12 @@ def on_pdf_selector(editor: Editor) -> None:
     dialog.exec()
 
 
+@timed("editor.toggle_image_appendix")
 def on_toggle_image_appendix(editor: Editor) -> None:
     """Toggle between image reference and appendix reference."""
-    appendix_number = get_next_appendix_number(editor)
+    # Only peek here; the number is taken once the script reports an inserted link
+    note = editor.note
+    appendix_number = tracker.next_number(note)
     image_extensions = json.dumps(pics)
     # JavaScript to get selected HTML and toggle it
     js_code = f"""
@@ -73,7 +77,7 @@ def on_toggle_image_appendix(editor: Editor) -> None:
                                  `🔗Appendix {appendix_number}<img src="${{src}}"`+
                                   ' style="display: none;"></a>';
             document.execCommand('insertHTML', false, appendixHtml);
-            return;
+            return "appendix";
         }}
 
         // Check if it's an appendix reference
@@ -117,7 +121,11 @@ def on_toggle_image_appendix(editor: Editor) -> None:
     }})();
     """
 
-    editor.web.eval(js_code)
+    def on_done(result: Optional[str]) -> None:
+        if result == "appendix":
+            tracker.mark_used(note, appendix_number)
+
+    editor.web.evalWithCallback(js_code, on_done)
 
 
 def on_editor_did_init_buttons(buttons: list[str], editor: Editor) -> None:
@@ -164,27 +172,12 @@ def on_editor_did_init_buttons(buttons: list[str], editor: Editor) -> None:
     buttons.append(button)
 
 
-APPENDIX_TEXT_RE = re.compile(r"🔗Appendix (\d+)")
-
-
 def get_next_appendix_number(editor: Editor) -> int:
-    note = editor.note
-    max_number = 1
-    for field in note.fields:
-        soup = BeautifulSoup(field, "html.parser")
-        for s in soup.find_all(string=APPENDIX_TEXT_RE):
-            if not s.parent or s.parent.name != "a":
-                continue
-
-            match = APPENDIX_TEXT_RE.match(str(s))
-            if match:
-                number = int(match.group(1))
-                if number >= max_number:
-                    max_number = number + 1
-
-    return max_number
+    """Return the next free appendix number of the editor's note and reserve it."""
+    return tracker.reserve(editor.note)
 
 
+@timed("editor.fname_to_link")
 def fname_to_link(self: Editor, fname: str, _old: Callable) -> str:
     if not appendix_mode_enabled:
         return _old(self, fname)
@@ -192,13 +185,10 @@ def fname_to_link(self: Editor, fname: str, _old: Callable) -> str:
     if ext not in pics and ext != "pdf":
         return _old(self, fname)
     name = urllib.parse.quote(fname.encode("utf8"))
-    return (
-        f'<a href="{name}" class="appendix-link">'
-        f"🔗Appendix {get_next_appendix_number(self)}"
-        f'<img src="{name}" style="display: none;"></a>'
-    )
+    return appendix_link_html(name, get_next_appendix_number(self))
 
 
+@timed("editor.url_to_link")
 def url_to_link(*args: Any, **kwargs: Any) -> str:
     self: Editor = args[0]
     url: str = args[1]
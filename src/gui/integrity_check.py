@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import threading
+
+from anki.collection import Collection
+from anki.media import media_paths_from_col_path
+from aqt import dialogs, mw
+from aqt.operations import QueryOp
+from aqt.qt import Qt, QTableWidgetItem, qconnect, sip
+
+from ..consts import consts
+from ..forms.integrity_check import Ui_Dialog
+from ..integrity import IntegrityChecker, IntegrityIssue
+from ..pdf_index import scan_pdfs
+from ..pdf_meta import PdfMetadataCache
+from .dialog import Dialog
+
+
+class IntegrityCheckDialog(Dialog):
+    """Lists broken appendix links and unused PDFs as they are found."""
+
+    def setup_ui(self) -> None:
+        super().setup_ui()
+        self.form = Ui_Dialog()
+        self.form.setupUi(self)
+        self.setWindowTitle(f"{consts.name} - Check Appendices")
+        self.cancelled = threading.Event()
+        self.issue_count = 0
+        qconnect(self.form.stop.clicked, self.cancelled.set)
+        qconnect(self.form.close.clicked, self.reject)
+        qconnect(self.form.results.cellDoubleClicked, self.on_row_double_clicked)
+        self.start()
+
+    def start(self) -> None:
+        media_dir, _ = media_paths_from_col_path(mw.col.path)
+        pdf_metadata = PdfMetadataCache.for_media_dir(
+            media_dir, consts.dir / "user_files"
+        )
+
+        def op(col: Collection) -> tuple[bool, int]:
+            _, entries = scan_pdfs(media_dir)
+            checker = IntegrityChecker(media_dir, sorted(entries), pdf_metadata)
+
+            def on_issues(issues: list[IntegrityIssue]) -> None:
+                checked = checker.checked_notes
+                mw.taskman.run_on_main(lambda: self.add_issues(issues, checked))
+
+            try:
+                finished = checker.run(col, on_issues, self.cancelled.is_set)
+            finally:
+                pdf_metadata.save()
+            return finished, checker.checked_notes
+
+        QueryOp(parent=self, op=op, success=self.on_finished).run_in_background()
+
+    def add_issues(self, issues: list[IntegrityIssue], checked_notes: int) -> None:
+        if sip.isdeleted(self):
+            return
+        table = self.form.results
+        table.setSortingEnabled(False)
+        for issue in issues:
+            row = table.rowCount()
+            table.insertRow(row)
+            note_item = QTableWidgetItem()
+            if issue.note_id is not None:
+                note_item.setData(Qt.ItemDataRole.DisplayRole, issue.note_id)
+            for column, item in enumerate(
+                (
+                    QTableWidgetItem(issue.problem),
+                    QTableWidgetItem(issue.file),
+                    note_item,
+                    QTableWidgetItem(issue.details),
+                )
+            ):
+                table.setItem(row, column, item)
+        table.setSortingEnabled(True)
+        self.issue_count += len(issues)
+        self.form.status.setText(
+            f"Checking appendices... {checked_notes} note(s) checked, "
+            f"{self.issue_count} problem(s) found"
+        )
+
+    def on_finished(self, result: tuple[bool, int]) -> None:
+        if sip.isdeleted(self):
+            return
+        finished, checked_notes = result
+        self.form.stop.setEnabled(False)
+        self.form.status.setText(
+            f"{'Done' if finished else 'Stopped'}: {checked_notes} note(s) checked, "
+            f"{self.issue_count} problem(s) found"
+        )
+        self.form.results.resizeColumnsToContents()
+
+    def on_row_double_clicked(self, row: int, column: int) -> None:
+        item = self.form.results.item(row, 2)
+        note_id = item.data(Qt.ItemDataRole.DisplayRole) if item else None
+        if note_id:
+            browser = dialogs.open("Browser", mw)
+            browser.search_for(f"nid:{note_id}")
+
+    def reject(self) -> None:
+        self.cancelled.set()
+        super().reject()
@@ -1,39 +1,145 @@
 from __future__ import annotations
 
+import copy
 import hashlib
 import os
 import re
+from dataclasses import dataclass, field
 
-from anki.collection import Collection, OpChanges
+from anki.collection import Collection, OpChanges, OpChangesWithCount
 from anki.media import media_paths_from_col_path
-from anki.models import NotetypeDict
+from anki.models import NotetypeDict, NotetypeId
 from aqt import mw
-from aqt.operations import CollectionOp
-from aqt.qt import QListWidget, QListWidgetItem, Qt, qconnect
-from aqt.utils import tooltip
+from aqt.operations import CollectionOp, QueryOp
+from aqt.qt import QListWidget, QListWidgetItem, Qt, qconnect, sip
+from aqt.utils import showInfo, tooltip
 
 from ..consts import consts
 from ..forms.notetypes import Ui_Dialog
+from ..perf import timed
 from .dialog import Dialog
 
-SCRIPT_FILENAME = "_appendix-viewer-{hash}.js"
+SCRIPT_NAME = "_appendix-viewer.js"
+# Scripts loaded by the card script on demand
+LAZY_SCRIPT_NAMES = ("_appendix-pdf-viewer.js", "_appendix-lightbox.js")
 SCRIPT_HTML_RE = re.compile(
     r"""<script\s+src=("|')_appendix-(.*?).js("|')></script>""",
     re.DOTALL | re.IGNORECASE,
 )
+SCRIPT_HTML_WITH_SPACING_RE = re.compile(
+    r"\s*" + SCRIPT_HTML_RE.pattern, SCRIPT_HTML_RE.flags
+)
 SCRIPT_HTML = '<script src="{script_filename}"></script>'
+SCRIPT_FILENAME_RE = re.compile(
+    r"^_appendix-(viewer|pdf-viewer|lightbox)-[0-9a-f]{40}\.js$"
+)
+LAZY_SCRIPT_FILENAME_RE = re.compile(
+    rb"_appendix-(?:pdf-viewer|lightbox)-[0-9a-f]{40}\.js"
+)
+
+# (size, mtime) of the bundled scripts -> [(contents, hashed filename)]
+_script_cache: dict[tuple[tuple[int, int], ...], list[tuple[bytes, str]]] = {}
+
+
+def hashed_filename(name: str, contents: bytes) -> str:
+    stem, ext = os.path.splitext(name)
+    return f"{stem}-{hashlib.sha1(contents).hexdigest()}{ext}"
+
+
+def get_scripts() -> list[tuple[bytes, str]]:
+    """
+    Return the bundled viewer scripts and their hashed filenames, the card script
+    first. The names of the lazily loaded scripts are replaced by their hashed
+    names in the card script. Hashes are only computed again when the bundles
+    change, i.e. after an update.
+    """
+    dist_dir = consts.dir / "web" / "dist"
+    paths = [dist_dir / name for name in (SCRIPT_NAME, *LAZY_SCRIPT_NAMES)]
+    stats = [path.stat() for path in paths]
+    key = tuple((stat.st_size, stat.st_mtime_ns) for stat in stats)
+    if key not in _script_cache:
+        card_script = paths[0].read_bytes()
+        scripts = []
+        for path in paths[1:]:
+            contents = path.read_bytes()
+            filename = hashed_filename(path.name, contents)
+            card_script = card_script.replace(path.name.encode(), filename.encode())
+            scripts.append((contents, filename))
+        scripts.insert(0, (card_script, hashed_filename(SCRIPT_NAME, card_script)))
+        _script_cache.clear()
+        _script_cache[key] = scripts
+    return _script_cache[key]
+
+
+def get_script() -> tuple[bytes, str]:
+    """Return the card script and its hashed filename."""
+    return get_scripts()[0]
 
 
 def build_script(col: Collection) -> str:
-    script_path = consts.dir / "web" / "dist" / "_appendix-viewer.js"
-    script_contents = script_path.read_bytes()
-    hasher = hashlib.sha1(script_contents)
+    """
+    Copy the viewer scripts to the media folder unless they are already there.
+    Returns the filename of the card script.
+    """
+    (media_dir, _) = media_paths_from_col_path(col.path)
+    scripts = get_scripts()
+    for script_contents, script_filename in scripts:
+        script_path = os.path.join(media_dir, script_filename)
+        # The filename includes the content hash, so a file of the right size is
+        # current
+        try:
+            up_to_date = os.path.getsize(script_path) == len(script_contents)
+        except OSError:
+            up_to_date = False
+        if not up_to_date:
+            with open(script_path, "wb") as f:
+                f.write(script_contents)
+
+    return scripts[0][1]
+
+
+def get_referenced_scripts(col: Collection) -> set[str]:
+    """
+    Return the viewer scripts referenced by any notetype template, along with
+    the scripts they load.
+    """
+    referenced: set[str] = set()
+    for entry in col.models.all_names_and_ids():
+        notetype = col.models.get(NotetypeId(entry.id))
+        if not notetype:
+            continue
+        for template in notetype["tmpls"]:
+            for side in ["qfmt", "afmt"]:
+                for match in SCRIPT_HTML_RE.finditer(template[side]):
+                    referenced.add(f"_appendix-{match.group(2)}.js")
     (media_dir, _) = media_paths_from_col_path(col.path)
-    script_filename = SCRIPT_FILENAME.format(hash=hasher.hexdigest())
-    with open(os.path.join(media_dir, script_filename), "wb") as f:
-        f.write(script_contents)
+    for card_script in list(referenced):
+        try:
+            with open(os.path.join(media_dir, card_script), "rb") as f:
+                contents = f.read()
+        except OSError:
+            continue
+        referenced.update(
+            name.decode() for name in LAZY_SCRIPT_FILENAME_RE.findall(contents)
+        )
+    return referenced
 
-    return script_filename
+
+def remove_unused_scripts(col: Collection) -> list[str]:
+    """Move old viewer scripts that no template references to the media trash."""
+    (media_dir, _) = media_paths_from_col_path(col.path)
+    keep = get_referenced_scripts(col) | {filename for _, filename in get_scripts()}
+    with os.scandir(media_dir) as it:
+        unused = [
+            entry.name
+            for entry in it
+            if entry.name.startswith("_appendix-")
+            and SCRIPT_FILENAME_RE.match(entry.name)
+            and entry.name not in keep
+        ]
+    if unused:
+        col.media.trash_files(unused)
+    return unused
 
 
 def notetype_has_assets(notetype: NotetypeDict) -> Qt.CheckState:
@@ -55,52 +161,141 @@ def notetype_has_assets(notetype: NotetypeDict) -> Qt.CheckState:
     return value
 
 
-def get_notetypes_have_assets() -> dict[str, Qt.CheckState]:
-    notetypes = mw.col.models.all()
-    notetypes_have_script: dict[str, Qt.CheckState] = {}
-    for notetype in notetypes:
-        notetypes_have_script[notetype["name"]] = notetype_has_assets(notetype)
+# notetype id -> (modification time, asset state)
+_asset_state_cache: dict[NotetypeId, tuple[int, Qt.CheckState]] = {}
+
+
+def get_notetype_mtimes(col: Collection) -> dict[NotetypeId, int]:
+    """Return notetype modification times without loading the notetypes."""
+    return {
+        NotetypeId(ntid): mtime
+        for ntid, mtime in col.db.all("select id, mtime_secs from notetypes")
+    }
+
+
+def get_cached_notetypes_have_assets(
+    col: Collection,
+) -> dict[NotetypeId, Qt.CheckState]:
+    """Return the cached asset states of notetypes unchanged since last checked."""
+    states: dict[NotetypeId, Qt.CheckState] = {}
+    for ntid, mtime in get_notetype_mtimes(col).items():
+        cached = _asset_state_cache.get(ntid)
+        if cached and cached[0] == mtime:
+            states[ntid] = cached[1]
+    return states
+
+
+def get_notetypes_have_assets(
+    col: Collection, notetype_ids: list[NotetypeId]
+) -> dict[NotetypeId, Qt.CheckState]:
+    mtimes = get_notetype_mtimes(col)
+    notetypes_have_script: dict[NotetypeId, Qt.CheckState] = {}
+    for ntid in notetype_ids:
+        cached = _asset_state_cache.get(ntid)
+        if cached and cached[0] == mtimes.get(ntid):
+            notetypes_have_script[ntid] = cached[1]
+            continue
+        notetype = col.models.get(ntid)
+        if not notetype:
+            continue
+        state = notetype_has_assets(notetype)
+        _asset_state_cache[ntid] = (notetype["mod"], state)
+        notetypes_have_script[ntid] = state
     return notetypes_have_script
 
 
 def add_assets_to_notetype(
     notetype: NotetypeDict,
     script_filename: str,
-) -> None:
+) -> int:
+    """Add or update the script tag of all templates. Returns the changed sides."""
+    changed = 0
+    script_html = SCRIPT_HTML.format(script_filename=script_filename)
     templates = notetype["tmpls"]
     for template in templates:
         for side in ["qfmt", "afmt"]:
             html: str = template[side]
-            script_html = SCRIPT_HTML.format(script_filename=script_filename)
             if SCRIPT_HTML_RE.search(html):
-                html = SCRIPT_HTML_RE.sub(script_html, html)
+                new_html = SCRIPT_HTML_RE.sub(script_html, html)
             else:
-                # FIXME: excessive newlines after frequent updates
-                html += f"\n\n{script_html}"
-            template[side] = html
+                new_html = f"{html.rstrip()}\n\n{script_html}"
+            if new_html != html:
+                template[side] = new_html
+                changed += 1
+    return changed
 
 
-def remove_assets_from_notetype(notetype: NotetypeDict) -> bool:
-    changed = False
+def remove_assets_from_notetype(notetype: NotetypeDict) -> int:
+    """Remove the script tag from all templates. Returns the changed sides count."""
+    changed = 0
     templates = notetype["tmpls"]
     for template in templates:
         for side in ["qfmt", "afmt"]:
             if SCRIPT_HTML_RE.search(template[side]):
-                template[side] = SCRIPT_HTML_RE.sub("", template[side])
-                changed = True
+                # Also remove the blank lines added before the tag
+                template[side] = SCRIPT_HTML_WITH_SPACING_RE.sub("", template[side])
+                changed += 1
 
     return changed
 
 
+@dataclass
+class NotetypeChanges:
+    notetypes: list[NotetypeDict] = field(default_factory=list)
+    template_sides: int = 0
+
+
+def compute_notetype_changes(
+    col: Collection,
+    notetype_ids_states: list[tuple[NotetypeId, bool]],
+    script_filename: str,
+) -> NotetypeChanges:
+    """
+    Return copies of the notetypes whose templates would change, with the changes
+    applied. The notetypes cached by the collection are left untouched, so this
+    can be used as a dry run.
+    """
+    changes = NotetypeChanges()
+    for ntid, checked in notetype_ids_states:
+        notetype = col.models.get(ntid)
+        if not notetype:
+            continue
+        notetype = copy.deepcopy(notetype)
+        if checked:
+            changed = add_assets_to_notetype(notetype, script_filename)
+        else:
+            changed = remove_assets_from_notetype(notetype)
+        if changed:
+            changes.notetypes.append(notetype)
+            changes.template_sides += changed
+    return changes
+
+
+def update_notetypes(
+    col: Collection, notetypes: list[NotetypeDict], undo_label: str
+) -> OpChanges:
+    """Save all notetypes under a single undo entry."""
+    undo_entry = col.add_custom_undo_entry(undo_label)
+    for notetype in notetypes:
+        col.models.update_dict(notetype)
+        # Merge into our undo entry right away so it is never
+        # pushed out of the undo queue
+        col.merge_undo_entries(undo_entry)
+    return col.merge_undo_entries(undo_entry)
+
+
 def toggle_all_list_items(list_widget: QListWidget) -> None:
+    items = [
+        list_widget.item(i)
+        for i in range(list_widget.count())
+        if list_widget.item(i).flags() & Qt.ItemFlag.ItemIsEnabled
+    ]
     all_checked = True
-    for i in range(list_widget.count()):
-        item = list_widget.item(i)
+    for item in items:
         if item.checkState() != Qt.CheckState.Checked:
             all_checked = False
             break
-    for i in range(list_widget.count()):
-        item = list_widget.item(i)
+    for item in items:
         item.setCheckState(
             Qt.CheckState.Checked if not all_checked else Qt.CheckState.Unchecked
         )
@@ -115,13 +310,46 @@ class NotetypesDialog(Dialog):
         qconnect(self.form.cancel.clicked, self.reject)
         qconnect(self.form.save.clicked, self.accept)
         qconnect(self.form.toggle_all_notetypes.clicked, self.on_toggle_all)
+        qconnect(self.form.preview.clicked, self.on_preview)
+        qconnect(self.form.remove_old_scripts.clicked, self.on_remove_old_scripts)
 
-        note_types = get_notetypes_have_assets()
-        for note_type, state in note_types.items():
-            item = QListWidgetItem(note_type)
-            item.setCheckState(state)
+        # Only names and ids are loaded here. The asset states of notetypes that
+        # changed since they were last checked are computed in the background,
+        # and their items stay disabled until then.
+        cached_states = get_cached_notetypes_have_assets(mw.col)
+        self.pending_items: dict[NotetypeId, QListWidgetItem] = {}
+        for entry in mw.col.models.all_names_and_ids():
+            ntid = NotetypeId(entry.id)
+            item = QListWidgetItem(entry.name)
+            item.setData(Qt.ItemDataRole.UserRole, ntid)
+            state = cached_states.get(ntid)
+            if state is None:
+                item.setCheckState(Qt.CheckState.Unchecked)
+                item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEnabled)
+                self.pending_items[ntid] = item
+            else:
+                item.setCheckState(state)
             self.form.notetypes.addItem(item)
 
+        if self.pending_items:
+            pending_ids = list(self.pending_items)
+            QueryOp(
+                parent=self,
+                op=lambda col: get_notetypes_have_assets(col, pending_ids),
+                success=self.on_notetype_states_loaded,
+            ).run_in_background()
+
+    def on_notetype_states_loaded(
+        self, states: dict[NotetypeId, Qt.CheckState]
+    ) -> None:
+        if sip.isdeleted(self):
+            return
+        for ntid, state in states.items():
+            item = self.pending_items.pop(ntid, None)
+            if item:
+                item.setCheckState(state)
+                item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEnabled)
+
     def on_toggle_all(self) -> None:
         toggle_all_list_items(self.form.notetypes)
 
@@ -129,41 +357,74 @@ class NotetypesDialog(Dialog):
         self.save()
         super().accept()
 
-    def save(self) -> None:
-        notetype_names_states: list[tuple[str, bool]] = []
+    def selected_notetype_states(self) -> list[tuple[NotetypeId, bool]]:
+        notetype_ids_states: list[tuple[NotetypeId, bool]] = []
         for i in range(self.form.notetypes.count()):
             item = self.form.notetypes.item(i)
-            notetype_names_states.append(
-                (item.text(), item.checkState() == Qt.CheckState.Checked)
+            # Skip notetypes whose current state is not known yet
+            if not item.flags() & Qt.ItemFlag.ItemIsEnabled:
+                continue
+            notetype_ids_states.append(
+                (
+                    item.data(Qt.ItemDataRole.UserRole),
+                    item.checkState() == Qt.CheckState.Checked,
+                )
             )
+        return notetype_ids_states
+
+    def on_preview(self) -> None:
+        """Report what saving would change without changing anything."""
+        notetype_ids_states = self.selected_notetype_states()
+        _, script_filename = get_script()
 
-        def op(col: Collection) -> OpChanges:
+        def on_success(changes: NotetypeChanges) -> None:
+            if not changes.notetypes:
+                showInfo("No notetypes would be changed.", parent=self)
+                return
+            names = "\n".join(notetype["name"] for notetype in changes.notetypes)
+            showInfo(
+                f"{len(changes.notetypes)} notetype(s) and "
+                f"{changes.template_sides} template side(s) would be updated:"
+                f"\n\n{names}",
+                parent=self,
+            )
+
+        QueryOp(
+            parent=self,
+            op=lambda col: compute_notetype_changes(
+                col, notetype_ids_states, script_filename
+            ),
+            success=on_success,
+        ).run_in_background()
+
+    def on_remove_old_scripts(self) -> None:
+        def on_success(removed: list[str]) -> None:
+            tooltip(f"{len(removed)} old script(s) moved to the media trash")
+
+        QueryOp(
+            parent=self, op=remove_unused_scripts, success=on_success
+        ).run_in_background()
+
+    def save(self) -> None:
+        notetype_ids_states = self.selected_notetype_states()
+
+        @timed("notetypes.save")
+        def op(col: Collection) -> OpChangesWithCount:
             script_filename = build_script(col)
-            updated_notetypes: list[NotetypeDict] = []
-            for name, checked in notetype_names_states:
-                notetype = col.models.by_name(name)
-                changed = False
-                if checked:
-                    add_assets_to_notetype(notetype, script_filename)
-                    changed = True
-                else:
-                    changed = remove_assets_from_notetype(notetype)
-                if changed:
-                    updated_notetypes.append(notetype)
-
-            undo_entry = col.add_custom_undo_entry("Appendix: Update Notetypes")
-            for notetype in updated_notetypes:
-                col.models.update_dict(notetype)
-                # Merge to our custom undo entry before
-                # the undo queue fills up and Anki discards our entry
-                if (col.undo_status().last_step - undo_entry) % 29 == 0:
-                    col.merge_undo_entries(undo_entry)
-            changes = col.merge_undo_entries(undo_entry)
-
-            return changes
-
-        def on_success(changes: OpChanges) -> None:
-            tooltip("Notetypes updated")
+            notetype_changes = compute_notetype_changes(
+                col, notetype_ids_states, script_filename
+            )
+            # Old scripts are kept, since undoing this brings back templates
+            # that use them
+            changes = update_notetypes(
+                col, notetype_changes.notetypes, "Appendix: Update Notetypes"
+            )
+
+            return OpChangesWithCount(
+                changes=changes, count=len(notetype_changes.notetypes)
+            )
+
+        def on_success(changes: OpChangesWithCount) -> None:
+            tooltip(f"{changes.count} notetype(s) updated")
 
-        CollectionOp(parent=self, op=op).success(on_success).run_in_background()
         CollectionOp(parent=self, op=op).success(on_success).run_in_background()
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import bisect
+from typing import Any, cast
+
+from aqt.qt import (
+    QAbstractItemModel,
+    QAbstractListModel,
+    QAbstractProxyModel,
+    QIcon,
+    QModelIndex,
+    QObject,
+    Qt,
+    qconnect,
+)
+
+from ..pdf_meta import PdfMetadata
+from ..pdf_search import PdfSearchEngine
+
+
+class PdfListModel(QAbstractListModel):
+    """Flat list of PDF filenames whose rows are only materialized on demand."""
+
+    def __init__(self, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self.pdfs: list[str] = []
+        self._rows: dict[str, int] = {}
+        self.usage_counts: dict[str, int] | None = None
+        self.metadata: dict[str, PdfMetadata | None] = {}
+        self.thumbnails: dict[str, QIcon] = {}
+        # Shown until a row's thumbnail is ready, so the text does not move
+        self.placeholder_icon: QIcon | None = None
+
+    def set_pdfs(self, pdfs: list[str]) -> None:
+        self.beginResetModel()
+        self.pdfs = pdfs
+        self._rows = {name: row for row, name in enumerate(pdfs)}
+        self.endResetModel()
+
+    def add_pdf(self, name: str) -> None:
+        """Insert a PDF at its sorted position without resetting the other rows."""
+        row = self.row_for_name(name)
+        if row >= 0:
+            # Replaced, so what was read from the old file is outdated
+            self.metadata.pop(name, None)
+            self.thumbnails.pop(name, None)
+            self.dataChanged.emit(self.index(row), self.index(row))
+            return
+        row = bisect.bisect([pdf.lower() for pdf in self.pdfs], name.lower())
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.pdfs.insert(row, name)
+        self._rows = {name: row for row, name in enumerate(self.pdfs)}
+        self.endInsertRows()
+
+    def set_usage_counts(self, usage_counts: dict[str, int] | None) -> None:
+        self.usage_counts = usage_counts
+        if self.pdfs:
+            self.dataChanged.emit(self.index(0), self.index(len(self.pdfs) - 1))
+
+    def set_metadata(self, metadata: dict[str, PdfMetadata | None]) -> None:
+        self.metadata.update(metadata)
+        rows = [row for row in map(self.row_for_name, metadata) if row >= 0]
+        if rows:
+            self.dataChanged.emit(self.index(min(rows)), self.index(max(rows)))
+
+    def set_thumbnail(self, name: str, icon: QIcon) -> None:
+        self.thumbnails[name] = icon
+        row = self.row_for_name(name)
+        if row >= 0:
+            self.dataChanged.emit(self.index(row), self.index(row))
+
+    def row_for_name(self, name: str) -> int:
+        return self._rows.get(name, -1)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self.pdfs)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid() or not 0 <= index.row() < len(self.pdfs):
+            return None
+        name = self.pdfs[index.row()]
+        metadata = self.metadata.get(name)
+        if role == Qt.ItemDataRole.DisplayRole:
+            details = []
+            if metadata and metadata.page_count:
+                pages = metadata.page_count
+                details.append(f"{pages} page{'' if pages == 1 else 's'}")
+            if self.usage_counts is not None:
+                count = self.usage_counts.get(name, 0)
+                details.append(f"{count} note{'' if count == 1 else 's'}")
+            return f"{name}  ({', '.join(details)})" if details else name
+        if role == Qt.ItemDataRole.UserRole:
+            return name
+        if role == Qt.ItemDataRole.DecorationRole:
+            return self.thumbnails.get(name, self.placeholder_icon)
+        if role == Qt.ItemDataRole.ToolTipRole and metadata and metadata.title:
+            return metadata.title
+        return None
+
+
+class PdfSearchProxyModel(QAbstractProxyModel):
+    """Shows the rows of a `PdfListModel` that match the search text, best first."""
+
+    def __init__(self, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self.engine = PdfSearchEngine([])
+        self.search_text = ""
+        self._source_rows: list[int] = []
+        self._proxy_rows: dict[int, int] | None = None
+        # Persistent indexes and their names while rows are being inserted
+        self._persistent_names: list[tuple[QModelIndex, str]] = []
+
+    def setSourceModel(self, source_model: QAbstractItemModel) -> None:
+        self.beginResetModel()
+        super().setSourceModel(source_model)
+        qconnect(source_model.modelAboutToBeReset, self.beginResetModel)
+        qconnect(source_model.modelReset, self._on_source_reset)
+        qconnect(source_model.dataChanged, self._on_source_data_changed)
+        qconnect(
+            source_model.rowsAboutToBeInserted,
+            self._on_source_rows_about_to_be_inserted,
+        )
+        qconnect(source_model.rowsInserted, self._on_source_rows_inserted)
+        self._on_source_reset()
+
+    def _on_source_reset(self) -> None:
+        source_model = cast(PdfListModel, self.sourceModel())
+        self.engine = PdfSearchEngine(source_model.pdfs)
+        self._set_rows(self.engine.search(self.search_text))
+        self.endResetModel()
+
+    def _on_source_rows_about_to_be_inserted(self) -> None:
+        # Search again as a layout change, so the selection and scroll position
+        # are kept, unlike with a reset
+        self.layoutAboutToBeChanged.emit()
+        source_model = cast(PdfListModel, self.sourceModel())
+        self._persistent_names = [
+            (index, source_model.pdfs[self._source_rows[index.row()]])
+            for index in self.persistentIndexList()
+        ]
+
+    def _on_source_rows_inserted(self) -> None:
+        source_model = cast(PdfListModel, self.sourceModel())
+        self.engine = PdfSearchEngine(source_model.pdfs)
+        self._set_rows(self.engine.search(self.search_text))
+        self.changePersistentIndexList(
+            [index for index, _ in self._persistent_names],
+            [
+                self.mapFromSource(source_model.index(source_model.row_for_name(name)))
+                for _, name in self._persistent_names
+            ],
+        )
+        self._persistent_names = []
+        self.layoutChanged.emit()
+
+    def _on_source_data_changed(self) -> None:
+        if self._source_rows:
+            self.dataChanged.emit(
+                self.index(0, 0), self.index(len(self._source_rows) - 1, 0)
+            )
+
+    def _set_rows(self, rows: list[int]) -> None:
+        self._source_rows = rows
+        self._proxy_rows = None
+
+    def set_search_text(self, text: str) -> None:
+        self.beginResetModel()
+        self.search_text = text
+        self._set_rows(self.engine.search(text))
+        self.endResetModel()
+
+    def index(
+        self, row: int, column: int, parent: QModelIndex = QModelIndex()
+    ) -> QModelIndex:
+        if parent.isValid() or not 0 <= row < len(self._source_rows) or column != 0:
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, child: QModelIndex = QModelIndex()) -> QModelIndex:  # type: ignore[override]
+        return QModelIndex()
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self._source_rows)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return 1
+
+    def mapToSource(self, proxy_index: QModelIndex) -> QModelIndex:
+        if not proxy_index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(self._source_rows[proxy_index.row()], 0)
+
+    def mapFromSource(self, source_index: QModelIndex) -> QModelIndex:
+        if not source_index.isValid():
+            return QModelIndex()
+        if self._proxy_rows is None:
+            self._proxy_rows = {
+                source_row: row for row, source_row in enumerate(self._source_rows)
+            }
+        row = self._proxy_rows.get(source_index.row())
+        if row is None:
+            return QModelIndex()
+        return self.index(row, 0)
@@ -1,42 +1,110 @@
 from __future__ import annotations
 
+import functools
 import json
 import os
-import re
-import shutil
-from re import Match
+import sqlite3
+import threading
+from concurrent.futures import Future
+from pathlib import Path
 
 from anki.collection import Collection, OpChangesWithCount
 from anki.media import media_paths_from_col_path
-from aqt import mw
+from aqt import dialogs, mw
 from aqt.editor import Editor
-from aqt.operations import CollectionOp
+from aqt.operations import CollectionOp, QueryOp
 from aqt.qt import (
     QDragEnterEvent,
     QDropEvent,
     QFileDialog,
+    QIcon,
     QInputDialog,
+    QItemSelectionModel,
     QListWidgetItem,
     QMessageBox,
+    QModelIndex,
+    QPixmap,
+    QProgressDialog,
+    QSize,
     Qt,
+    QTimer,
     QWidget,
     qconnect,
+    sip,
 )
 from aqt.utils import openFolder, showInfo, tooltip
 
+from ..consts import consts
 from ..forms.pdf_selector import Ui_Dialog
+from ..log import logger
+from ..media_refs_hooks import catch_up_in_background, get_media_ref_index
+from ..pdf_dedupe import DuplicateFinder, find_duplicate_groups
+from ..pdf_import import (
+    ImportJob,
+    ImportResult,
+    PdfImporter,
+    find_conflicts,
+    plan_import,
+)
+from ..pdf_index import PdfEntry, PdfIndex, get_dir_mtime, scan_pdfs
+from ..pdf_meta import PdfMetadata, PdfMetadataCache
+from ..pdf_text_index import PdfTextIndex
+from ..rename import (
+    InvalidMappingLineError,
+    RenameStats,
+    apply_rename_template,
+    parse_rename_mapping,
+    rename_files,
+    update_notes_with_renamed_pdfs,
+    validate_renames,
+)
+from ..thumbnails import ThumbnailCache, get_thumbnail_executor, renderer_available
 from .dialog import Dialog
+from .pdf_list_model import PdfListModel, PdfSearchProxyModel
+
+SEARCH_DEBOUNCE_MS = 150
+VISIBLE_ROWS_DEBOUNCE_MS = 100
+PREVIEW_DEBOUNCE_MS = 200
+THUMBNAIL_ICON_SIZE = QSize(30, 40)
+# Thumbnails are rendered at twice their size to stay sharp on high-DPI screens
+THUMBNAIL_RENDER_SIZE = (60, 80)
+PREVIEW_RENDER_SIZE = (480, 640)
 
 
 class PdfSelectorDialog(Dialog):
     def __init__(self, parent: QWidget, editor: Editor) -> None:
         self.editor = editor
         self.media_dir, _ = media_paths_from_col_path(mw.col.path)
-        self.all_pdfs: list[str] = []
-        self.filtered_pdfs: list[str] = []
-        self.selected_pdf = None
+        self.pdf_index = PdfIndex.for_media_dir(
+            self.media_dir, consts.dir / "user_files"
+        )
+        self.pdf_metadata = PdfMetadataCache.for_media_dir(
+            self.media_dir, consts.dir / "user_files"
+        )
+        self.metadata_requested: set[str] = set()
+        self.loading_metadata = False
+        self.selected_pdf: str | None = None
+        self.selected_pdfs: list[str] = []
+        self.page_picker_state: tuple[str | None, PdfMetadata | None] | None = None
+        self.thumbnails = (
+            ThumbnailCache.for_media_dir(self.media_dir, consts.dir / "user_files")
+            if renderer_available()
+            else None
+        )
+        self.thumbnails_requested: set[str] = set()
+        self.thumbnail_futures: dict[str, Future[Path | None]] = {}
+        self.preview_future: Future[Path | None] | None = None
+        self.text_index = (
+            PdfTextIndex.for_media_dir(self.media_dir, consts.dir / "user_files")
+            if renderer_available()
+            else None
+        )
+        # Cancels the text indexing this dialog started
+        self.text_indexing_cancelled: threading.Event | None = None
         super().__init__(parent)
         self.load_pdfs()
+        self.refresh_pdfs_in_background()
+        catch_up_in_background(on_done=self.load_usage_counts)
 
     def setup_ui(self) -> None:
         super().setup_ui()
@@ -44,13 +112,58 @@ class PdfSelectorDialog(Dialog):
         self.form.setupUi(self)
         self.setWindowTitle("PDF Selector")
 
+        self.pdf_model = PdfListModel(self)
+        self.pdf_proxy_model = PdfSearchProxyModel(self)
+        self.pdf_proxy_model.setSourceModel(self.pdf_model)
+        self.form.pdfListView.setModel(self.pdf_proxy_model)
+
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        qconnect(self.search_timer.timeout, self.apply_search)
         qconnect(self.form.searchLineEdit.textChanged, self.on_search_changed)
         qconnect(
-            self.form.pdfListWidget.itemSelectionChanged, self.on_selection_changed
+            self.form.searchContentsCheckBox.toggled, self.on_search_contents_toggled
+        )
+        qconnect(
+            self.form.textResultsListWidget.currentItemChanged,
+            self.on_text_result_changed,
+        )
+        self.visible_rows_timer = QTimer(self)
+        self.visible_rows_timer.setSingleShot(True)
+        self.visible_rows_timer.setInterval(VISIBLE_ROWS_DEBOUNCE_MS)
+        qconnect(self.visible_rows_timer.timeout, self.on_visible_rows_changed)
+        qconnect(
+            self.form.pdfListView.verticalScrollBar().valueChanged,
+            lambda _: self.visible_rows_timer.start(),
+        )
+        self.page_limit = self.form.pageSpinBox.maximum()
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_DEBOUNCE_MS)
+        qconnect(self.preview_timer.timeout, self.load_preview)
+        qconnect(
+            self.form.pageSpinBox.valueChanged, lambda _: self.preview_timer.start()
+        )
+        if self.thumbnails:
+            self.form.pdfListView.setIconSize(THUMBNAIL_ICON_SIZE)
+            placeholder = QPixmap(THUMBNAIL_ICON_SIZE)
+            placeholder.fill(Qt.GlobalColor.transparent)
+            self.pdf_model.placeholder_icon = QIcon(placeholder)
+        else:
+            self.form.previewLabel.hide()
+        if not self.text_index:
+            self.form.searchContentsCheckBox.hide()
+        qconnect(self.form.outlineComboBox.activated, self.on_outline_activated)
+        qconnect(
+            self.form.pdfListView.selectionModel().selectionChanged,
+            self.on_selection_changed,
         )
-        qconnect(self.form.pdfListWidget.itemDoubleClicked, self.on_pdf_double_clicked)
+        qconnect(self.form.pdfListView.doubleClicked, self.on_pdf_double_clicked)
         qconnect(self.form.addNewPdfButton.clicked, self.on_add_new_pdf)
         qconnect(self.form.renamePdfButton.clicked, self.on_rename_pdf)
+        qconnect(self.form.findDuplicatesButton.clicked, self.on_find_duplicates)
+        qconnect(self.form.showUsageButton.clicked, self.on_show_usage)
         qconnect(self.form.addAppendixButton.clicked, self.on_add_appendix)
         qconnect(self.form.cancelButton.clicked, self.reject)
 
@@ -61,101 +174,556 @@ class PdfSelectorDialog(Dialog):
         self.update_button_states()
 
     def load_pdfs(self) -> None:
-        """Load all PDF files from the media directory."""
-        self.all_pdfs = []
-        for filename in os.listdir(self.media_dir):
-            if filename.lower().endswith(".pdf"):
-                self.all_pdfs.append(filename)
-
-        self.all_pdfs.sort(key=str.lower)
-        self.filtered_pdfs = self.all_pdfs.copy()
-        self.update_pdf_list()
-
-    def update_pdf_list(self) -> None:
-        """Update the PDF list widget with filtered results."""
-        self.form.pdfListWidget.clear()
-        for pdf_name in self.filtered_pdfs:
-            item = QListWidgetItem(pdf_name)
-            item.setData(Qt.ItemDataRole.UserRole, pdf_name)
-            self.form.pdfListWidget.addItem(item)
+        """Load the PDF files of the media directory from the index."""
+        self.pdf_model.set_pdfs(self.pdf_index.names())
+        # Files may have changed, so check the metadata of visible PDFs again
+        self.metadata_requested.clear()
+        self.thumbnails_requested.clear()
+        self.on_selection_changed()
+        self.visible_rows_timer.start()
+
+    def load_usage_counts(self) -> None:
+        """Show the number of notes linking to each PDF, once the index is ready."""
+        index = get_media_ref_index()
+        if sip.isdeleted(self) or index is None or not index.built:
+            return
+        self.pdf_model.set_usage_counts(index.usage_counts())
+
+    def visible_pdfs(self) -> list[str]:
+        """Return the PDFs of the rows shown in the list, and the selected ones."""
+        view = self.form.pdfListView
+        rect = view.viewport().rect()
+        first = view.indexAt(rect.topLeft())
+        last = view.indexAt(rect.bottomLeft())
+        start = first.row() if first.isValid() else 0
+        end = last.row() if last.isValid() else self.pdf_proxy_model.rowCount() - 1
+        names = [
+            self.pdf_proxy_model.index(row, 0).data(Qt.ItemDataRole.UserRole)
+            for row in range(start, end + 1)
+        ]
+        return self.selected_pdfs + names
+
+    def on_visible_rows_changed(self) -> None:
+        self.load_visible_metadata()
+        self.load_visible_thumbnails()
+
+    def load_visible_metadata(self) -> None:
+        """Read the page count, title and outline of the visible PDFs."""
+        if self.loading_metadata:
+            # Check again once the current batch is done
+            self.visible_rows_timer.start()
+            return
+        names = [
+            name for name in self.visible_pdfs() if name not in self.metadata_requested
+        ]
+        if not names:
+            return
+        self.metadata_requested.update(names)
+        self.loading_metadata = True
+        cache = self.pdf_metadata
+
+        def task() -> dict[str, PdfMetadata | None]:
+            metadata = {name: cache.get(name) for name in names}
+            cache.save()
+            return metadata
+
+        def on_done(future: Future[dict[str, PdfMetadata | None]]) -> None:
+            if sip.isdeleted(self):
+                return
+            try:
+                metadata = future.result()
+            except OSError as exc:
+                logger.error("Failed to read PDF metadata: %s", exc)
+                return
+            finally:
+                self.loading_metadata = False
+            self.pdf_model.set_metadata(metadata)
+            self.update_page_picker()
+
+        mw.taskman.run_in_background(task, on_done)
+
+    def render_thumbnail(
+        self, name: str, page: int, size: tuple[int, int]
+    ) -> Future[Path | None]:
+        """Render a page of the PDF in the thumbnail worker pool, if not cached."""
+        assert self.thumbnails
+        return get_thumbnail_executor().submit(
+            self.thumbnails.thumbnail, self.media_dir, name, page, size
+        )
+
+    def load_visible_thumbnails(self) -> None:
+        """
+        Render the first pages of the visible PDFs, dropping queued renders of
+        PDFs that were scrolled out of view.
+        """
+        if not self.thumbnails:
+            return
+        names = self.visible_pdfs()
+        visible = set(names)
+        for name, future in list(self.thumbnail_futures.items()):
+            if name not in visible and future.cancel():
+                del self.thumbnail_futures[name]
+                self.thumbnails_requested.discard(name)
+        for name in names:
+            if name in self.thumbnails_requested:
+                continue
+            self.thumbnails_requested.add(name)
+            future = self.render_thumbnail(name, 0, THUMBNAIL_RENDER_SIZE)
+            self.thumbnail_futures[name] = future
+            future.add_done_callback(functools.partial(self.on_thumbnail_done, name))
+
+    def on_thumbnail_done(self, name: str, future: Future[Path | None]) -> None:
+        """Called on the render thread when a thumbnail is done."""
+        mw.taskman.run_on_main(lambda: self.on_thumbnail_rendered(name, future))
+
+    def on_thumbnail_rendered(self, name: str, future: Future[Path | None]) -> None:
+        if sip.isdeleted(self) or future.cancelled():
+            return
+        if self.thumbnail_futures.get(name) is future:
+            del self.thumbnail_futures[name]
+        try:
+            path = future.result()
+        except OSError as exc:
+            # Keep the placeholder icon
+            logger.warning("Failed to cache thumbnail of %s: %s", name, exc)
+            return
+        if path:
+            self.pdf_model.set_thumbnail(name, QIcon(str(path)))
+
+    def load_preview(self) -> None:
+        """Show the page to insert at of the selected PDF."""
+        if not self.thumbnails:
+            return
+        if self.preview_future:
+            self.preview_future.cancel()
+            self.preview_future = None
+        if len(self.selected_pdfs) != 1:
+            self.form.previewLabel.setText("No preview")
+            return
+        page = max(self.form.pageSpinBox.value() - 1, 0)
+        future = self.render_thumbnail(self.selected_pdfs[0], page, PREVIEW_RENDER_SIZE)
+        self.preview_future = future
+        future.add_done_callback(
+            lambda future: mw.taskman.run_on_main(
+                lambda: self.on_preview_rendered(future)
+            )
+        )
+
+    def on_preview_rendered(self, future: Future[Path | None]) -> None:
+        if sip.isdeleted(self) or future is not self.preview_future:
+            return
+        self.preview_future = None
+        try:
+            path = future.result()
+        except OSError as exc:
+            logger.warning("Failed to cache preview: %s", exc)
+            path = None
+        if not path:
+            self.form.previewLabel.setText("No preview")
+            return
+        pixmap = QPixmap(str(path))
+        pixmap.setDevicePixelRatio(2)
+        self.form.previewLabel.setPixmap(pixmap)
+
+    def done(self, result: int) -> None:
+        # Drop queued renders nobody will see; text indexing resumes next time
+        for future in self.thumbnail_futures.values():
+            future.cancel()
+        if self.preview_future:
+            self.preview_future.cancel()
+        if self.text_indexing_cancelled:
+            self.text_indexing_cancelled.set()
+        super().done(result)
+
+    def update_page_picker(self) -> None:
+        """Limit the page to the selected PDF's page count and list its outline."""
+        metadata = None
+        if len(self.selected_pdfs) == 1:
+            metadata = self.pdf_model.metadata.get(self.selected_pdfs[0])
+        page_count = metadata.page_count if metadata else None
+        spin_box = self.form.pageSpinBox
+        spin_box.setMaximum(page_count or self.page_limit)
+        spin_box.setSuffix(f" / {page_count}" if page_count else "")
+
+        # Only rebuild the outline list when the PDF or its metadata changed
+        state = (self.selected_pdf, metadata)
+        if state == self.page_picker_state:
+            return
+        self.page_picker_state = state
+        combo_box = self.form.outlineComboBox
+        combo_box.clear()
+        outline = [item for item in metadata.outline if item.page] if metadata else []
+        if not outline:
+            combo_box.addItem("No bookmarks")
+            combo_box.setEnabled(False)
+            return
+        combo_box.addItem("Go to bookmark...")
+        for item in outline:
+            combo_box.addItem(
+                f"{'    ' * item.level}{item.title} (p.{item.page})", item.page
+            )
+        combo_box.setEnabled(True)
+
+    def on_outline_activated(self, index: int) -> None:
+        page = self.form.outlineComboBox.itemData(index)
+        if page:
+            self.form.pageSpinBox.setValue(page)
+
+    def refresh_pdfs_in_background(self) -> None:
+        """Rescan the media directory if it changed since the index was built."""
+        if self.pdf_index.refreshing or not self.pdf_index.is_stale():
+            return
+        self.pdf_index.refreshing = True
+        index = self.pdf_index
+
+        def on_done(future: Future[tuple[int, dict[str, PdfEntry]]]) -> None:
+            index.refreshing = False
+            try:
+                changed = index.apply_scan(*future.result())
+            except OSError as exc:
+                logger.warning("Failed to scan the media folder for PDFs: %s", exc)
+                return
+            if changed and not sip.isdeleted(self) and self.isVisible():
+                selected_pdf = self.selected_pdf
+                self.load_pdfs()
+                if selected_pdf:
+                    self.select_pdf(selected_pdf)
+
+        mw.taskman.run_in_background(lambda: scan_pdfs(self.media_dir), on_done)
+
+    def select_pdf(self, pdf_name: str) -> None:
+        row = self.pdf_model.row_for_name(pdf_name)
+        if row < 0:
+            return
+        index = self.pdf_proxy_model.mapFromSource(self.pdf_model.index(row))
+        if not index.isValid():
+            return
+        self.form.pdfListView.selectionModel().setCurrentIndex(
+            index, QItemSelectionModel.SelectionFlag.ClearAndSelect
+        )
+        self.form.pdfListView.scrollTo(index)
 
     def on_search_changed(self, text: str) -> None:
-        """Filter PDFs based on search text."""
-        if not text:
-            self.filtered_pdfs = self.all_pdfs.copy()
+        """Filter PDFs based on search text once typing pauses."""
+        self.search_timer.start()
+
+    def apply_search(self) -> None:
+        text = self.form.searchLineEdit.text()
+        if self.form.searchContentsCheckBox.isChecked():
+            # Results pick the PDF, so list all PDFs to select from
+            self.search_text(text)
+            text = ""
+        self.pdf_proxy_model.set_search_text(text)
+        self.on_selection_changed()
+        self.visible_rows_timer.start()
+
+    def on_search_contents_toggled(self, checked: bool) -> None:
+        self.form.textResultsListWidget.setVisible(checked)
+        if checked:
+            self.update_text_index()
         else:
-            search_lower = text.lower()
-            self.filtered_pdfs = [
-                pdf for pdf in self.all_pdfs if search_lower in pdf.lower()
-            ]
-        self.update_pdf_list()
+            self.form.textResultsListWidget.clear()
+        self.apply_search()
+
+    def update_text_index(self) -> None:
+        """Extract the text of PDFs that changed since they were indexed."""
+        index = self.text_index
+        if not index or sip.isdeleted(self):
+            return
+        if index.update_cancelled:
+            # Started by this or an earlier dialog, possibly since closed and
+            # finishing its current file; run again once it is done
+            index.pending_update = self.update_text_index
+            return
+        cancelled = index.update_cancelled = threading.Event()
+        self.text_indexing_cancelled = cancelled
+        entries = {entry.name: entry for entry in self.pdf_index.snapshot()}
+        status_label = self.form.textIndexStatusLabel
+
+        def on_progress(done: int, total: int) -> None:
+            def update() -> None:
+                if not sip.isdeleted(self):
+                    status_label.setText(f"Indexing PDF text ({done}/{total})...")
+                    status_label.show()
+
+            mw.taskman.run_on_main(update)
+
+        def task() -> bool:
+            return index.update(
+                self.media_dir,
+                entries,
+                progress=on_progress,
+                cancelled=cancelled.is_set,
+            )
+
+        def on_done(future: Future[bool]) -> None:
+            index.update_cancelled = None
+            try:
+                finished = future.result()
+            except (OSError, sqlite3.Error) as exc:
+                logger.error("Failed to index the text of PDFs: %s", exc)
+                finished = False
+            if index.pending_update:
+                pending_update, index.pending_update = index.pending_update, None
+                pending_update()
+            if sip.isdeleted(self):
+                return
+            if not index.update_cancelled:
+                status_label.hide()
+            if finished and self.form.searchContentsCheckBox.isChecked():
+                self.search_text(self.form.searchLineEdit.text())
+
+        mw.taskman.run_in_background(task, on_done)
+
+    def search_text(self, text: str) -> None:
+        """List the pages of PDFs that contain the search text."""
+        assert self.text_index
+        results = self.form.textResultsListWidget
+        results.clear()
+        for match in self.text_index.search(text):
+            item = QListWidgetItem(f"{match.name}, p.{match.page}: {match.snippet}")
+            item.setData(Qt.ItemDataRole.UserRole, (match.name, match.page))
+            item.setToolTip(match.snippet)
+            results.addItem(item)
+
+    def on_text_result_changed(self, item: QListWidgetItem | None) -> None:
+        """Select the PDF of the result and insert at its page."""
+        if not item:
+            return
+        name, page = item.data(Qt.ItemDataRole.UserRole)
+        self.select_pdf(name)
+        self.form.pageSpinBox.setValue(page)
 
     def on_selection_changed(self) -> None:
         """Update selected PDF and button states when selection changes."""
-        selected_items = self.form.pdfListWidget.selectedItems()
-        if selected_items:
-            self.selected_pdf = selected_items[0].data(Qt.ItemDataRole.UserRole)
-        else:
-            self.selected_pdf = None
+        selected_indexes = sorted(
+            self.form.pdfListView.selectionModel().selectedIndexes(),
+            key=lambda index: index.row(),
+        )
+        self.selected_pdfs = [
+            index.data(Qt.ItemDataRole.UserRole) for index in selected_indexes
+        ]
+        self.selected_pdf = self.selected_pdfs[0] if self.selected_pdfs else None
         self.update_button_states()
+        self.update_page_picker()
+        if self.selected_pdf and self.selected_pdf not in self.metadata_requested:
+            self.visible_rows_timer.start()
+        self.preview_timer.start()
 
     def update_button_states(self) -> None:
         """Enable/disable buttons based on current state."""
         has_selection = self.selected_pdf is not None
         self.form.renamePdfButton.setEnabled(has_selection)
-        self.form.addAppendixButton.setEnabled(has_selection)
+        self.form.showUsageButton.setEnabled(has_selection)
+        self.form.addAppendixButton.setEnabled(len(self.selected_pdfs) == 1)
 
-    def on_pdf_double_clicked(self, item: QListWidgetItem) -> None:
+    def on_pdf_double_clicked(self, index: QModelIndex) -> None:
         """Open PDF when double-clicked."""
-        pdf_name = item.data(Qt.ItemDataRole.UserRole)
+        pdf_name = index.data(Qt.ItemDataRole.UserRole)
         self.open_pdf(pdf_name)
 
     def open_pdf(self, pdf_name: str) -> None:
         pdf_path = os.path.join(self.media_dir, pdf_name)
         openFolder(pdf_path)
 
+    def on_show_usage(self) -> None:
+        """Open the browser with the notes linking to the selected PDFs."""
+        index = get_media_ref_index()
+        if not self.selected_pdfs or index is None or not index.built:
+            tooltip("PDF usage is still being indexed")
+            return
+        note_ids = index.notes_referencing(self.selected_pdfs)
+        if not note_ids:
+            tooltip("No notes link to the selected PDF(s)")
+            return
+        browser = dialogs.open("Browser", mw)
+        browser.search_for(f"nid:{','.join(map(str, note_ids))}")
+
     def on_add_new_pdf(self) -> None:
-        """Add a new PDF file from file explorer."""
+        """Add new PDF files from file explorer."""
 
-        file_path, _ = QFileDialog.getOpenFileName(
-            self, "Select PDF file", "", "PDF files (*.pdf);;All files (*.*)"
+        file_paths, _ = QFileDialog.getOpenFileNames(
+            self, "Select PDF files", "", "PDF files (*.pdf);;All files (*.*)"
         )
 
-        if not file_path:
+        if not file_paths:
             return
 
-        try:
-            filename = os.path.basename(file_path)
-            dest_path = os.path.join(self.media_dir, filename)
-
-            # Check if file already exists
-            if os.path.exists(dest_path):
-                reply = QMessageBox.question(
-                    self,
-                    "File exists",
-                    f"A file named '{filename}' already exists. Replace it?",
-                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+        self.import_pdfs(file_paths)
+
+    def resolve_import_conflicts(self, jobs: list[ImportJob]) -> list[ImportJob]:
+        """Ask once what to do with files that already exist in the media folder."""
+        conflicts = find_conflicts(jobs, self.media_dir)
+        if not conflicts:
+            return jobs
+        names = "\n".join(job.filename for job in conflicts)
+        box = QMessageBox(self)
+        box.setIcon(QMessageBox.Icon.Question)
+        box.setWindowTitle("Files exist")
+        box.setText(
+            f"{len(conflicts)} file(s) already exist in the media folder:\n\n{names}"
+        )
+        replace_button = box.addButton("Replace", QMessageBox.ButtonRole.AcceptRole)
+        skip_button = box.addButton("Skip existing", QMessageBox.ButtonRole.ActionRole)
+        box.addButton(QMessageBox.StandardButton.Cancel)
+        box.exec()
+        clicked = box.clickedButton()
+        if clicked == replace_button:
+            return jobs
+        if clicked == skip_button:
+            skipped = {job.filename for job in conflicts}
+            return [job for job in jobs if job.filename not in skipped]
+        return []
+
+    def import_pdfs(self, file_paths: list[str]) -> None:
+        """Copy files into the media folder in the background."""
+        jobs = self.resolve_import_conflicts(plan_import(file_paths))
+        if not jobs:
+            return
+
+        importer = PdfImporter(self.media_dir)
+        dir_mtime_before = get_dir_mtime(self.media_dir)
+        duplicate_finder = DuplicateFinder(self.media_dir, self.pdf_index.snapshot())
+        progress = QProgressDialog("Adding PDF files...", "Cancel", 0, len(jobs), self)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(500)
+        qconnect(progress.canceled, importer.cancel)
+        added_files: list[str] = []
+        reused_files: list[str] = []
+        errors: list[str] = []
+
+        def on_result(result: ImportResult) -> None:
+            if result.error:
+                errors.append(f"{result.job.filename}: {result.error}")
+            elif result.reused:
+                reused_files.append(
+                    f"{result.job.filename} (identical to {result.reused})"
                 )
-                if reply != QMessageBox.StandardButton.Yes:
+                if not sip.isdeleted(self) and len(reused_files) == 1:
+                    # Point the new appendix at the existing copy
+                    self.select_pdf(result.reused)
+            else:
+                added_files.append(result.job.filename)
+                if sip.isdeleted(self):
                     return
+                self.metadata_requested.discard(result.job.filename)
+                self.thumbnails_requested.discard(result.job.filename)
+                self.pdf_model.add_pdf(result.job.filename)
+                if len(added_files) == 1:
+                    self.select_pdf(added_files[0])
+                self.visible_rows_timer.start()
+            progress.setValue(len(added_files) + len(reused_files) + len(errors))
+
+        def task() -> list[ImportResult]:
+            return importer.run(
+                jobs,
+                lambda result: mw.taskman.run_on_main(lambda: on_result(result)),
+                duplicate_finder.find,
+            )
 
-            shutil.copy2(file_path, dest_path)
-            self.load_pdfs()
+        def on_done(future: Future[list[ImportResult]]) -> None:
+            progress.close()
+            # The index is written once, after all files are copied
+            self.pdf_index.update_files(
+                added_files, dir_mtime_before, duplicate_finder.hashed
+            )
+            try:
+                future.result()
+            except Exception as e:
+                showInfo(f"Error adding PDF files: {str(e)}")
+                return
+            if errors:
+                showInfo("Some files could not be added:\n\n" + "\n".join(errors))
+            if reused_files:
+                showInfo(
+                    "These files were already in the media folder, so the existing "
+                    "copies will be used:\n\n" + "\n".join(reused_files)
+                )
+            if added_files:
+                tooltip(f"Added {len(added_files)} PDF file(s) successfully")
 
-            # Select the newly added PDF
-            for i in range(self.form.pdfListWidget.count()):
-                item = self.form.pdfListWidget.item(i)
-                if item.data(Qt.ItemDataRole.UserRole) == filename:
-                    self.form.pdfListWidget.setCurrentItem(item)
-                    break
+        mw.taskman.run_in_background(task, on_done)
 
-            tooltip(f"PDF '{filename}' added successfully")
+    def on_find_duplicates(self) -> None:
+        """Find identical PDFs and merge each group into its oldest file."""
+        index = self.pdf_index
+        entries = index.snapshot()
 
-        except Exception as e:
-            showInfo(f"Error adding PDF: {str(e)}")
+        def on_progress(done: int, total: int) -> None:
+            mw.taskman.run_on_main(
+                lambda: mw.progress.update(
+                    label=f"Hashing PDFs ({done}/{total})...", value=done, max=total
+                )
+            )
+
+        def op(col: Collection) -> tuple[list[list[PdfEntry]], list[PdfEntry]]:
+            return find_duplicate_groups(self.media_dir, entries, on_progress)
+
+        def on_success(result: tuple[list[list[PdfEntry]], list[PdfEntry]]) -> None:
+            groups, hashed = result
+            index.set_hashes(hashed)
+            if sip.isdeleted(self):
+                return
+            if not groups:
+                tooltip("No duplicate PDFs found")
+                return
+            mapping = {
+                duplicate.name: group[0].name
+                for group in groups
+                for duplicate in group[1:]
+            }
+            details = "\n\n".join(
+                "\n".join(
+                    [f"Keep: {group[0].name}"]
+                    + [f"Merge: {duplicate.name}" for duplicate in group[1:]]
+                )
+                for group in groups
+            )
+            box = QMessageBox(self)
+            box.setIcon(QMessageBox.Icon.Question)
+            box.setWindowTitle("Duplicate PDFs")
+            box.setText(
+                f"Found {len(mapping)} duplicate PDF(s) in {len(groups)} group(s). "
+                "Merge them? Notes will be updated to point to the kept file and "
+                "the duplicates will be moved to the media trash."
+            )
+            box.setDetailedText(details)
+            box.setStandardButtons(
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+            )
+            if box.exec() == QMessageBox.StandardButton.Yes:
+                self.merge_duplicate_pdfs(mapping)
+
+        QueryOp(parent=self, op=op, success=on_success).with_progress(
+            "Hashing PDFs..."
+        ).run_in_background()
+
+    def merge_duplicate_pdfs(self, mapping: dict[str, str]) -> None:
+        """Point references of the duplicates in `mapping` to the kept files."""
+        dir_mtime_before = get_dir_mtime(self.media_dir)
+
+        def op(col: Collection) -> OpChangesWithCount:
+            changes = update_notes_with_renamed_pdfs(col, mapping)
+            col.media.trash_files(list(mapping))
+            return changes
+
+        def on_success(changes: OpChangesWithCount) -> None:
+            self.pdf_index.update_files(mapping, dir_mtime_before)
+            self.load_pdfs()
+            self.refresh_pdfs_in_background()
+            catch_up_in_background(on_done=self.load_usage_counts)
+            tooltip(
+                f"Merged {len(mapping)} duplicate PDF(s), "
+                f"updated {changes.count} note(s)"
+            )
+
+        CollectionOp(parent=self, op=op).success(on_success).run_in_background()
 
     def on_rename_pdf(self) -> None:
-        """Rename the selected PDF and update all notes that reference it."""
+        """Rename the selected PDFs and update all notes that reference them."""
+        if len(self.selected_pdfs) > 1:
+            self.on_batch_rename_pdfs()
+            return
         if not self.selected_pdf:
             return
 
@@ -171,102 +739,115 @@ class PdfSelectorDialog(Dialog):
         if not new_name.lower().endswith(".pdf"):
             new_name += ".pdf"
 
-        old_path = os.path.join(self.media_dir, old_name)
-        new_path = os.path.join(self.media_dir, new_name)
+        self.rename_pdfs({old_name: new_name})
 
-        # Check if new name already exists
-        if os.path.exists(new_path):
-            showInfo(f"A file named '{new_name}' already exists")
+    def on_batch_rename_pdfs(self) -> None:
+        """Rename several PDFs using a name template and an editable mapping."""
+        old_names = self.selected_pdfs
+        template, ok = QInputDialog.getText(
+            self,
+            "Rename PDFs",
+            "Name template ({name} is the old name, {n} the position, e.g. {n:03}):",
+            text="{name}",
+        )
+        if not ok or not template:
             return
-
         try:
-            # Rename the file
-            os.rename(old_path, new_path)
-
-            # Update all notes that reference this PDF
-            self.update_notes_with_renamed_pdf(old_name, new_name)
+            mapping = apply_rename_template(template, old_names)
+        except (KeyError, IndexError, ValueError) as e:
+            showInfo(f"Invalid template: {str(e)}")
+            return
 
-            # Reload PDF list
-            self.load_pdfs()
+        text, ok = QInputDialog.getMultiLineText(
+            self,
+            "Rename PDFs",
+            "Review the new names (old => new):",
+            "\n".join(f"{old} => {new}" for old, new in mapping.items()),
+        )
+        if not ok:
+            return
+        try:
+            mapping = parse_rename_mapping(text)
+        except InvalidMappingLineError as e:
+            showInfo(str(e))
+            return
+        self.rename_pdfs(mapping)
 
-            # Select the renamed PDF
-            for i in range(self.form.pdfListWidget.count()):
-                item = self.form.pdfListWidget.item(i)
-                if item.data(Qt.ItemDataRole.UserRole) == new_name:
-                    self.form.pdfListWidget.setCurrentItem(item)
-                    break
+    def rename_pdfs(self, mapping: dict[str, str]) -> None:
+        """Rename PDF files and update all notes that reference them."""
+        mapping = {old: new for old, new in mapping.items() if old != new}
+        if not mapping:
+            return
 
-            tooltip(f"PDF renamed from '{old_name}' to '{new_name}'")
+        problems = validate_renames(mapping, self.media_dir)
+        if problems:
+            showInfo("\n".join(problems))
+            return
 
+        dir_mtime_before = get_dir_mtime(self.media_dir)
+        try:
+            # Rename the files
+            rename_files(mapping, self.media_dir)
         except Exception as e:
             showInfo(f"Error renaming PDF: {str(e)}")
+            self.pdf_index.apply_scan(*scan_pdfs(self.media_dir))
+            self.load_pdfs()
+            return
 
-    def update_notes_with_renamed_pdf(self, old_name: str, new_name: str) -> None:
-        """Update all notes that reference the renamed PDF."""
-
-        def op(col: Collection) -> OpChangesWithCount:
-            # Escape special regex characters in filename for safe regex matching
-            escaped_old_name = re.escape(old_name)
-
-            # Search for notes containing href or src to the old PDF name
-            # with optional page parameter
-            # Matches both: href="filename.pdf" and href="filename.pdf?page=123"
-            # Also matches: src="filename.pdf"
-            search_pattern = (
-                rf'''"re:(href|src)=[\"']?{escaped_old_name}(\?page=\\d+)?[\"']?"'''
-            )
-            note_ids = col.find_notes(search_pattern)
-            updated_notes = []
-
-            for note_id in note_ids:
-                note = col.get_note(note_id)
-                updated = False
+        # Update all notes that reference the PDFs
+        self.update_notes_with_renamed_pdfs(mapping)
 
-                for i, field in enumerate(note.fields):
-                    # Use regex to find and replace href references
-                    # with optional page parameters
-                    # Pattern matches: href="old_name" or href="old_name?page=123"
-                    # (with single or double quotes)
-                    href_pattern = rf'href=(["\']){re.escape(old_name)}(\?page=\d+)?\1'
+        # Reload PDF list
+        self.pdf_index.update_files([*mapping, *mapping.values()], dir_mtime_before)
+        self.load_pdfs()
+        self.refresh_pdfs_in_background()
 
-                    def replace_href(match: Match[str]) -> str:
-                        quote = match.group(1)  # Single or double quote
-                        page_param = (
-                            match.group(2) if match.group(2) else ""
-                        )  # Page parameter if present
-                        return f"href={quote}{new_name}{page_param}{quote}"
+        # Select the first renamed PDF
+        first_old_name, first_new_name = next(iter(mapping.items()))
+        self.select_pdf(first_new_name)
 
-                    new_field = re.sub(href_pattern, replace_href, field)
+        if len(mapping) == 1:
+            tooltip(f"PDF renamed from '{first_old_name}' to '{first_new_name}'")
+        else:
+            tooltip(f"Renamed {len(mapping)} PDFs")
 
-                    # Also update src attributes in img tags
-                    # Pattern matches: src="old_name" (with single or double quotes)
-                    src_pattern = rf'src=(["\']){re.escape(old_name)}\1'
+    def update_notes_with_renamed_pdf(self, old_name: str, new_name: str) -> None:
+        """Update all notes that reference the renamed PDF."""
+        self.update_notes_with_renamed_pdfs({old_name: new_name})
 
-                    def replace_src(match: Match[str]) -> str:
-                        quote = match.group(1)  # Single or double quote
-                        return f"src={quote}{new_name}{quote}"
+    def update_notes_with_renamed_pdfs(self, mapping: dict[str, str]) -> None:
+        """Update all notes that reference the renamed PDFs in one pass."""
 
-                    new_field = re.sub(src_pattern, replace_src, new_field)
+        def on_progress(done: int, total: int) -> None:
+            mw.taskman.run_on_main(
+                lambda: mw.progress.update(
+                    label=f"Updating notes ({done}/{total})...",
+                    value=done,
+                    max=total,
+                )
+            )
 
-                    if new_field != field:
-                        note.fields[i] = new_field
-                        updated = True
+        stats = RenameStats()
 
-                if updated:
-                    updated_notes.append(note)
+        ref_index = get_media_ref_index()
 
-            undo_entry = col.add_custom_undo_entry(
-                f"Rename PDF: {old_name} → {new_name}"
+        def op(col: Collection) -> OpChangesWithCount:
+            note_ids = None
+            if ref_index is not None and ref_index.built:
+                ref_index.catch_up(col)
+                note_ids = ref_index.notes_referencing(list(mapping))
+            return update_notes_with_renamed_pdfs(
+                col, mapping, on_progress, stats, note_ids=note_ids
             )
-            for note in updated_notes:
-                col.update_note(note)
-
-            changes = col.merge_undo_entries(undo_entry)
-            return OpChangesWithCount(changes=changes, count=len(updated_notes))
 
         def on_success(changes: OpChangesWithCount) -> None:
+            catch_up_in_background(on_done=self.load_usage_counts)
             if changes.count > 0:
-                tooltip(f"Updated {changes.count} note(s) with new PDF name")
+                tooltip(
+                    f"Updated {changes.count} note(s) with new PDF name "
+                    f"(search: {stats.search_seconds:.2f}s, "
+                    f"rewrite: {stats.rewrite_seconds:.2f}s)"
+                )
 
         CollectionOp(parent=self, op=op).success(on_success).run_in_background()
 
@@ -331,44 +912,5 @@ class PdfSelectorDialog(Dialog):
         if not pdf_files:
             return
 
-        try:
-            added_files = []
-            for file_path in pdf_files:
-                if os.path.exists(file_path):
-                    filename = os.path.basename(file_path)
-                    dest_path = os.path.join(self.media_dir, filename)
-
-                    # Check if file already exists
-                    if os.path.exists(dest_path):
-                        reply = QMessageBox.question(
-                            self,
-                            "File exists",
-                            f"A file named '{filename}' already exists. Replace it?",
-                            QMessageBox.StandardButton.Yes
-                            | QMessageBox.StandardButton.No,
-                        )
-                        if reply != QMessageBox.StandardButton.Yes:
-                            continue
-
-                    shutil.copy2(file_path, dest_path)
-                    added_files.append(filename)
-
-            if added_files:
-                self.load_pdfs()
-
-                # Select the first added PDF
-                for i in range(self.form.pdfListWidget.count()):
-                    item = self.form.pdfListWidget.item(i)
-                    if item.data(Qt.ItemDataRole.UserRole) == added_files[0]:
-                        self.form.pdfListWidget.setCurrentItem(item)
-                        break
-
-                count = len(added_files)
-                tooltip(f"Added {count} PDF file(s) successfully")
-
-        except Exception as e:
-            showInfo(f"Error adding PDF files: {str(e)}")
-
+        self.import_pdfs(pdf_files)
         event.acceptProposedAction()
-        count = len(added_files)
-        tooltip(f"Added {count} PDF file(s) successfully")
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from aqt.qt import Qt, QTableWidgetItem, qconnect
+
+from ..consts import consts
+from ..forms.perf_stats import Ui_Dialog
+from ..perf import bucket_labels, stats
+from .dialog import Dialog
+
+
+class PerfStatsDialog(Dialog):
+    """Shows the timings of the add-on's hot paths recorded since startup."""
+
+    def setup_ui(self) -> None:
+        super().setup_ui()
+        self.form = Ui_Dialog()
+        self.form.setupUi(self)
+        self.setWindowTitle(f"{consts.name} - Performance Stats")
+        qconnect(self.form.refresh.clicked, self.refresh)
+        qconnect(self.form.reset.clicked, self.on_reset)
+        qconnect(self.form.close.clicked, self.reject)
+        self.refresh()
+
+    def refresh(self) -> None:
+        summaries = stats.summaries()
+        if not stats.enabled:
+            self.form.status.setText(
+                "Performance stats are off. Enable performance_stats in the "
+                "add-on's config and restart Anki to record them."
+            )
+        else:
+            self.form.status.setText(
+                f"{len(summaries)} operation(s) timed. Percentiles and the "
+                "histogram in each row's tooltip cover the latest calls."
+            )
+        labels = bucket_labels()
+        table = self.form.timings
+        table.setSortingEnabled(False)
+        table.setRowCount(len(summaries))
+        for row, summary in enumerate(summaries):
+            tooltip = "\n".join(
+                f"{label}: {count}"
+                for label, count in zip(labels, summary.buckets)
+                if count
+            )
+            for column, value in enumerate(
+                (
+                    summary.name,
+                    summary.calls,
+                    round(summary.mean_ms, 1),
+                    round(summary.p50_ms, 1),
+                    round(summary.p95_ms, 1),
+                    round(summary.max_ms, 1),
+                )
+            ):
+                item = QTableWidgetItem()
+                item.setData(Qt.ItemDataRole.DisplayRole, value)
+                item.setToolTip(tooltip)
+                table.setItem(row, column, item)
+        table.setSortingEnabled(True)
+        table.resizeColumnsToContents()
+
+    def on_reset(self) -> None:
+        stats.reset()
+        self.refresh()
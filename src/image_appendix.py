@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import os
+import re
+from collections.abc import Collection as Container
+from collections.abc import Sequence
+from re import Match
+from typing import Callable
+
+from anki.collection import Collection, OpChangesWithCount
+from anki.notes import Note, NoteId
+
+from .appendix_tracker import max_appendix_number_in_field
+from .bulk import ProgressCallback, update_notes_in_chunks
+from .integrity import APPENDIX_LINK_RE, HREF_RE
+
+APPENDIX_ANCHOR_RE = re.compile(
+    APPENDIX_LINK_RE.pattern + r".*?</a>", re.IGNORECASE | re.DOTALL
+)
+IMG_OR_APPENDIX_RE = re.compile(
+    rf"(?P<appendix>{APPENDIX_ANCHOR_RE.pattern})|(?P<img><img\b[^>]*>)",
+    re.IGNORECASE | re.DOTALL,
+)
+SRC_RE = re.compile(r"""\bsrc=(["'])(.*?)\1""", re.IGNORECASE)
+
+
+def appendix_link_html(src: str, number: int) -> str:
+    """Return the markup of an appendix link to the (URL-quoted) media file."""
+    return (
+        f'<a href="{src}" class="appendix-link">'
+        f"🔗Appendix {number}"
+        f'<img src="{src}" style="display: none;"></a>'
+    )
+
+
+def _is_local(src: str) -> bool:
+    return bool(src) and "://" not in src and not src.startswith("data:")
+
+
+def images_to_appendices(html: str, next_number: Callable[[], int]) -> str:
+    """Replace inline images with appendix links, leaving existing links alone."""
+    if "<img" not in html.lower():
+        return html
+
+    def replace(match: Match[str]) -> str:
+        if match.group("appendix"):
+            return match.group(0)
+        src = SRC_RE.search(match.group("img"))
+        if not src or not _is_local(src.group(2)):
+            return match.group(0)
+        return appendix_link_html(src.group(2), next_number())
+
+    return IMG_OR_APPENDIX_RE.sub(replace, html)
+
+
+def appendices_to_images(html: str, image_extensions: Container[str]) -> str:
+    """Replace appendix links to images with the images themselves."""
+    if "appendix-link" not in html:
+        return html
+
+    def replace(match: Match[str]) -> str:
+        href = HREF_RE.search(match.group(0))
+        if not href:
+            return match.group(0)
+        src = href.group(2).split("?", 1)[0]
+        ext = os.path.splitext(src)[1][1:].lower()
+        if not _is_local(src) or ext not in image_extensions:
+            return match.group(0)
+        return f'<img src="{src}">'
+
+    return APPENDIX_ANCHOR_RE.sub(replace, html)
+
+
+def convert_note(
+    note: Note,
+    field_name: str | None,
+    to_appendices: bool,
+    image_extensions: Container[str],
+) -> bool:
+    """
+    Convert the images of the note's fields (or only `field_name`) to appendix
+    links, numbered after the note's existing appendices, or back. Returns
+    whether the note changed.
+    """
+    ords = [
+        i
+        for i, name in enumerate(note.keys())
+        if field_name is None or name == field_name
+    ]
+    number = 0
+    if to_appendices:
+        number = max(map(max_appendix_number_in_field, note.fields), default=0)
+
+    def next_number() -> int:
+        nonlocal number
+        number += 1
+        return number
+
+    changed = False
+    for i in ords:
+        html = note.fields[i]
+        if to_appendices:
+            new_html = images_to_appendices(html, next_number)
+        else:
+            new_html = appendices_to_images(html, image_extensions)
+        if new_html != html:
+            note.fields[i] = new_html
+            changed = True
+    return changed
+
+
+def convert_images(  # noqa: PLR0913
+    col: Collection,
+    note_ids: Sequence[NoteId],
+    field_name: str | None,
+    to_appendices: bool,
+    image_extensions: Container[str],
+    *,
+    progress: ProgressCallback | None = None,
+) -> OpChangesWithCount:
+    """Convert images to appendix links or back in the given notes."""
+    return update_notes_in_chunks(
+        col,
+        note_ids,
+        "Convert Images to Appendices"
+        if to_appendices
+        else "Convert Appendices to Images",
+        lambda note: convert_note(note, field_name, to_appendices, image_extensions),
+        progress,
+    )
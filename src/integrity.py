@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import os
+import re
+import urllib.parse
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable
+
+from .media_refs import extract_references
+from .pdf_meta import PdfMetadataCache
+
+if TYPE_CHECKING:
+    from anki.collection import Collection
+
+# Number of notes read from the collection per query
+CHECK_CHUNK_SIZE = 1000
+
+PROBLEM_MISSING_FILE = "Missing file"
+PROBLEM_PAGE_OUT_OF_RANGE = "Page out of range"
+PROBLEM_UNUSED_PDF = "Unused PDF"
+
+APPENDIX_LINK_RE = re.compile(
+    r"""<a\b[^>]*\bclass=(?P<quote>["'])[^"']*\bappendix-link\b[^"']*(?P=quote)"""
+    r"[^>]*>",
+    re.IGNORECASE,
+)
+HREF_RE = re.compile(r"""\bhref=(["'])(.*?)\1""", re.IGNORECASE)
+PAGE_PARAM_RE = re.compile(r"[?&]page=(\d+)")
+
+
+@dataclass
+class IntegrityIssue:
+    problem: str
+    file: str
+    note_id: int | None = None
+    field_ord: int | None = None
+    details: str = ""
+
+
+def iter_appendix_links(html: str) -> Iterator[tuple[str, int | None]]:
+    """Yield the target file and page of each appendix link in the field."""
+    for link in APPENDIX_LINK_RE.finditer(html):
+        href = HREF_RE.search(link.group(0))
+        if not href or "://" in href.group(2):
+            continue
+        target, _, query = href.group(2).partition("?")
+        page = PAGE_PARAM_RE.search(f"?{query}") if query else None
+        yield urllib.parse.unquote(target), int(page.group(1)) if page else None
+
+
+class IntegrityChecker:
+    """
+    Checks appendix links against the media folder.
+
+    Notes are read from the collection in chunks of ids, and only the fields
+    linking to appendices or PDFs are parsed, so the whole collection is never
+    held in memory. Missing files are looked up once per file, and page counts
+    come from the persistent metadata cache.
+    """
+
+    def __init__(
+        self,
+        media_dir: str,
+        pdf_names: Iterable[str],
+        pdf_metadata: PdfMetadataCache,
+    ) -> None:
+        self.media_dir = media_dir
+        self.pdf_names = list(pdf_names)
+        self.pdf_metadata = pdf_metadata
+        self.used: set[str] = set()
+        self.checked_notes = 0
+        self._exists: dict[str, bool] = {}
+
+    def _file_exists(self, name: str) -> bool:
+        exists = self._exists.get(name)
+        if exists is None:
+            exists = self._exists[name] = os.path.isfile(
+                os.path.join(self.media_dir, name)
+            )
+        return exists
+
+    def check_field(self, note_id: int, ord: int, html: str) -> list[IntegrityIssue]:
+        issues: list[IntegrityIssue] = []
+        if "appendix-link" in html:
+            for name, page in iter_appendix_links(html):
+                self.used.add(name)
+                if not self._file_exists(name):
+                    issues.append(
+                        IntegrityIssue(PROBLEM_MISSING_FILE, name, note_id, ord)
+                    )
+                    continue
+                if page is None or not name.lower().endswith(".pdf"):
+                    continue
+                page_count = self.pdf_metadata.page_count(name)
+                if page_count is not None and page > page_count:
+                    issues.append(
+                        IntegrityIssue(
+                            PROBLEM_PAGE_OUT_OF_RANGE,
+                            name,
+                            note_id,
+                            ord,
+                            f"Page {page} of {page_count}",
+                        )
+                    )
+        if ".pdf" in html.lower():
+            self.used.update(extract_references(html))
+        return issues
+
+    def check_note(self, note_id: int, flds: str) -> list[IntegrityIssue]:
+        self.checked_notes += 1
+        issues: list[IntegrityIssue] = []
+        for ord, html in enumerate(flds.split("\x1f")):
+            issues.extend(self.check_field(note_id, ord, html))
+        return issues
+
+    def unused_pdfs(self) -> list[IntegrityIssue]:
+        return [
+            IntegrityIssue(PROBLEM_UNUSED_PDF, name)
+            for name in self.pdf_names
+            if name not in self.used
+        ]
+
+    def run(
+        self,
+        col: Collection,
+        on_issues: Callable[[list[IntegrityIssue]], None],
+        cancelled: Callable[[], bool] = lambda: False,
+    ) -> bool:
+        """
+        Check all notes, passing the issues of each chunk to `on_issues` as they
+        are found, then the unused PDFs. Returns False if cancelled.
+        """
+        last_id = 0
+        while not cancelled():
+            rows = col.db.all(
+                "select id, flds from notes where id > ? and "
+                "(flds like '%appendix-link%' or flds like '%.pdf%') "
+                "order by id limit ?",
+                last_id,
+                CHECK_CHUNK_SIZE,
+            )
+            if not rows:
+                on_issues(self.unused_pdfs())
+                return True
+            issues: list[IntegrityIssue] = []
+            for note_id, flds in rows:
+                issues.extend(self.check_note(note_id, flds))
+            on_issues(issues)
+            last_id = rows[-1][0]
+        return False
@@ -6,10 +6,15 @@ from .patches import patch_certifi
 patch_certifi()
 
 # ruff: noqa: E402
-from . import editor, web
+from . import browser, editor, media_refs_hooks, web
+from .config import config
 from .consts import consts
 from .errors import setup_error_handler
+from .gui.integrity_check import IntegrityCheckDialog
 from .gui.notetypes import NotetypesDialog
+from .gui.perf_stats import PerfStatsDialog
+from .log import logger
+from .perf import TimingSummary, stats
 
 
 def open_notetypes_dialog() -> None:
@@ -17,16 +22,45 @@ def open_notetypes_dialog() -> None:
     dialog.open()
 
 
+def open_integrity_check_dialog() -> None:
+    dialog = IntegrityCheckDialog(mw)
+    dialog.open()
+
+
+def open_perf_stats_dialog() -> None:
+    dialog = PerfStatsDialog(mw)
+    dialog.open()
+
+
+def log_perf_summaries(summaries: list[TimingSummary]) -> None:
+    for summary in summaries:
+        logger.info(summary.format())
+
+
+def init_perf_stats() -> None:
+    stats.enabled = config["performance_stats"]
+    stats.on_summary = log_perf_summaries
+
+
 def add_menu() -> None:
     menu = QMenu(consts.name, mw)
     notetypes_action = QAction("Manage Notetypes", mw)
     menu.addAction(notetypes_action)
+    integrity_check_action = QAction("Check Appendices", mw)
+    menu.addAction(integrity_check_action)
+    perf_stats_action = QAction("Performance Stats", mw)
+    menu.addAction(perf_stats_action)
     mw.form.menuTools.addMenu(menu)
     qconnect(notetypes_action.triggered, open_notetypes_dialog)
+    qconnect(integrity_check_action.triggered, open_integrity_check_dialog)
+    qconnect(perf_stats_action.triggered, open_perf_stats_dialog)
 
 
 def init() -> None:
     setup_error_handler()
+    init_perf_stats()
     editor.init_hooks()
     web.init_hooks()
+    browser.init_hooks()
+    media_refs_hooks.init_hooks()
     add_menu()
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import sqlite3
+import threading
+import urllib.parse
+from collections.abc import Iterable, Iterator, Sequence
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, cast
+
+if TYPE_CHECKING:
+    from anki.collection import Collection
+    from anki.notes import NoteId
+
+SCHEMA = """
+create table if not exists refs (
+    file text not null,
+    nid integer not null,
+    ord integer not null,
+    primary key (file, nid, ord)
+) without rowid;
+create index if not exists ix_refs_nid on refs (nid);
+create table if not exists notes (
+    nid integer primary key,
+    mod integer not null
+);
+create table if not exists meta (
+    key text primary key,
+    value integer not null
+);
+"""
+
+# Number of notes read from the collection per query when catching up
+CATCH_UP_CHUNK_SIZE = 1000
+
+# id, mod, usn, flds
+NoteRow = tuple[int, int, int, str]
+
+REFERENCE_RE = re.compile(r"""(?:href|src)=(["'])(.*?)\1""", re.IGNORECASE)
+
+
+def extract_references(html: str) -> set[str]:
+    """Return the media files linked from href/src attributes of the field."""
+    files: set[str] = set()
+    if "href=" not in html and "src=" not in html:
+        return files
+    for match in REFERENCE_RE.finditer(html):
+        target = match.group(2)
+        if not target or "://" in target or target.startswith(("data:", "#")):
+            continue
+        target = target.split("?", 1)[0].split("#", 1)[0]
+        if target:
+            files.add(urllib.parse.unquote(target))
+    return files
+
+
+class MediaRefIndex:
+    """
+    Sidecar index mapping media files to the notes and fields linking to them.
+
+    It is kept in a SQLite database in the add-on's user files instead of in
+    the collection, and brought up to date by `catch_up()`, which only reads
+    the notes that changed since it last ran.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.executescript(SCHEMA)
+
+    @staticmethod
+    def path_for_collection(col_path: str, user_files: Path) -> Path:
+        digest = hashlib.sha1(col_path.encode("utf-8")).hexdigest()[:16]
+        return user_files / "media_refs" / f"{digest}.sqlite"
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _get_meta(self, key: str, default: int) -> int:
+        row = self._db.execute(
+            "select value from meta where key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key: str, value: int) -> None:
+        self._db.execute(
+            "insert or replace into meta (key, value) values (?, ?)", (key, value)
+        )
+
+    @property
+    def built(self) -> bool:
+        with self._lock:
+            return bool(self._get_meta("built", 0))
+
+    @staticmethod
+    def _read_notes(col: Collection, nids: Sequence[int]) -> Iterator[list[NoteRow]]:
+        for start in range(0, len(nids), CATCH_UP_CHUNK_SIZE):
+            ids = ",".join(map(str, nids[start : start + CATCH_UP_CHUNK_SIZE]))
+            yield cast(
+                "list[NoteRow]",
+                col.db.all(f"select id, mod, usn, flds from notes where id in ({ids})"),
+            )
+
+    def _changed_since_marks(
+        self, col: Collection, mod_mark: int, usn_mark: int
+    ) -> Iterator[list[NoteRow]]:
+        """
+        Return the notes changed locally since the newest indexed modification
+        time, and the notes that arrived from a sync since the newest indexed
+        usn. Both conditions are looked up through the collection's usn index,
+        since local changes have a usn of -1 until they are synced.
+        Modification times are in seconds, so notes from the same second as the
+        mark are looked at again, and skipped if already indexed.
+        """
+        candidates = col.db.all(
+            "select id, mod from notes where (usn = -1 and mod >= ?) or usn > ?",
+            mod_mark,
+            usn_mark,
+        )
+        with self._lock:
+            changed = [
+                nid
+                for nid, mod in candidates
+                if self._db.execute(
+                    "select 1 from notes where nid = ? and mod = ?", (nid, mod)
+                ).fetchone()
+                is None
+            ]
+        yield from self._read_notes(col, changed)
+
+    def _changed_since_indexed(self, col: Collection) -> Iterator[list[NoteRow]]:
+        """
+        Compare the modification time of every note with the indexed one. Unlike
+        the mark, this catches notes restored by undo or with an old modification
+        time from a sync, and notes deleted without going through `remove_notes()`.
+        """
+        with self._lock:
+            indexed = dict(self._db.execute("select nid, mod from notes").fetchall())
+        changed: list[int] = []
+        for nid, mod in col.db.all("select id, mod from notes"):
+            if indexed.pop(nid, None) != mod:
+                changed.append(nid)
+        if indexed:
+            self.remove_notes(list(indexed))
+        yield from self._read_notes(col, changed)
+
+    def catch_up(
+        self,
+        col: Collection,
+        full: bool = False,
+        progress: Callable[[int], None] | None = None,
+    ) -> int:
+        """
+        Index notes that changed since the last call and return their number.
+
+        By default, only notes modified since the newest indexed modification time
+        or usn are looked at. With `full`, or when the index is new, every note is
+        checked against the index. Must run where the collection may be accessed,
+        e.g. in a background op.
+        """
+        full = full or not self.built
+        with self._lock:
+            mod_mark = self._get_meta("mod", -1)
+            usn_mark = self._get_meta("usn", -1)
+        if full:
+            chunks = self._changed_since_indexed(col)
+        else:
+            chunks = self._changed_since_marks(col, mod_mark, usn_mark)
+        count = 0
+        for rows in chunks:
+            with self._lock, self._db:
+                for nid, mod, usn, flds in rows:
+                    self._index_note(nid, mod, flds)
+                    mod_mark = max(mod_mark, mod)
+                    usn_mark = max(usn_mark, usn)
+                self._set_meta("mod", mod_mark)
+                self._set_meta("usn", usn_mark)
+            count += len(rows)
+            if progress:
+                progress(count)
+        with self._lock, self._db:
+            self._set_meta("built", 1)
+        return count
+
+    def _index_note(self, nid: int, mod: int, flds: str) -> None:
+        self._db.execute("delete from refs where nid = ?", (nid,))
+        self._db.executemany(
+            "insert or ignore into refs (file, nid, ord) values (?, ?, ?)",
+            (
+                (file, nid, ord)
+                for ord, field in enumerate(flds.split("\x1f"))
+                for file in extract_references(field)
+            ),
+        )
+        self._db.execute(
+            "insert or replace into notes (nid, mod) values (?, ?)", (nid, mod)
+        )
+
+    def remove_notes(self, nids: Sequence[int]) -> None:
+        with self._lock, self._db:
+            self._db.executemany(
+                "delete from refs where nid = ?", ((nid,) for nid in nids)
+            )
+            self._db.executemany(
+                "delete from notes where nid = ?", ((nid,) for nid in nids)
+            )
+
+    def notes_referencing(self, files: Sequence[str]) -> list[NoteId]:
+        with self._lock:
+            nids: set[int] = set()
+            for file in files:
+                nids.update(
+                    row[0]
+                    for row in self._db.execute(
+                        "select nid from refs where file = ?", (file,)
+                    )
+                )
+        return sorted(nids)  # type: ignore[arg-type]
+
+    def usages(self, file: str) -> list[tuple[NoteId, int]]:
+        """Return the (note id, field ordinal) pairs linking to the file."""
+        with self._lock:
+            return [
+                (row[0], row[1])
+                for row in self._db.execute(
+                    "select nid, ord from refs where file = ? order by nid, ord",
+                    (file,),
+                )
+            ]
+
+    def usage_counts(self, files: Iterable[str] | None = None) -> dict[str, int]:
+        """Return the number of notes linking to each file."""
+        with self._lock:
+            counts = dict(
+                self._db.execute(
+                    "select file, count(distinct nid) from refs group by file"
+                ).fetchall()
+            )
+        if files is None:
+            return counts
+        return {file: counts.get(file, 0) for file in files}
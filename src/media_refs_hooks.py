@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import Any, Callable
+
+from anki import hooks
+from anki.collection import Collection, OpChanges
+from anki.notes import NoteId
+from aqt import gui_hooks, mw
+from aqt.operations import QueryOp
+from aqt.qt import QTimer, qconnect
+
+from .consts import consts
+from .log import logger
+from .media_refs import MediaRefIndex
+
+# Delay between a note change and the catch-up, so that saves made while typing
+# in the editor are indexed together
+CATCH_UP_DEBOUNCE_MS = 1000
+
+_index: MediaRefIndex | None = None
+_catch_up_timer: QTimer | None = None
+_catching_up = False
+# Set when a catch-up is requested while one is running, to run another one after it
+_pending_full: bool | None = None
+# Callbacks of the requests waiting for that catch-up
+_pending_callbacks: list[Callable[[], None]] = []
+
+
+def get_media_ref_index() -> MediaRefIndex | None:
+    """Return the media reference index of the open collection."""
+    return _index
+
+
+def catch_up_in_background(
+    full: bool = False, on_done: Callable[[], None] | None = None
+) -> None:
+    """
+    Bring the index up to date without blocking the UI, then call `on_done`.
+    If a catch-up is already running, another one is run after it, so changes
+    made in the meantime are indexed before `on_done` is called.
+    """
+    global _pending_full
+
+    if _index is None:
+        return
+    if _catching_up:
+        _pending_full = bool(_pending_full) or full
+        if on_done:
+            _pending_callbacks.append(on_done)
+        return
+    _run_catch_up(full, [on_done] if on_done else [])
+
+
+def _run_catch_up(full: bool, callbacks: list[Callable[[], None]]) -> None:
+    global _catching_up
+
+    index = _index
+    if index is None:
+        return
+    _catching_up = True
+
+    def finish() -> None:
+        global _catching_up, _pending_full, _pending_callbacks
+
+        _catching_up = False
+        if _pending_full is not None:
+            pending_full, _pending_full = _pending_full, None
+            pending_callbacks, _pending_callbacks = _pending_callbacks, []
+            _run_catch_up(pending_full, pending_callbacks)
+        for callback in callbacks:
+            callback()
+
+    def on_success(count: int) -> None:
+        if count:
+            logger.debug("Indexed media references of %d note(s)", count)
+        finish()
+
+    def on_failure(exc: Exception) -> None:
+        logger.error("Failed to update media reference index: %s", exc)
+        finish()
+
+    QueryOp(
+        parent=mw,
+        op=lambda col: index.catch_up(col, full=full),
+        success=on_success,
+    ).failure(on_failure).run_in_background()
+
+
+def _on_profile_did_open() -> None:
+    global _index
+
+    _index = MediaRefIndex(
+        MediaRefIndex.path_for_collection(mw.col.path, consts.dir / "user_files")
+    )
+    catch_up_in_background(full=True)
+
+
+def _on_profile_will_close() -> None:
+    global _index, _pending_full, _pending_callbacks
+
+    if _index is not None:
+        _index.close()
+        _index = None
+    _pending_full = None
+    _pending_callbacks = []
+
+
+def _on_operation_did_execute(changes: OpChanges, handler: Any | None) -> None:
+    global _catch_up_timer
+
+    if not changes.note_text or _index is None:
+        return
+    if _catch_up_timer is None:
+        _catch_up_timer = QTimer(mw)
+        _catch_up_timer.setSingleShot(True)
+        _catch_up_timer.setInterval(CATCH_UP_DEBOUNCE_MS)
+        qconnect(_catch_up_timer.timeout, catch_up_in_background)
+    _catch_up_timer.start()
+
+
+def _on_state_did_undo(changes: Any) -> None:
+    # Undo restores notes along with their old modification times
+    catch_up_in_background(full=True)
+
+
+def _on_sync_did_finish() -> None:
+    catch_up_in_background(full=True)
+
+
+def _on_notes_will_be_deleted(col: Collection, ids: Sequence[NoteId]) -> None:
+    if _index is not None:
+        _index.remove_notes(ids)
+
+
+def init_hooks() -> None:
+    gui_hooks.profile_did_open.append(_on_profile_did_open)
+    gui_hooks.profile_will_close.append(_on_profile_will_close)
+    gui_hooks.operation_did_execute.append(_on_operation_did_execute)
+    gui_hooks.state_did_undo.append(_on_state_did_undo)
+    gui_hooks.sync_did_finish.append(_on_sync_did_finish)
+    hooks.notes_will_be_deleted.append(_on_notes_will_be_deleted)
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from collections import defaultdict
+from collections.abc import Iterable
+from typing import Callable
+
+from .pdf_index import PdfEntry
+
+HASH_BUFFER_SIZE = 1024 * 1024
+
+
+def hash_file(path: str) -> str:
+    hasher = hashlib.sha1()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_BUFFER_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def ensure_hash(entry: PdfEntry, media_dir: str) -> str:
+    if not entry.sha1:
+        entry.sha1 = hash_file(os.path.join(media_dir, entry.name))
+    return entry.sha1
+
+
+class DuplicateFinder:
+    """
+    Looks up files of the media folder with the same contents as a given file.
+
+    Works on a snapshot of the PDF index, so it can be used from background
+    threads. Only files of the same size are hashed, and hashes computed along
+    the way are collected in `hashed` so they can be saved to the index.
+    """
+
+    def __init__(self, media_dir: str, entries: Iterable[PdfEntry]) -> None:
+        self.media_dir = media_dir
+        self.by_size: dict[int, list[PdfEntry]] = defaultdict(list)
+        for entry in entries:
+            self.by_size[entry.size].append(entry)
+        self.hashed: list[PdfEntry] = []
+
+    def find(self, path: str) -> str | None:
+        """Return the name of an existing file identical to `path`, if any."""
+        candidates = self.by_size.get(os.path.getsize(path))
+        if not candidates:
+            return None
+        digest = hash_file(path)
+        for entry in candidates:
+            if not entry.sha1:
+                try:
+                    ensure_hash(entry, self.media_dir)
+                except OSError:
+                    continue
+                self.hashed.append(entry)
+            if entry.sha1 == digest:
+                return entry.name
+        return None
+
+
+def find_duplicate_groups(
+    media_dir: str,
+    entries: Iterable[PdfEntry],
+    progress: Callable[[int, int], None] | None = None,
+) -> tuple[list[list[PdfEntry]], list[PdfEntry]]:
+    """
+    Group identical PDFs of the media folder.
+
+    Returns the groups, each sorted so the file to keep (the oldest) comes
+    first, along with the entries that had to be hashed.
+    """
+    by_size: dict[int, list[PdfEntry]] = defaultdict(list)
+    for entry in entries:
+        by_size[entry.size].append(entry)
+    candidates = [
+        entry for group in by_size.values() if len(group) > 1 for entry in group
+    ]
+
+    hashed: list[PdfEntry] = []
+    by_hash: dict[str, list[PdfEntry]] = defaultdict(list)
+    for i, entry in enumerate(candidates):
+        if progress:
+            progress(i, len(candidates))
+        if not entry.sha1:
+            try:
+                ensure_hash(entry, media_dir)
+            except OSError:
+                continue
+            hashed.append(entry)
+        by_hash[entry.sha1].append(entry)
+
+    groups = [
+        sorted(group, key=lambda entry: (entry.mtime_ns, entry.name))
+        for group in by_hash.values()
+        if len(group) > 1
+    ]
+    groups.sort(key=lambda group: group[0].name.lower())
+    return groups, hashed
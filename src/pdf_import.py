@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable
+
+COPY_BUFFER_SIZE = 1024 * 1024
+DEFAULT_MAX_WORKERS = 4
+
+
+class ImportCancelledError(Exception):
+    pass
+
+
+@dataclass
+class ImportJob:
+    source: str
+    filename: str
+
+
+@dataclass
+class ImportResult:
+    job: ImportJob
+    error: BaseException | None = None
+    # Name of an identical file already in the media folder that was used instead
+    reused: str | None = None
+
+
+def plan_import(paths: Sequence[str]) -> list[ImportJob]:
+    """Turn source paths into jobs, keeping the first file of each name."""
+    jobs: dict[str, ImportJob] = {}
+    for path in paths:
+        filename = os.path.basename(path)
+        if filename not in jobs and os.path.isfile(path):
+            jobs[filename] = ImportJob(path, filename)
+    return list(jobs.values())
+
+
+def find_conflicts(jobs: Sequence[ImportJob], media_dir: str) -> list[ImportJob]:
+    return [
+        job for job in jobs if os.path.exists(os.path.join(media_dir, job.filename))
+    ]
+
+
+class PdfImporter:
+    """
+    Copies files into the media folder using a bounded thread pool.
+
+    `run()` blocks until all jobs are done or cancelled, so it should be called
+    from a background thread. Files are copied to a temporary name first, so a
+    cancelled or failed copy never leaves a partial file behind.
+    """
+
+    def __init__(self, media_dir: str, max_workers: int = DEFAULT_MAX_WORKERS) -> None:
+        self.media_dir = media_dir
+        self.max_workers = max_workers
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def _check_cancelled(self) -> None:
+        if self.cancelled:
+            raise ImportCancelledError()
+
+    def _import(
+        self, job: ImportJob, find_duplicate: Callable[[str], str | None] | None
+    ) -> str | None:
+        self._check_cancelled()
+        if find_duplicate:
+            existing = find_duplicate(job.source)
+            if existing:
+                return existing
+        self._copy(job)
+        return None
+
+    def _copy(self, job: ImportJob) -> None:
+        self._check_cancelled()
+        dest_path = os.path.join(self.media_dir, job.filename)
+        tmp_path = f"{dest_path}.{threading.get_ident()}.part"
+        try:
+            with open(job.source, "rb") as src, open(tmp_path, "wb") as dst:
+                while True:
+                    self._check_cancelled()
+                    chunk = src.read(COPY_BUFFER_SIZE)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+            shutil.copystat(job.source, tmp_path)
+            os.replace(tmp_path, dest_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def run(
+        self,
+        jobs: Sequence[ImportJob],
+        on_result: Callable[[ImportResult], None] | None = None,
+        find_duplicate: Callable[[str], str | None] | None = None,
+    ) -> list[ImportResult]:
+        """
+        Copy the files of `jobs`. If `find_duplicate` returns the name of an
+        existing file with the same contents as a source, that file is not copied.
+        """
+        results: list[ImportResult] = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._import, job, find_duplicate): job for job in jobs
+            }
+            for future in as_completed(futures):
+                exc = future.exception()
+                if isinstance(exc, ImportCancelledError):
+                    continue
+                reused = None if exc else future.result()
+                result = ImportResult(futures[future], exc, reused)
+                results.append(result)
+                if on_result:
+                    on_result(result)
+        return results
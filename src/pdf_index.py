@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from collections.abc import Iterable
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+# 2: entries gained the sha1 field
+INDEX_VERSION = 2
+
+
+@dataclass
+class PdfEntry:
+    name: str
+    size: int
+    mtime_ns: int
+    # SHA-1 of the contents, computed on demand. Empty if not known yet.
+    sha1: str = ""
+
+
+def is_pdf_name(filename: str) -> bool:
+    return filename.lower().endswith(".pdf")
+
+
+def get_dir_mtime(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def scan_pdfs(media_dir: str) -> tuple[int, dict[str, PdfEntry]]:
+    """
+    List the PDFs of the media folder.
+    Returns the folder's mtime as seen before scanning, together with the entries.
+    Safe to call from a background thread.
+    """
+    dir_mtime = get_dir_mtime(media_dir)
+    entries: dict[str, PdfEntry] = {}
+    with os.scandir(media_dir) as it:
+        for dir_entry in it:
+            if not is_pdf_name(dir_entry.name):
+                continue
+            try:
+                if not dir_entry.is_file():
+                    continue
+                stat = dir_entry.stat()
+            except OSError:
+                continue
+            entries[dir_entry.name] = PdfEntry(
+                dir_entry.name, stat.st_size, stat.st_mtime_ns
+            )
+    return dir_mtime, entries
+
+
+class PdfIndex:
+    """
+    Persistent list of the PDFs in a media folder.
+
+    The index is saved to disk so the PDF selector can be populated without
+    listing the media folder. It is considered stale when the folder's mtime
+    differs from the one recorded at the last scan.
+    """
+
+    def __init__(self, media_dir: str, path: Path) -> None:
+        self.media_dir = media_dir
+        self.path = path
+        self.dir_mtime = 0
+        self.entries: dict[str, PdfEntry] = {}
+        self.refreshing = False
+        self._load()
+
+    @classmethod
+    def for_media_dir(cls, media_dir: str, user_files: Path) -> PdfIndex:
+        """Return the shared index of the given media folder."""
+        index = _indexes.get(media_dir)
+        if index is None:
+            digest = hashlib.sha1(media_dir.encode("utf-8")).hexdigest()[:16]
+            index = cls(media_dir, user_files / "pdf_index" / f"{digest}.json")
+            _indexes[media_dir] = index
+        return index
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if data.get("version") != INDEX_VERSION:
+            return
+        self.dir_mtime = data["dir_mtime"]
+        self.entries = {row[0]: PdfEntry(*row) for row in data["files"]}
+
+    def save(self) -> None:
+        data = {
+            "version": INDEX_VERSION,
+            "dir_mtime": self.dir_mtime,
+            "files": [
+                [entry.name, entry.size, entry.mtime_ns, entry.sha1]
+                for entry in self.entries.values()
+            ],
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+    def names(self) -> list[str]:
+        return sorted(self.entries, key=str.lower)
+
+    def is_stale(self) -> bool:
+        return get_dir_mtime(self.media_dir) != self.dir_mtime
+
+    def apply_scan(self, dir_mtime: int, entries: dict[str, PdfEntry]) -> bool:
+        """Replace the index with a `scan_pdfs()` result. Returns whether it changed."""
+        for name, entry in entries.items():
+            old_entry = self.entries.get(name)
+            if old_entry and self._same_file(old_entry, entry.size, entry.mtime_ns):
+                entry.sha1 = old_entry.sha1
+        changed = entries != self.entries
+        self.entries = entries
+        self.dir_mtime = dir_mtime
+        self.save()
+        return changed
+
+    def refresh(self) -> bool:
+        """Rescan the media folder if it changed. Returns whether the index changed."""
+        if not self.is_stale():
+            return False
+        return self.apply_scan(*scan_pdfs(self.media_dir))
+
+    @staticmethod
+    def _same_file(entry: PdfEntry, size: int, mtime_ns: int) -> bool:
+        return entry.size == size and entry.mtime_ns == mtime_ns
+
+    def set_hashes(self, hashed: Iterable[PdfEntry]) -> None:
+        """Store hashes computed in the background for files that are unchanged."""
+        self._apply_hashes(hashed)
+        self.save()
+
+    def _apply_hashes(self, hashed: Iterable[PdfEntry]) -> None:
+        for hashed_entry in hashed:
+            entry = self.entries.get(hashed_entry.name)
+            if entry and self._same_file(
+                entry, hashed_entry.size, hashed_entry.mtime_ns
+            ):
+                entry.sha1 = hashed_entry.sha1
+
+    def snapshot(self) -> list[PdfEntry]:
+        """Return copies of the entries that can be used from another thread."""
+        return [replace(entry) for entry in self.entries.values()]
+
+    def update_files(
+        self,
+        names: Iterable[str],
+        dir_mtime_before: int,
+        hashed: Iterable[PdfEntry] = (),
+    ) -> None:
+        """
+        Add, update or drop files in place after the add-on changed them, e.g.
+        the old and new names of renamed files, and store the `hashed` hashes.
+
+        `dir_mtime_before` is the folder's mtime from before the change. The
+        folder's new mtime is only recorded if that matches the index. Otherwise
+        the folder also changed in other ways, e.g. through a sync, and the index
+        is left stale so that it is rescanned.
+        """
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(self.media_dir, name))
+            except OSError:
+                self.entries.pop(name, None)
+            else:
+                self.entries[name] = PdfEntry(name, stat.st_size, stat.st_mtime_ns)
+        self._apply_hashes(hashed)
+        if dir_mtime_before == self.dir_mtime:
+            self.dir_mtime = get_dir_mtime(self.media_dir)
+        self.save()
+
+
+_indexes: dict[str, PdfIndex] = {}
@@ -0,0 +1,741 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import threading
+import zlib
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, NamedTuple, Union
+
+PAGES_TYPE_RE = re.compile(rb"/Type\s*/Pages\b")
+COUNT_RE = re.compile(rb"/Count\s+(\d+)")
+OBJECT_STREAM_RE = re.compile(rb"/Type\s*/ObjStm\b")
+STREAM_START_RE = re.compile(rb"stream\r?\n")
+
+WHITESPACE_RE = re.compile(rb"(?:[\x00\t\n\x0c\r ]|%[^\r\n]*)*")
+NAME_RE = re.compile(rb"/([^\x00\t\n\x0c\r ()<>\[\]{}/%]*)")
+NUMBER_RE = re.compile(rb"[+-]?(?:\d+\.?\d*|\.\d+)")
+REFERENCE_RE = re.compile(rb"(\d+)\s+(\d+)\s+R\b")
+KEYWORD_RE = re.compile(rb"[A-Za-z]+")
+HEX_STRING_RE = re.compile(rb"<([0-9A-Fa-f\x00\t\n\x0c\r ]*)>")
+OBJECT_HEADER_RE = re.compile(rb"\s*(\d+)\s+(\d+)\s+obj\b")
+STARTXREF_RE = re.compile(rb"startxref\s+(\d+)")
+XREF_SUBSECTION_RE = re.compile(rb"\s*(\d+)\s+(\d+)")
+XREF_ENTRY_RE = re.compile(rb"\s*(\d{10})\s+(\d{5})\s+([nf])")
+TRAILER_RE = re.compile(rb"\s*trailer\b")
+
+STRING_ESCAPES = {
+    b"n": b"\n",
+    b"r": b"\r",
+    b"t": b"\t",
+    b"b": b"\b",
+    b"f": b"\f",
+    b"(": b"(",
+    b")": b")",
+    b"\\": b"\\",
+}
+OCTAL_DIGITS = b"01234567"
+
+# Only the end of the file is searched for the start of the cross-reference data
+STARTXREF_SEARCH_BYTES = 2048
+# Limits guarding against malformed or cyclic structures
+MAX_NESTING_DEPTH = 64
+MAX_OUTLINE_ITEMS = 2000
+
+# Shared caches, by media folder
+_caches: dict[str, PdfMetadataCache] = {}
+
+
+class PdfSyntaxError(ValueError):
+    def __init__(self, offset: int | None = None) -> None:
+        super().__init__(
+            "Unsupported PDF structure"
+            + (f" at byte {offset}" if offset is not None else "")
+        )
+        self.offset = offset
+
+
+class Reference(NamedTuple):
+    num: int
+    gen: int
+
+
+@dataclass
+class Stream:
+    dict: dict[str, Any]
+    data: bytes
+
+
+# Names are str, strings are bytes
+PdfObject = Union[None, bool, int, float, str, bytes, Reference, list, dict, Stream]
+
+
+@dataclass
+class OutlineItem:
+    title: str
+    # 1-based, or None if the bookmark does not point to a page of this file
+    page: int | None
+    level: int
+
+
+@dataclass
+class PdfMetadata:
+    page_count: int | None = None
+    title: str | None = None
+    outline: list[OutlineItem] = field(default_factory=list)
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "pages": self.page_count,
+            "title": self.title,
+            "outline": [[item.title, item.page, item.level] for item in self.outline],
+        }
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> PdfMetadata:
+        return cls(
+            data["pages"],
+            data["title"],
+            [OutlineItem(title, page, level) for title, page, level in data["outline"]],
+        )
+
+
+def _enclosing_dict(buf: bytes | mmap.mmap, pos: int) -> tuple[int, int] | None:
+    """Return the bounds of the innermost `<< ... >>` dictionary containing `pos`."""
+    depth = 0
+    i = pos
+    while i > 0:
+        pair = buf[i - 1 : i + 1]
+        if pair == b">>":
+            depth += 1
+            i -= 2
+        elif pair == b"<<":
+            if depth == 0:
+                break
+            depth -= 1
+            i -= 2
+        else:
+            i -= 1
+    else:
+        return None
+    start = i - 1
+    depth = 0
+    j = start
+    end = len(buf)
+    while j < end - 1:
+        pair = buf[j : j + 2]
+        if pair == b"<<":
+            depth += 1
+            j += 2
+        elif pair == b">>":
+            depth -= 1
+            j += 2
+            if depth == 0:
+                return start, j
+        else:
+            j += 1
+    return None
+
+
+def _page_tree_counts(buf: bytes | mmap.mmap) -> Iterator[int]:
+    for match in PAGES_TYPE_RE.finditer(buf):
+        bounds = _enclosing_dict(buf, match.start())
+        if not bounds:
+            continue
+        count = COUNT_RE.search(buf, bounds[0], bounds[1])
+        if count:
+            yield int(count.group(1))
+
+
+def _object_streams(buf: bytes | mmap.mmap) -> Iterator[bytes]:
+    """Decompress the object streams, where PDF 1.5+ files may keep the page tree."""
+    for match in OBJECT_STREAM_RE.finditer(buf):
+        stream = STREAM_START_RE.search(buf, match.end())
+        if not stream:
+            continue
+        end = buf.find(b"endstream", stream.end())
+        if end < 0:
+            continue
+        try:
+            yield zlib.decompress(buf[stream.end() : end])
+        except zlib.error:
+            continue
+
+
+def _scan_page_count(buf: bytes | mmap.mmap) -> int | None:
+    counts = list(_page_tree_counts(buf))
+    if not counts:
+        for stream in _object_streams(buf):
+            counts.extend(_page_tree_counts(stream))
+    return max(counts) if counts else None
+
+
+def read_page_count(path: str) -> int | None:
+    """
+    Return the number of pages of the PDF, or None if it cannot be determined.
+
+    The file is memory-mapped and only scanned for page tree nodes, the root of
+    which has the largest count, so large files are not read into memory.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            return _scan_page_count(buf)
+
+
+class _ObjectParser:
+    """Parses PDF objects from a buffer, starting at `pos`."""
+
+    def __init__(self, buf: bytes | mmap.mmap, pos: int = 0) -> None:
+        self.buf = buf
+        self.pos = pos
+
+    def skip_whitespace(self) -> None:
+        match = WHITESPACE_RE.match(self.buf, self.pos)
+        assert match
+        self.pos = match.end()
+
+    def parse(self, depth: int = 0) -> PdfObject:  # noqa: PLR0911
+        if depth > MAX_NESTING_DEPTH:
+            raise PdfSyntaxError(self.pos)
+        self.skip_whitespace()
+        buf, pos = self.buf, self.pos
+        head = buf[pos : pos + 2]
+        if head == b"<<":
+            return self._dictionary(depth)
+        if head[:1] == b"[":
+            return self._array(depth)
+        if head[:1] == b"(":
+            return self._literal_string()
+        if head[:1] == b"<":
+            match = HEX_STRING_RE.match(buf, pos)
+            if not match:
+                raise PdfSyntaxError(pos)
+            self.pos = match.end()
+            digits = re.sub(rb"[^0-9A-Fa-f]", b"", match.group(1))
+            return bytes.fromhex((digits + b"0" * (len(digits) % 2)).decode())
+        if head[:1] == b"/":
+            match = NAME_RE.match(buf, pos)
+            assert match
+            self.pos = match.end()
+            return _decode_name(match.group(1))
+        match = REFERENCE_RE.match(buf, pos)
+        if match:
+            self.pos = match.end()
+            return Reference(int(match.group(1)), int(match.group(2)))
+        match = NUMBER_RE.match(buf, pos)
+        if match:
+            self.pos = match.end()
+            number = match.group(0)
+            return float(number) if b"." in number else int(number)
+        match = KEYWORD_RE.match(buf, pos)
+        if match and match.group(0) in (b"true", b"false", b"null"):
+            self.pos = match.end()
+            return {b"true": True, b"false": False, b"null": None}[match.group(0)]
+        raise PdfSyntaxError(pos)
+
+    def _dictionary(self, depth: int) -> dict[str, PdfObject]:
+        self.pos += 2
+        result: dict[str, PdfObject] = {}
+        while True:
+            self.skip_whitespace()
+            if self.buf[self.pos : self.pos + 2] == b">>":
+                self.pos += 2
+                return result
+            key = self.parse(depth + 1)
+            if not isinstance(key, str):
+                raise PdfSyntaxError(self.pos)
+            result[key] = self.parse(depth + 1)
+
+    def _array(self, depth: int) -> list[PdfObject]:
+        self.pos += 1
+        result: list[PdfObject] = []
+        while True:
+            self.skip_whitespace()
+            if self.buf[self.pos : self.pos + 1] == b"]":
+                self.pos += 1
+                return result
+            result.append(self.parse(depth + 1))
+
+    def _literal_string(self) -> bytes:
+        buf = self.buf
+        i = self.pos + 1
+        depth = 1
+        result = bytearray()
+        while True:
+            char = buf[i : i + 1]
+            if not char:
+                raise PdfSyntaxError(self.pos)
+            i += 1
+            if char == b"\\":
+                escaped = buf[i : i + 1]
+                i += 1
+                if escaped in STRING_ESCAPES:
+                    result += STRING_ESCAPES[escaped]
+                elif escaped and escaped in OCTAL_DIGITS:
+                    digits = escaped
+                    while (
+                        len(digits) < 3
+                        and buf[i : i + 1]
+                        and buf[i : i + 1] in OCTAL_DIGITS
+                    ):
+                        digits += buf[i : i + 1]
+                        i += 1
+                    result.append(int(digits, 8) & 0xFF)
+                elif escaped == b"\r" and buf[i : i + 1] == b"\n":
+                    i += 1
+                elif escaped not in (b"\r", b"\n"):
+                    result += escaped
+            elif char == b"(":
+                depth += 1
+                result += char
+            elif char == b")":
+                depth -= 1
+                if depth == 0:
+                    self.pos = i
+                    return bytes(result)
+                result += char
+            else:
+                result += char
+
+
+def _decode_name(raw: bytes) -> str:
+    return re.sub(
+        rb"#([0-9A-Fa-f]{2})", lambda m: bytes([int(m.group(1), 16)]), raw
+    ).decode("latin-1")
+
+
+def _decode_text(raw: bytes) -> str:
+    """Decode a PDF text string, which is UTF-16 with a BOM or PDFDocEncoding."""
+    if raw.startswith(b"\xfe\xff"):
+        text = raw[2:].decode("utf-16-be", errors="replace")
+    elif raw.startswith(b"\xef\xbb\xbf"):
+        text = raw[3:].decode("utf-8", errors="replace")
+    else:
+        # Latin-1 matches PDFDocEncoding for the characters titles mostly use
+        text = raw.decode("latin-1")
+    return text.replace("\x00", "").strip()
+
+
+def _unpredict_png(data: bytes, columns: int) -> bytes:
+    """Undo the PNG predictors cross-reference streams are usually encoded with."""
+    result = bytearray()
+    previous = bytearray(columns)
+    for start in range(0, len(data) - columns, columns + 1):
+        predictor = data[start]
+        row = bytearray(data[start + 1 : start + 1 + columns])
+        for i in range(len(row)):
+            left = row[i - 1] if i else 0
+            up = previous[i]
+            if predictor == 1:
+                row[i] = (row[i] + left) & 0xFF
+            elif predictor == 2:  # noqa: PLR2004
+                row[i] = (row[i] + up) & 0xFF
+            elif predictor == 3:  # noqa: PLR2004
+                row[i] = (row[i] + (left + up) // 2) & 0xFF
+            elif predictor == 4:  # noqa: PLR2004
+                up_left = previous[i - 1] if i else 0
+                estimate = left + up - up_left
+                nearest = min(
+                    (abs(estimate - left), left),
+                    (abs(estimate - up), up),
+                    (abs(estimate - up_left), up_left),
+                    key=lambda pair: pair[0],
+                )[1]
+                row[i] = (row[i] + nearest) & 0xFF
+        result += row
+        previous = row
+    return bytes(result)
+
+
+class _PdfDocument:
+    """
+    Reads objects of a PDF file through its cross-reference data, so only the
+    parts of the file that are needed are touched.
+    """
+
+    def __init__(self, buf: bytes | mmap.mmap) -> None:
+        self.buf = buf
+        # Object number to (1, offset, 0) for objects in the file,
+        # (2, object stream number, index) for compressed ones, or None if free
+        self.xref: dict[int, tuple[int, int, int] | None] = {}
+        self.trailer: dict[str, PdfObject] = {}
+        self._objects: dict[int, PdfObject] = {}
+        self._object_streams: dict[int, tuple[bytes, list[int]]] = {}
+        self._read_xref()
+
+    def _read_xref(self) -> None:
+        start = self.buf.rfind(
+            b"startxref", max(0, len(self.buf) - STARTXREF_SEARCH_BYTES)
+        )
+        match = STARTXREF_RE.match(self.buf, start) if start >= 0 else None
+        if not match:
+            raise PdfSyntaxError()
+        offset: PdfObject = int(match.group(1))
+        seen: set[int] = set()
+        # Newer sections come first and take precedence over the /Prev ones
+        while isinstance(offset, int) and offset not in seen:
+            seen.add(offset)
+            trailer = self._read_xref_section(offset)
+            for key, value in trailer.items():
+                self.trailer.setdefault(key, value)
+            hybrid_offset = trailer.get("XRefStm")
+            if isinstance(hybrid_offset, int) and hybrid_offset not in seen:
+                seen.add(hybrid_offset)
+                self._read_xref_section(hybrid_offset)
+            offset = trailer.get("Prev")
+
+    def _read_xref_section(self, offset: int) -> dict[str, PdfObject]:
+        if self.buf[offset : offset + 4] == b"xref":
+            return self._read_xref_table(offset + 4)
+        return self._read_xref_stream(offset)
+
+    def _read_xref_table(self, pos: int) -> dict[str, PdfObject]:
+        while True:
+            trailer = TRAILER_RE.match(self.buf, pos)
+            if trailer:
+                parser = _ObjectParser(self.buf, trailer.end())
+                result = parser.parse()
+                if not isinstance(result, dict):
+                    raise PdfSyntaxError(trailer.end())
+                return result
+            subsection = XREF_SUBSECTION_RE.match(self.buf, pos)
+            if not subsection:
+                raise PdfSyntaxError(pos)
+            pos = subsection.end()
+            first, count = int(subsection.group(1)), int(subsection.group(2))
+            for num in range(first, first + count):
+                entry = XREF_ENTRY_RE.match(self.buf, pos)
+                if not entry:
+                    raise PdfSyntaxError(pos)
+                pos = entry.end()
+                self.xref.setdefault(
+                    num, (1, int(entry.group(1)), 0) if entry.group(3) == b"n" else None
+                )
+
+    def _read_xref_stream(self, offset: int) -> dict[str, PdfObject]:
+        stream = self._read_object_at(offset)
+        if not isinstance(stream, Stream) or stream.dict.get("Type") != "XRef":
+            raise PdfSyntaxError(offset)
+        widths = stream.dict["W"]
+        index = stream.dict.get("Index") or [0, stream.dict["Size"]]
+        data = self._decode_stream(stream)
+        entry_size = sum(widths)
+        if entry_size <= 0:
+            raise PdfSyntaxError(offset)
+        pos = 0
+        for first, count in zip(index[::2], index[1::2]):
+            for num in range(first, first + count):
+                # A bad /Size or /Index must not make us loop past the data
+                if pos + entry_size > len(data):
+                    return stream.dict
+                fields = []
+                for width in widths:
+                    fields.append(int.from_bytes(data[pos : pos + width], "big"))
+                    pos += width
+                kind = fields[0] if widths[0] else 1
+                if kind in (1, 2):
+                    self.xref.setdefault(num, (kind, fields[1], fields[2]))
+                else:
+                    self.xref.setdefault(num, None)
+        return stream.dict
+
+    def _read_object_at(self, offset: int) -> PdfObject:
+        header = OBJECT_HEADER_RE.match(self.buf, offset)
+        if not header:
+            raise PdfSyntaxError(offset)
+        parser = _ObjectParser(self.buf, header.end())
+        obj = parser.parse()
+        parser.skip_whitespace()
+        if not isinstance(obj, dict) or self.buf[parser.pos : parser.pos + 6] != (
+            b"stream"
+        ):
+            return obj
+        start = parser.pos + 6
+        if self.buf[start : start + 2] == b"\r\n":
+            start += 2
+        elif self.buf[start : start + 1] in (b"\r", b"\n"):
+            start += 1
+        length = self.resolve(obj.get("Length"))
+        if not isinstance(length, int) or (
+            self.buf[start + length : start + length + 20].lstrip()[:9] != b"endstream"
+        ):
+            length = self.buf.find(b"endstream", start) - start
+            if length < 0:
+                raise PdfSyntaxError(offset)
+        return Stream(obj, bytes(self.buf[start : start + length]))
+
+    def _decode_stream(self, stream: Stream) -> bytes:
+        filters = stream.dict.get("Filter")
+        params = self.resolve(stream.dict.get("DecodeParms"))
+        if isinstance(filters, list):
+            filters = filters[0] if len(filters) == 1 else filters
+            params = params[0] if isinstance(params, list) and params else params
+        if filters is None:
+            return stream.data
+        if filters != "FlateDecode":
+            raise PdfSyntaxError()
+        data = zlib.decompress(stream.data)
+        if isinstance(params, dict) and params.get("Predictor", 1) >= 10:  # noqa: PLR2004
+            columns = params.get("Columns", 1)
+            if not isinstance(columns, int) or columns < 1:
+                raise PdfSyntaxError()
+            data = _unpredict_png(data, columns)
+        return data
+
+    def get(self, num: int) -> PdfObject:
+        if num in self._objects:
+            return self._objects[num]
+        # Guard against objects whose lengths refer to themselves
+        self._objects[num] = None
+        entry = self.xref.get(num)
+        obj: PdfObject = None
+        if entry and entry[0] == 1:
+            obj = self._read_object_at(entry[1])
+        elif entry:
+            obj = self._read_compressed_object(entry[1], entry[2])
+        self._objects[num] = obj
+        return obj
+
+    def _read_compressed_object(self, stream_num: int, index: int) -> PdfObject:
+        if stream_num not in self._object_streams:
+            stream = self.get(stream_num)
+            if not isinstance(stream, Stream):
+                raise PdfSyntaxError()
+            data = self._decode_stream(stream)
+            first = stream.dict["First"]
+            parser = _ObjectParser(data)
+            numbers = [parser.parse() for _ in range(2 * stream.dict["N"])]
+            relative_offsets = [
+                offset for offset in numbers[1::2] if isinstance(offset, int)
+            ]
+            if not isinstance(first, int) or len(relative_offsets) != len(
+                numbers[1::2]
+            ):
+                raise PdfSyntaxError()
+            self._object_streams[stream_num] = (
+                data,
+                [first + offset for offset in relative_offsets],
+            )
+        data, offsets = self._object_streams[stream_num]
+        if not 0 <= index < len(offsets):
+            raise PdfSyntaxError()
+        return _ObjectParser(data, offsets[index]).parse()
+
+    def resolve(self, obj: PdfObject) -> PdfObject:
+        for _ in range(MAX_NESTING_DEPTH):
+            if not isinstance(obj, Reference):
+                return obj
+            obj = self.get(obj.num)
+        raise PdfSyntaxError()
+
+    def _resolve_dict(self, obj: PdfObject) -> dict[str, PdfObject]:
+        obj = self.resolve(obj)
+        if isinstance(obj, Stream):
+            return obj.dict
+        return obj if isinstance(obj, dict) else {}
+
+    def metadata(self) -> PdfMetadata:
+        root = self._resolve_dict(self.trailer.get("Root"))
+        pages = self._resolve_dict(root.get("Pages"))
+        page_count = self.resolve(pages.get("Count"))
+        title = self.resolve(self._resolve_dict(self.trailer.get("Info")).get("Title"))
+        return PdfMetadata(
+            page_count if isinstance(page_count, int) else None,
+            (_decode_text(title) or None) if isinstance(title, bytes) else None,
+            self._outline(root, pages),
+        )
+
+    def _page_numbers(self, pages: dict[str, PdfObject]) -> dict[int, int]:
+        """Map the object numbers of the pages to their 1-based page numbers."""
+        numbers: dict[int, int] = {}
+        visited: set[int] = set()
+        kids = self.resolve(pages.get("Kids"))
+        stack = list(reversed(kids)) if isinstance(kids, list) else []
+        while stack:
+            ref = stack.pop()
+            if not isinstance(ref, Reference) or ref.num in visited:
+                continue
+            visited.add(ref.num)
+            node = self._resolve_dict(ref)
+            kids = self.resolve(node.get("Kids"))
+            if isinstance(kids, list):
+                stack.extend(reversed(kids))
+            else:
+                numbers[ref.num] = len(numbers) + 1
+        return numbers
+
+    def _named_destinations(self, root: dict[str, PdfObject]) -> dict[Any, PdfObject]:
+        """Return the destinations named in the catalog and its name tree."""
+        named: dict[Any, PdfObject] = dict(self._resolve_dict(root.get("Dests")))
+        names = self._resolve_dict(root.get("Names"))
+        stack: list[PdfObject] = [names.get("Dests")]
+        visited: set[int] = set()
+        while stack:
+            ref = stack.pop()
+            if isinstance(ref, Reference):
+                if ref.num in visited:
+                    continue
+                visited.add(ref.num)
+            node = self._resolve_dict(ref)
+            pairs = self.resolve(node.get("Names"))
+            if isinstance(pairs, list):
+                named.update(zip(pairs[::2], pairs[1::2]))
+            kids = self.resolve(node.get("Kids"))
+            if isinstance(kids, list):
+                stack.extend(kids)
+        return named
+
+    def _outline(
+        self, root: dict[str, PdfObject], pages: dict[str, PdfObject]
+    ) -> list[OutlineItem]:
+        outlines = self._resolve_dict(root.get("Outlines"))
+        if not isinstance(outlines.get("First"), Reference):
+            return []
+        page_numbers = self._page_numbers(pages)
+        named: dict[Any, PdfObject] | None = None
+        items: list[OutlineItem] = []
+        visited: set[int] = set()
+        stack: list[tuple[PdfObject, int]] = [(outlines.get("First"), 0)]
+        while stack and len(items) < MAX_OUTLINE_ITEMS:
+            ref, level = stack.pop()
+            if not isinstance(ref, Reference) or ref.num in visited:
+                continue
+            visited.add(ref.num)
+            item = self._resolve_dict(ref)
+            # Children are listed before the next sibling
+            stack.append((item.get("Next"), level))
+            stack.append((item.get("First"), level + 1))
+            dest = self.resolve(item.get("Dest"))
+            if dest is None:
+                action = self._resolve_dict(item.get("A"))
+                if action.get("S") == "GoTo":
+                    dest = self.resolve(action.get("D"))
+            if isinstance(dest, (str, bytes)):
+                if named is None:
+                    named = self._named_destinations(root)
+                dest = self.resolve(named.get(dest))
+            if isinstance(dest, dict):
+                dest = self.resolve(dest.get("D"))
+            page = None
+            if isinstance(dest, list) and dest and isinstance(dest[0], Reference):
+                page = page_numbers.get(dest[0].num)
+            title = self.resolve(item.get("Title"))
+            items.append(
+                OutlineItem(
+                    _decode_text(title) if isinstance(title, bytes) else "",
+                    page,
+                    level,
+                )
+            )
+        return items
+
+
+def read_pdf_metadata(path: str) -> PdfMetadata | None:
+    """
+    Return the page count, title and outline of the PDF, or None if it is empty.
+
+    The file is memory-mapped and read through its cross-reference data, so
+    only the catalog, the page tree and the bookmarks are touched. Files whose
+    cross-reference data is broken fall back to scanning for the page count.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            try:
+                metadata = _PdfDocument(buf).metadata()
+            except (ValueError, LookupError, TypeError, zlib.error):
+                metadata = PdfMetadata()
+            if metadata.page_count is None:
+                metadata.page_count = _scan_page_count(buf)
+    return metadata
+
+
+class PdfMetadataCache:
+    """Metadata of media files, persisted and keyed by name, size and mtime."""
+
+    def __init__(self, media_dir: str, path: Path) -> None:
+        self.media_dir = media_dir
+        self.path = path
+        self.entries: dict[str, tuple[int, int, PdfMetadata | None]] = {}
+        self.dirty = False
+        # The cache is shared by the PDF selector and the integrity check
+        self.lock = threading.Lock()
+        self.load()
+
+    @classmethod
+    def for_media_dir(cls, media_dir: str, user_files: Path) -> PdfMetadataCache:
+        """Return the shared cache of the given media folder."""
+        cache = _caches.get(media_dir)
+        if cache is None:
+            digest = hashlib.sha1(media_dir.encode("utf-8")).hexdigest()[:16]
+            cache = cls(media_dir, user_files / "pdf_metadata" / f"{digest}.json")
+            _caches[media_dir] = cache
+        return cache
+
+    def load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if data.get("version") != 1:
+            return
+        self.entries = {
+            name: (
+                size,
+                mtime_ns,
+                PdfMetadata.from_json(metadata) if metadata is not None else None,
+            )
+            for name, (size, mtime_ns, metadata) in data["files"].items()
+        }
+
+    def save(self) -> None:
+        with self.lock:
+            if not self.dirty:
+                return
+            files = {
+                name: (
+                    size,
+                    mtime_ns,
+                    metadata.to_json() if metadata is not None else None,
+                )
+                for name, (size, mtime_ns, metadata) in self.entries.items()
+            }
+            self.dirty = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps({"version": 1, "files": files}), encoding="utf-8"
+        )
+        os.replace(tmp_path, self.path)
+
+    def get(self, name: str) -> PdfMetadata | None:
+        """Return the metadata of the file, reading it only if it changed."""
+        path = os.path.join(self.media_dir, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        with self.lock:
+            cached = self.entries.get(name)
+        if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+            return cached[2]
+        try:
+            metadata = read_pdf_metadata(path)
+        except (OSError, ValueError):
+            metadata = None
+        with self.lock:
+            self.entries[name] = (stat.st_size, stat.st_mtime_ns, metadata)
+            self.dirty = True
+        return metadata
+
+    def page_count(self, name: str) -> int | None:
+        metadata = self.get(name)
+        return metadata.page_count if metadata else None
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+
+# Match tiers, best first
+TIER_PREFIX = 0
+TIER_WORD = 1
+TIER_SUBSTRING = 2
+TIER_FUZZY = 3
+
+WORD_SEPARATORS = " _-.()[]"
+
+
+def fuzzy_regex(query: str) -> re.Pattern[str]:
+    """Match the characters of the query in order, with anything in between."""
+    return re.compile(".*?".join(re.escape(c) for c in query), re.DOTALL)
+
+
+class PdfSearchEngine:
+    """
+    Ranked filename search over a fixed list of names.
+
+    Names are lowercased once, and a query that contains the previous one only
+    searches the previous results. Names that contain the query's characters in
+    order but not the query itself are included as fuzzy matches after all
+    substring matches.
+    """
+
+    def __init__(self, names: list[str]) -> None:
+        self.names = names
+        self.lowered = [name.lower() for name in names]
+        self._last_query = ""
+        self._last_results: list[int] = list(range(len(names)))
+
+    @staticmethod
+    def _rank_substring(name: str, query: str, pos: int) -> int:
+        if pos == 0:
+            return TIER_PREFIX
+        while pos > 0:
+            if name[pos - 1] in WORD_SEPARATORS:
+                return TIER_WORD
+            pos = name.find(query, pos + 1)
+        return TIER_SUBSTRING
+
+    def search(self, query: str) -> list[int]:
+        """Return the indexes of the names matching the query, best matches first."""
+        query = query.lower()
+        if not query:
+            self._last_query = ""
+            self._last_results = list(range(len(self.names)))
+            return self._last_results
+
+        narrowing = bool(self._last_query) and self._last_query in query
+        pool: Iterable[int] = (
+            self._last_results if narrowing else range(len(self.names))
+        )
+        regex = fuzzy_regex(query)
+        ranked: list[tuple[int, int, int, str, int]] = []
+        for i in pool:
+            name = self.lowered[i]
+            pos = name.find(query)
+            if pos >= 0:
+                tier = self._rank_substring(name, query, pos)
+                ranked.append((tier, pos, len(name), name, i))
+                continue
+            match = regex.search(name)
+            if match:
+                span = match.end() - match.start()
+                ranked.append((TIER_FUZZY, span, len(name), name, i))
+        ranked.sort()
+
+        self._last_query = query
+        self._last_results = [item[-1] for item in ranked]
+        return self._last_results
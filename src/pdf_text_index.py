@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from collections.abc import Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from .pdf_index import PdfEntry
+
+SCHEMA = """
+create table if not exists files (
+    name text primary key,
+    size integer not null,
+    mtime_ns integer not null
+);
+create virtual table if not exists pages using fts5 (
+    name unindexed,
+    page unindexed,
+    text,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+-- Unindexed FTS5 columns cannot be searched without a full scan, so the pages
+-- of each file are found by rowid through this table
+create table if not exists page_rows (
+    name text not null,
+    page_rowid integer not null,
+    primary key (name, page_rowid)
+) without rowid;
+"""
+# Stored in the database's user_version; older databases are rebuilt
+SCHEMA_VERSION = 1
+
+SEARCH_LIMIT = 100
+SNIPPET_TOKENS = 12
+SEARCH_TERM_RE = re.compile(r"\w+")
+
+# Returns the text of each page of a PDF, or None if it cannot be read
+TextExtractor = Callable[[str], "list[str] | None"]
+
+# Shared indexes, by media folder
+_indexes: dict[str, PdfTextIndex] = {}
+
+
+@dataclass
+class TextMatch:
+    name: str
+    # 1-based
+    page: int
+    snippet: str
+
+
+def extract_page_texts(path: str) -> list[str] | None:
+    """
+    Return the text of each page of the PDF, using Qt's PDF module.
+    Safe to call from a background thread.
+    """
+    from PyQt6.QtPdf import QPdfDocument  # noqa: PLC0415
+
+    document = QPdfDocument(None)
+    try:
+        if document.load(path) != QPdfDocument.Error.None_:
+            return None
+        return [
+            document.getAllText(page).text() for page in range(document.pageCount())
+        ]
+    finally:
+        document.close()
+
+
+def build_match_query(text: str) -> str:
+    """
+    Turn search text into an FTS5 query matching pages that contain all words,
+    the last one as a prefix, since it may still be being typed.
+    """
+    terms = SEARCH_TERM_RE.findall(text)
+    if not terms:
+        return ""
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+class PdfTextIndex:
+    """
+    Full-text index of the pages of the media folder's PDFs.
+
+    It is kept in a SQLite FTS5 database in the add-on's user files. `update()`
+    only extracts the text of PDFs whose size or mtime changed since they were
+    indexed, and commits after each file, so an interrupted run resumes where
+    it stopped.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        (version,) = self._db.execute("pragma user_version").fetchone()
+        if version != SCHEMA_VERSION:
+            self._db.executescript(
+                "drop table if exists pages; drop table if exists files; "
+                "drop table if exists page_rows;"
+            )
+        self._db.executescript(SCHEMA)
+        self._db.execute(f"pragma user_version = {SCHEMA_VERSION}")
+        # Cancellation token of the running update, None when idle. The index
+        # is shared, so the update may outlive the dialog that started it.
+        self.update_cancelled: threading.Event | None = None
+        # Called once the running update finishes, to start another one
+        self.pending_update: Callable[[], None] | None = None
+
+    @classmethod
+    def for_media_dir(cls, media_dir: str, user_files: Path) -> PdfTextIndex:
+        """Return the shared index of the given media folder."""
+        index = _indexes.get(media_dir)
+        if index is None:
+            digest = hashlib.sha1(media_dir.encode("utf-8")).hexdigest()[:16]
+            index = cls(user_files / "pdf_text" / f"{digest}.sqlite")
+            _indexes[media_dir] = index
+        return index
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def changed_files(
+        self, entries: Mapping[str, PdfEntry]
+    ) -> tuple[list[PdfEntry], list[str]]:
+        """Return the PDFs that need indexing and the indexed names that are gone."""
+        with self._lock:
+            indexed = {
+                name: (size, mtime_ns)
+                for name, size, mtime_ns in self._db.execute("select * from files")
+            }
+        changed = [
+            entry
+            for name, entry in sorted(entries.items())
+            if indexed.get(name) != (entry.size, entry.mtime_ns)
+        ]
+        removed = [name for name in indexed if name not in entries]
+        return changed, removed
+
+    def _delete_pages(self, name: str) -> None:
+        self._db.execute(
+            "delete from pages where rowid in "
+            "(select page_rowid from page_rows where name = ?)",
+            (name,),
+        )
+        self._db.execute("delete from page_rows where name = ?", (name,))
+
+    def remove_files(self, names: list[str]) -> None:
+        with self._lock, self._db:
+            for name in names:
+                self._delete_pages(name)
+                self._db.execute("delete from files where name = ?", (name,))
+
+    def set_file(self, entry: PdfEntry, texts: list[str]) -> None:
+        """Replace the indexed pages of the file."""
+        with self._lock, self._db:
+            if self._db.execute(
+                "select 1 from files where name = ?", (entry.name,)
+            ).fetchone():
+                self._delete_pages(entry.name)
+            for page, text in enumerate(texts, start=1):
+                if not text.strip():
+                    continue
+                cursor = self._db.execute(
+                    "insert into pages (name, page, text) values (?, ?, ?)",
+                    (entry.name, page, text),
+                )
+                self._db.execute(
+                    "insert into page_rows values (?, ?)",
+                    (entry.name, cursor.lastrowid),
+                )
+            self._db.execute(
+                "insert or replace into files values (?, ?, ?)",
+                (entry.name, entry.size, entry.mtime_ns),
+            )
+
+    def update(
+        self,
+        media_dir: str,
+        entries: Mapping[str, PdfEntry],
+        extract: TextExtractor = extract_page_texts,
+        progress: Callable[[int, int], None] | None = None,
+        cancelled: Callable[[], bool] = lambda: False,
+    ) -> bool:
+        """
+        Index the PDFs that changed and drop the ones that are gone.
+        Returns False if cancelled. Safe to call from a background thread.
+        """
+        changed, removed = self.changed_files(entries)
+        self.remove_files(removed)
+        for done, entry in enumerate(changed):
+            if cancelled():
+                return False
+            if progress:
+                progress(done, len(changed))
+            try:
+                texts = extract(os.path.join(media_dir, entry.name))
+            except OSError:
+                texts = None
+            # Unreadable files are recorded too, so they are not retried until
+            # they change
+            self.set_file(entry, texts or [])
+        return True
+
+    def search(self, text: str, limit: int = SEARCH_LIMIT) -> list[TextMatch]:
+        """Return the pages containing all words of the text, best first."""
+        query = build_match_query(text)
+        if not query:
+            return []
+        with self._lock:
+            rows = self._db.execute(
+                "select name, page, snippet(pages, 2, '[', ']', '…', ?) "
+                "from pages where pages match ? order by rank limit ?",
+                (SNIPPET_TOKENS, query, limit),
+            ).fetchall()
+        return [
+            TextMatch(name, page, " ".join(snippet.split()))
+            for name, page, snippet in rows
+        ]
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, TypeVar, cast
+
+# Samples kept per operation for the percentiles and histogram
+ROLLING_WINDOW = 1000
+# Upper bounds of the histogram buckets, in milliseconds; the last one is open
+BUCKET_BOUNDS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+LOG_INTERVAL_SECONDS = 300
+
+F = TypeVar("F", bound=Callable)
+
+
+@dataclass
+class TimingSummary:
+    name: str
+    # Calls since the stats were reset; the other fields only cover the window
+    calls: int
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    max_ms: float
+    buckets: list[int] = field(default_factory=list)
+
+    def format(self) -> str:
+        return (
+            f"{self.name}: {self.calls} calls, mean {self.mean_ms:.1f}ms, "
+            f"p50 {self.p50_ms:.1f}ms, p95 {self.p95_ms:.1f}ms, "
+            f"max {self.max_ms:.1f}ms"
+        )
+
+
+def bucket_labels() -> list[str]:
+    return [f"≤{bound}ms" for bound in BUCKET_BOUNDS_MS] + [
+        f">{BUCKET_BOUNDS_MS[-1]}ms"
+    ]
+
+
+class RollingHistogram:
+    """Durations of the last `window` calls of an operation."""
+
+    def __init__(self, window: int = ROLLING_WINDOW) -> None:
+        self.samples: deque[float] = deque(maxlen=window)
+        self.calls = 0
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self.calls += 1
+
+    def summary(self, name: str) -> TimingSummary:
+        samples_ms = sorted(seconds * 1000 for seconds in self.samples)
+        if not samples_ms:
+            return TimingSummary(name, self.calls, 0, 0, 0, 0)
+        buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        bucket = 0
+        for sample in samples_ms:
+            while bucket < len(BUCKET_BOUNDS_MS) and sample > BUCKET_BOUNDS_MS[bucket]:
+                bucket += 1
+            buckets[bucket] += 1
+
+        def percentile(fraction: float) -> float:
+            return samples_ms[min(len(samples_ms) - 1, int(fraction * len(samples_ms)))]
+
+        return TimingSummary(
+            name,
+            self.calls,
+            sum(samples_ms) / len(samples_ms),
+            percentile(0.5),
+            percentile(0.95),
+            samples_ms[-1],
+            buckets,
+        )
+
+
+class PerfStats:
+    """
+    In-memory timings of the add-on's hot paths.
+
+    Recording does nothing unless `enabled` is set. Summaries of the operations
+    that ran are passed to `on_summary` at most once per `log_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        log_interval: float = LOG_INTERVAL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.enabled = False
+        self.on_summary: Callable[[list[TimingSummary]], None] | None = None
+        self.log_interval = log_interval
+        self.clock = clock
+        self._histograms: dict[str, RollingHistogram] = {}
+        self._unlogged: set[str] = set()
+        self._last_log = clock()
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = RollingHistogram()
+            histogram.add(seconds)
+            self._unlogged.add(name)
+            now = self.clock()
+            if not self.on_summary or now - self._last_log < self.log_interval:
+                return
+            self._last_log = now
+            summaries = [
+                self._histograms[unlogged].summary(unlogged)
+                for unlogged in sorted(self._unlogged)
+            ]
+            self._unlogged.clear()
+        self.on_summary(summaries)
+
+    def summaries(self) -> list[TimingSummary]:
+        with self._lock:
+            return [
+                histogram.summary(name)
+                for name, histogram in sorted(self._histograms.items())
+            ]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._unlogged.clear()
+
+
+stats = PerfStats()
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Record the duration of each call of the decorated function in `stats`."""
+
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):  # type: ignore[no-untyped-def]
+            if not stats.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats.record(name, time.perf_counter() - start)
+
+        return cast(F, wrapper)
+
+    return decorator
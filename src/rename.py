@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import os
+import re
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+from re import Match
+from typing import Callable
+
+from anki.collection import Collection, OpChangesWithCount
+from anki.errors import AnkiException
+from anki.notes import Note, NoteId
+
+from .log import logger
+from .perf import timed
+
+ProgressCallback = Callable[[int, int], None]
+
+# Number of notes loaded and rewritten between progress updates
+RENAME_CHUNK_SIZE = 500
+
+# Characters that are special in the backend's (Rust) regex syntax
+RUST_REGEX_META_CHARS = set("\\.+*?()|[]{}^$#&-~")
+
+
+@dataclass
+class RenameStats:
+    search_seconds: float = 0.0
+    rewrite_seconds: float = 0.0
+    used_backend: bool = False
+
+
+class InvalidMappingLineError(ValueError):
+    def __init__(self, line: str) -> None:
+        super().__init__(f"Missing '=>' in line: {line}")
+        self.line = line
+
+
+def apply_rename_template(template: str, names: Sequence[str]) -> dict[str, str]:
+    """
+    Build an old->new mapping by formatting the template for each name.
+    Supported fields are `{name}` (the old name without extension) and `{n}`
+    (1-based position in `names`, e.g. `{n:03}`). The .pdf extension is added
+    if the result lacks it.
+    """
+    mapping: dict[str, str] = {}
+    for n, old_name in enumerate(names, start=1):
+        stem, _ = os.path.splitext(old_name)
+        new_name = template.format(name=stem, n=n)
+        if not new_name.lower().endswith(".pdf"):
+            new_name += ".pdf"
+        mapping[old_name] = new_name
+    return mapping
+
+
+def parse_rename_mapping(text: str) -> dict[str, str]:
+    """Parse lines of the form `old.pdf => new.pdf`, skipping blank lines."""
+    mapping: dict[str, str] = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        old_name, sep, new_name = line.partition("=>")
+        if not sep:
+            raise InvalidMappingLineError(line)
+        old_name, new_name = old_name.strip(), new_name.strip()
+        if not new_name.lower().endswith(".pdf"):
+            new_name += ".pdf"
+        mapping[old_name] = new_name
+    return mapping
+
+
+def validate_renames(mapping: dict[str, str], media_dir: str) -> list[str]:
+    """Return a list of problems that prevent the renames from being applied."""
+    problems = []
+    targets: set[str] = set()
+    for old_name, new_name in mapping.items():
+        if not new_name or os.sep in new_name or "/" in new_name:
+            problems.append(f"Invalid name: '{new_name}'")
+        elif new_name in targets:
+            problems.append(f"'{new_name}' is used more than once")
+        elif new_name not in mapping and os.path.exists(
+            os.path.join(media_dir, new_name)
+        ):
+            problems.append(f"A file named '{new_name}' already exists")
+        targets.add(new_name)
+        if not os.path.exists(os.path.join(media_dir, old_name)):
+            problems.append(f"'{old_name}' does not exist")
+    return problems
+
+
+def rename_files(mapping: dict[str, str], media_dir: str) -> None:
+    """
+    Rename files on disk, going through temporary names so swaps work.
+    If a rename fails, the ones already done are undone before re-raising.
+    """
+    temp_names = {
+        old_name: f".appendix-rename-{os.getpid()}-{i}.tmp"
+        for i, old_name in enumerate(mapping)
+    }
+    moves = [(old_name, temp_names[old_name]) for old_name in mapping] + [
+        (temp_names[old_name], new_name) for old_name, new_name in mapping.items()
+    ]
+    done: list[tuple[str, str]] = []
+    try:
+        for src, dst in moves:
+            os.rename(os.path.join(media_dir, src), os.path.join(media_dir, dst))
+            done.append((src, dst))
+    except OSError:
+        for src, dst in reversed(done):
+            try:
+                os.rename(os.path.join(media_dir, dst), os.path.join(media_dir, src))
+            except OSError as exc:
+                logger.error("Failed to undo rename of %s: %s", src, exc)
+        raise
+
+
+def build_reference_regex(old_names: Sequence[str]) -> re.Pattern[str]:
+    """
+    Match href/src attributes pointing to any of the names, with an optional
+    page parameter. Longer names come first so that a name that is a prefix of
+    another does not win.
+    """
+    alternatives = "|".join(
+        re.escape(name) for name in sorted(old_names, key=len, reverse=True)
+    )
+    return re.compile(rf"""(href|src)=(["'])({alternatives})(\?page=\d+)?\2""")
+
+
+def rust_regex_escape(text: str) -> str:
+    return "".join(f"\\{c}" if c in RUST_REGEX_META_CHARS else c for c in text)
+
+
+def build_reference_search(old_names: Sequence[str]) -> str:
+    """Build a collection search matching notes that reference any of the names."""
+    alternatives = "|".join(rust_regex_escape(name) for name in old_names)
+    return rf'''"re:(href|src)=[\"']?({alternatives})(\?page=\\d+)?[\"']?"'''
+
+
+def rewrite_references(
+    html: str, regex: re.Pattern[str], mapping: dict[str, str]
+) -> str:
+    def replace(match: Match[str]) -> str:
+        attr, quote, old_name, page_param = match.groups()
+        return f"{attr}={quote}{mapping[old_name]}{page_param or ''}{quote}"
+
+    return regex.sub(replace, html)
+
+
+def rewrite_note(note: Note, regex: re.Pattern[str], mapping: dict[str, str]) -> bool:
+    updated = False
+    for i, field in enumerate(note.fields):
+        new_field = rewrite_references(field, regex, mapping)
+        if new_field != field:
+            note.fields[i] = new_field
+            updated = True
+    return updated
+
+
+def _rewrite_with_backend(
+    col: Collection,
+    note_ids: Sequence[NoteId],
+    old_name: str,
+    new_name: str,
+) -> int:
+    """
+    Rewrite references to a single name with the backend's find and replace,
+    returning the number of notes changed.
+    The backend regex has no backreferences, so each quote style gets its own
+    branch; the groups of the branch that did not match expand to nothing.
+    """
+    name = rust_regex_escape(old_name)
+    escaped_new_name = new_name.replace("$", "$$")
+    return col.find_and_replace(
+        note_ids=note_ids,
+        search=rf"""(href|src)=(?:("){name}(\?page=\d+)?"|('){name}(\?page=\d+)?')""",
+        replacement=f"${{1}}=${{2}}${{4}}{escaped_new_name}${{3}}${{5}}${{2}}${{4}}",
+        regex=True,
+        match_case=True,
+    ).count
+
+
+def _rewrite_in_python(
+    col: Collection,
+    note_ids: Sequence[NoteId],
+    mapping: dict[str, str],
+    progress: ProgressCallback | None,
+) -> int:
+    """Rewrite references in Python, returning the number of notes changed."""
+    regex = build_reference_regex(list(mapping))
+    updated_notes: list[Note] = []
+    for start in range(0, len(note_ids), RENAME_CHUNK_SIZE):
+        if progress:
+            progress(start, len(note_ids))
+        for note_id in note_ids[start : start + RENAME_CHUNK_SIZE]:
+            note = col.get_note(note_id)
+            if rewrite_note(note, regex, mapping):
+                updated_notes.append(note)
+    col.update_notes(updated_notes)
+    return len(updated_notes)
+
+
+@timed("rename.update_notes")
+def update_notes_with_renamed_pdfs(  # noqa: PLR0913
+    col: Collection,
+    mapping: dict[str, str],
+    progress: ProgressCallback | None = None,
+    stats: RenameStats | None = None,
+    *,
+    use_backend: bool = True,
+    note_ids: Sequence[NoteId] | None = None,
+) -> OpChangesWithCount:
+    """
+    Point all references to the old names of `mapping` to the new ones.
+    Affected notes are found with a single search, unless already known from
+    `note_ids`, and saved under one undo entry.
+    A single rename is rewritten by the backend's find and replace, with a
+    Python rewrite as fallback. Batches are rewritten in Python, in one pass
+    that maps every old name at once, so swaps and chains (a→b, b→c) are safe.
+    The returned count is the number of notes changed.
+    """
+    if stats is None:
+        stats = RenameStats()
+    if len(mapping) == 1:
+        ((old_name, new_name),) = mapping.items()
+        undo_label = f"Rename PDF: {old_name} → {new_name}"
+    else:
+        undo_label = f"Rename {len(mapping)} PDFs"
+    undo_entry = col.add_custom_undo_entry(undo_label)
+
+    start_time = time.perf_counter()
+    if note_ids is None:
+        note_ids = col.find_notes(build_reference_search(list(mapping)))
+    stats.search_seconds = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    stats.used_backend = False
+    updated = 0
+    if note_ids and use_backend and len(mapping) == 1:
+        ((old_name, new_name),) = mapping.items()
+        try:
+            updated = _rewrite_with_backend(col, note_ids, old_name, new_name)
+            stats.used_backend = True
+        except AnkiException as exc:
+            logger.warning("Backend find and replace failed, using fallback: %s", exc)
+    if note_ids and not stats.used_backend:
+        updated = _rewrite_in_python(col, note_ids, mapping, progress)
+    stats.rewrite_seconds = time.perf_counter() - start_time
+
+    changes = col.merge_undo_entries(undo_entry)
+    logger.info(
+        "Renamed %d PDF(s) in %d of %d note(s) found: search %.3fs, rewrite %.3fs (%s)",
+        len(mapping),
+        updated,
+        len(note_ids),
+        stats.search_seconds,
+        stats.rewrite_seconds,
+        "backend" if stats.used_backend else "python",
+    )
+    return OpChangesWithCount(changes=changes, count=updated)
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from itertools import count
+from re import Match
+
+from anki.collection import Collection, OpChangesWithCount
+from anki.notes import NoteId
+
+from .appendix_tracker import APPENDIX_TEXT_RE
+from .bulk import ProgressCallback, update_notes_in_chunks
+
+
+def renumber_note_fields(fields: list[str]) -> bool:
+    """
+    Number the appendices of a note 1, 2, 3... in the order they appear, field by
+    field. Anything after the number, like a `(p.N)` suffix, is kept. Returns
+    whether any field changed.
+    """
+    numbers = count(1)
+
+    def replace(match: Match[str]) -> str:
+        return f"🔗Appendix {next(numbers)}"
+
+    changed = False
+    for i, html in enumerate(fields):
+        if "🔗Appendix" not in html:
+            continue
+        new_html = APPENDIX_TEXT_RE.sub(replace, html)
+        if new_html != html:
+            fields[i] = new_html
+            changed = True
+    return changed
+
+
+def renumber_appendices(
+    col: Collection,
+    note_ids: Sequence[NoteId],
+    progress: ProgressCallback | None = None,
+) -> OpChangesWithCount:
+    """Renumber the appendices of the given notes under one undo entry."""
+    return update_notes_in_chunks(
+        col,
+        note_ids,
+        "Renumber Appendices",
+        lambda note: renumber_note_fields(note.fields),
+        progress,
+    )
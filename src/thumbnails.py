@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+# Rendering goes through pdfium, which Qt only runs on one thread at a time, so
+# more workers would mostly wait on each other
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Evict down to this fraction of the cap, so eviction does not run on every add
+EVICT_TO_RATIO = 0.9
+
+# Renders a page of a PDF to PNG data that fits the given size
+PageRenderer = Callable[[str, int, "tuple[int, int]"], "bytes | None"]
+
+# Shared caches, by media folder
+_caches: dict[str, ThumbnailCache] = {}
+_executor: ThreadPoolExecutor | None = None
+
+
+def renderer_available() -> bool:
+    """Return whether Qt's PDF module, which ships with Anki, can be imported."""
+    try:
+        return importlib.util.find_spec("PyQt6.QtPdf") is not None
+    except ImportError:
+        return False
+
+
+def get_thumbnail_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=THUMBNAIL_WORKERS, thread_name_prefix="appendix-thumbnails"
+        )
+    return _executor
+
+
+def render_page_png(path: str, page: int, size: tuple[int, int]) -> bytes | None:
+    """
+    Render a page of the PDF (the first one if out of range) to PNG data fitting
+    within `size`. Returns None if the file cannot be rendered.
+    Safe to call from a background thread.
+    """
+    from aqt.qt import QBuffer, QIODevice, QSize  # noqa: PLC0415
+    from PyQt6.QtPdf import QPdfDocument  # noqa: PLC0415
+
+    document = QPdfDocument(None)
+    try:
+        if document.load(path) != QPdfDocument.Error.None_:
+            return None
+        if not 0 <= page < document.pageCount():
+            page = 0
+        page_size = document.pagePointSize(page)
+        if page_size.width() <= 0 or page_size.height() <= 0:
+            return None
+        width, height = size
+        scale = min(width / page_size.width(), height / page_size.height())
+        image = document.render(
+            page,
+            QSize(
+                max(1, round(page_size.width() * scale)),
+                max(1, round(page_size.height() * scale)),
+            ),
+        )
+        if image.isNull():
+            return None
+        buffer = QBuffer()
+        buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+        image.save(buffer, "PNG")
+        return bytes(buffer.data())
+    finally:
+        document.close()
+
+
+class ThumbnailCache:
+    """
+    Rendered PDF pages stored as PNG files.
+
+    Files are keyed by the PDF's name, size and mtime, so a changed PDF gets new
+    thumbnails. Reading a thumbnail bumps its mtime, and once the cache grows past
+    `max_bytes` the least recently used thumbnails are removed.
+    """
+
+    def __init__(self, path: Path, max_bytes: int = THUMBNAIL_CACHE_MAX_BYTES) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self._total_bytes: int | None = None
+
+    @classmethod
+    def for_media_dir(cls, media_dir: str, user_files: Path) -> ThumbnailCache:
+        """Return the shared cache of the given media folder."""
+        cache = _caches.get(media_dir)
+        if cache is None:
+            digest = hashlib.sha1(media_dir.encode("utf-8")).hexdigest()[:16]
+            cache = cls(user_files / "thumbnails" / digest)
+            _caches[media_dir] = cache
+        return cache
+
+    @staticmethod
+    def key(name: str, stat: os.stat_result, page: int, size: tuple[int, int]) -> str:
+        data = f"{name}\0{stat.st_size}\0{stat.st_mtime_ns}\0{page}\0{size}"
+        return hashlib.sha1(data.encode("utf-8")).hexdigest() + ".png"
+
+    def get(self, key: str) -> Path | None:
+        path = self.path / key
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def add(self, key: str, data: bytes) -> Path:
+        self.path.mkdir(parents=True, exist_ok=True)
+        path = self.path / key
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        with self.lock:
+            try:
+                replaced_bytes = path.stat().st_size
+            except OSError:
+                replaced_bytes = 0
+            os.replace(tmp_path, path)
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._files())
+            else:
+                self._total_bytes += len(data) - replaced_bytes
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+        return path
+
+    def _files(self) -> list[tuple[float, int, str]]:
+        """Return the mtime, size and path of each thumbnail."""
+        files = []
+        with os.scandir(self.path) as it:
+            for entry in it:
+                if not entry.name.endswith(".png"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def _evict(self) -> None:
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * EVICT_TO_RATIO
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self._total_bytes = total
+
+    def thumbnail(
+        self,
+        media_dir: str,
+        name: str,
+        page: int,
+        size: tuple[int, int],
+        render: PageRenderer = render_page_png,
+    ) -> Path | None:
+        """
+        Return the path of a thumbnail of the page of the PDF, rendering it if it
+        is not cached. Safe to call from a background thread.
+        """
+        pdf_path = os.path.join(media_dir, name)
+        try:
+            stat = os.stat(pdf_path)
+        except OSError:
+            return None
+        key = self.key(name, stat, page, size)
+        cached = self.get(key)
+        if cached:
+            return cached
+        data = render(pdf_path, page, size)
+        if data is None:
+            return None
+        return self.add(key, data)
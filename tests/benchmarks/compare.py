@@ -0,0 +1,57 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+    python -m tests.benchmarks.compare old.json new.json [--threshold 1.25]
+
+Exits with status 1 if any benchmark got slower than the threshold ratio.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+
+def load_results(path: Path) -> dict[tuple[str, str], dict[str, Any]]:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return {(result["name"], result["size"]): result for result in data["results"]}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("old", type=Path)
+    parser.add_argument("new", type=Path)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="ratio of new to old time considered a regression",
+    )
+    args = parser.parse_args()
+    old = load_results(args.old)
+    new = load_results(args.new)
+
+    regressions = 0
+    print(f"{'benchmark':<40} {'size':<8} {'old':>10} {'new':>10} {'ratio':>7}")
+    for key in sorted(old.keys() & new.keys()):
+        old_seconds = old[key]["min_seconds"]
+        new_seconds = new[key]["min_seconds"]
+        ratio = new_seconds / old_seconds if old_seconds else float("inf")
+        flag = ""
+        if ratio > args.threshold:
+            regressions += 1
+            flag = "  slower"
+        print(
+            f"{key[0]:<40} {key[1]:<8} {old_seconds * 1000:>8.2f}ms "
+            f"{new_seconds * 1000:>8.2f}ms {ratio:>6.2f}x{flag}"
+        )
+    for key in sorted(new.keys() - old.keys()):
+        print(f"{key[0]:<40} {key[1]:<8} {'new benchmark':>30}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import json
+import os
+import platform
+import time
+import tracemalloc
+import urllib.parse
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable
+
+import pytest
+
+if TYPE_CHECKING:
+    from anki.collection import Collection
+    from anki.notes import NoteId
+
+OUTPUT_ENV = "APPENDIX_BENCHMARK_OUTPUT"
+DEFAULT_OUTPUT = "benchmark-results.json"
+ROUNDS = 5
+
+
+@dataclass(frozen=True)
+class Size:
+    name: str
+    notes: int
+    links_per_note: int
+    pdfs: int
+    notetypes: int
+
+
+SIZES = [
+    Size("small", notes=100, links_per_note=3, pdfs=20, notetypes=5),
+    Size("medium", notes=2_000, links_per_note=5, pdfs=200, notetypes=25),
+    Size("large", notes=20_000, links_per_note=5, pdfs=2_000, notetypes=100),
+]
+
+# Smallest valid-looking PDF; the benchmarks never render it
+PDF_BYTES = (
+    b"%PDF-1.4\n1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n"
+    b"2 0 obj\n<< /Type /Pages /Kids [] /Count 0 >>\nendobj\n%%EOF\n"
+)
+
+
+def pdf_name(number: int) -> str:
+    return f"Lecture notes {number:05}.pdf"
+
+
+@dataclass
+class SyntheticCollection:
+    size: Size
+    col: Collection
+    media_dir: str
+    note_ids: list[NoteId]
+    pdf_names: list[str]
+
+
+def build_collection(path: Path, size: Size) -> SyntheticCollection:
+    """Create a collection whose notes link to PDFs of its media folder."""
+    from anki.collection import AddNoteRequest, Collection  # noqa: PLC0415
+    from anki.decks import DeckId  # noqa: PLC0415
+
+    from src.image_appendix import appendix_link_html  # noqa: PLC0415
+
+    col = Collection(str(path / "collection.anki2"))
+    media_dir = col.media.dir()
+    pdf_names = [pdf_name(i) for i in range(size.pdfs)]
+    for name in pdf_names:
+        with open(os.path.join(media_dir, name), "wb") as f:
+            f.write(PDF_BYTES)
+
+    notetype = col.models.by_name("Basic")
+    assert notetype
+    hrefs = [urllib.parse.quote(name) for name in pdf_names]
+    requests = []
+    for i in range(size.notes):
+        note = col.new_note(notetype)
+        links = [
+            appendix_link_html(
+                f"{hrefs[(i * size.links_per_note + k) % size.pdfs]}?page={k + 1}",
+                k + 1,
+            )
+            for k in range(size.links_per_note)
+        ]
+        note.fields[0] = f"Question {i}<br>" + "<br>".join(links)
+        note.fields[1] = f"Answer {i}"
+        requests.append(AddNoteRequest(note, DeckId(1)))
+    col.add_notes(requests)
+
+    for i in range(size.notetypes - 1):
+        copy = col.models.copy(notetype, add=False)
+        copy["name"] = f"Basic {i}"
+        col.models.add_dict(copy)
+
+    return SyntheticCollection(
+        size, col, media_dir, list(col.find_notes("")), pdf_names
+    )
+
+
+@pytest.fixture(scope="module", params=SIZES, ids=lambda size: size.name)
+def synthetic(
+    request: pytest.FixtureRequest, tmp_path_factory: pytest.TempPathFactory
+) -> Iterator[SyntheticCollection]:
+    size: Size = request.param
+    collection = build_collection(tmp_path_factory.mktemp(size.name), size)
+    yield collection
+    collection.col.close(downgrade=False)
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    size: str
+    rounds: int
+    min_seconds: float
+    mean_seconds: float
+    peak_bytes: int
+
+
+class Benchmark:
+    """Times a function over several rounds and measures its peak memory."""
+
+    def __init__(self, results: list[BenchmarkResult], size: Size) -> None:
+        self.results = results
+        self.size = size
+
+    def __call__(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        setup: Callable[[], Any] | None = None,
+        rounds: int = ROUNDS,
+    ) -> BenchmarkResult:
+        times = []
+        for _ in range(rounds):
+            if setup:
+                setup()
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        # Tracing slows the code down, so memory is measured in a separate run
+        if setup:
+            setup()
+        tracemalloc.start()
+        try:
+            func()
+            _, peak_bytes = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        result = BenchmarkResult(
+            name, self.size.name, rounds, min(times), sum(times) / rounds, peak_bytes
+        )
+        self.results.append(result)
+        return result
+
+
+@pytest.fixture(scope="session")
+def benchmark_results() -> Iterator[list[BenchmarkResult]]:
+    results: list[BenchmarkResult] = []
+    yield results
+    if not results:
+        return
+    from anki.buildinfo import version  # noqa: PLC0415
+
+    output = Path(os.environ.get(OUTPUT_ENV, DEFAULT_OUTPUT))
+    output.write_text(
+        json.dumps(
+            {
+                "created": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "anki": version,
+                "sizes": [asdict(size) for size in SIZES],
+                "results": [asdict(result) for result in results],
+            },
+            indent=2,
+        ),
+        encoding="utf-8",
+    )
+
+
+@pytest.fixture
+def benchmark(
+    benchmark_results: list[BenchmarkResult], synthetic: SyntheticCollection
+) -> Benchmark:
+    return Benchmark(benchmark_results, synthetic.size)
@@ -0,0 +1,119 @@
+"""
+Benchmarks of the add-on's hot paths on synthetic collections of several sizes.
+
+They are slow, so they only run when APPENDIX_BENCHMARKS=1 is set:
+
+    APPENDIX_BENCHMARKS=1 pytest tests/benchmarks
+
+Results are written to benchmark-results.json, or the path in
+APPENDIX_BENCHMARK_OUTPUT, and two runs can be compared with
+`python -m tests.benchmarks.compare old.json new.json`.
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+
+if not os.environ.get("APPENDIX_BENCHMARKS"):
+    pytest.skip("set APPENDIX_BENCHMARKS=1 to run benchmarks", allow_module_level=True)
+pytest.importorskip("anki")
+
+# anki.models cannot be imported before anki.collection
+import anki.collection  # noqa: E402, F401
+from anki.models import NotetypeId  # noqa: E402
+
+from src.appendix_tracker import AppendixTracker  # noqa: E402
+from src.pdf_index import PdfIndex, scan_pdfs  # noqa: E402
+from src.pdf_search import PdfSearchEngine  # noqa: E402
+from src.rename import update_notes_with_renamed_pdfs  # noqa: E402
+
+from .conftest import Benchmark, SyntheticCollection  # noqa: E402
+
+# Notes the appendix number is looked up for, like notes opened in the editor
+APPENDIX_NUMBER_SAMPLE = 500
+SEARCH_QUERIES = ["l", "lecture", "lecture notes 001", "ln01", "missing"]
+SCRIPT_FILENAME = "_appendix-viewer-0123456789abcdef0123456789abcdef01234567.js"
+
+
+def test_next_appendix_number(
+    synthetic: SyntheticCollection, benchmark: Benchmark
+) -> None:
+    col = synthetic.col
+    notes = [col.get_note(nid) for nid in synthetic.note_ids[:APPENDIX_NUMBER_SAMPLE]]
+    tracker = AppendixTracker(max_notes=len(notes))
+
+    def reserve_all() -> None:
+        for note in notes:
+            tracker.reserve(note)
+
+    benchmark("next_appendix_number_cold", reserve_all, setup=tracker.clear)
+    benchmark("next_appendix_number_cached", reserve_all)
+
+
+@pytest.mark.parametrize("use_backend", [True, False], ids=["backend", "python"])
+def test_rename_rewrite(
+    synthetic: SyntheticCollection, benchmark: Benchmark, use_backend: bool
+) -> None:
+    col = synthetic.col
+    old_name = synthetic.pdf_names[0]
+    new_name = f"Renamed {old_name}"
+    names = [old_name, new_name]
+
+    def rename() -> None:
+        update_notes_with_renamed_pdfs(
+            col, {names[0]: names[1]}, use_backend=use_backend
+        )
+        names.reverse()
+
+    benchmark(f"rename_rewrite_{'backend' if use_backend else 'python'}", rename)
+
+
+def test_notetype_assets(synthetic: SyntheticCollection, benchmark: Benchmark) -> None:
+    pytest.importorskip("aqt")
+    from src.gui.notetypes import (  # noqa: PLC0415
+        compute_notetype_changes,
+        update_notetypes,
+    )
+
+    col = synthetic.col
+    notetype_ids = [NotetypeId(entry.id) for entry in col.models.all_names_and_ids()]
+
+    def apply(checked: bool) -> None:
+        changes = compute_notetype_changes(
+            col, [(ntid, checked) for ntid in notetype_ids], SCRIPT_FILENAME
+        )
+        update_notetypes(col, changes.notetypes, "Update Notetypes")
+
+    benchmark("notetype_assets_add", lambda: apply(True), setup=lambda: apply(False))
+    benchmark("notetype_assets_remove", lambda: apply(False), setup=lambda: apply(True))
+
+
+def test_load_pdfs_filtering(
+    synthetic: SyntheticCollection, benchmark: Benchmark, tmp_path: Path
+) -> None:
+    media_dir = synthetic.media_dir
+    index_path = tmp_path / "pdf_index.json"
+    PdfIndex(media_dir, index_path).apply_scan(*scan_pdfs(media_dir))
+
+    benchmark("scan_media_folder", lambda: scan_pdfs(media_dir))
+    benchmark("load_pdf_index", lambda: PdfIndex(media_dir, index_path).names())
+
+    names = PdfIndex(media_dir, index_path).names()
+
+    def search() -> None:
+        engine = PdfSearchEngine(names)
+        for query in SEARCH_QUERIES:
+            engine.search(query)
+
+    def type_query() -> None:
+        # The search box narrows the previous results as the user types
+        engine = PdfSearchEngine(names)
+        query = SEARCH_QUERIES[2]
+        for end in range(1, len(query) + 1):
+            engine.search(query[:end])
+
+    benchmark("search_pdf_names", search)
+    benchmark("search_pdf_names_while_typing", type_query)
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from src.appendix_tracker import AppendixTracker, max_appendix_number_in_field
+
+
+@dataclass
+class FakeNote:
+    id: int
+    fields: list[str] = field(default_factory=list)
+
+
+def link(number: int) -> str:
+    return f'<a href="a.pdf" class="appendix-link">🔗Appendix {number}</a>'
+
+
+def test_max_appendix_number_in_field() -> None:
+    assert max_appendix_number_in_field("") == 0
+    assert max_appendix_number_in_field("🔗Appendix 5") == 0
+    assert max_appendix_number_in_field(link(2) + link(7) + link(3)) == 7
+
+
+def test_next_number_scans_fields() -> None:
+    tracker = AppendixTracker()
+    note = FakeNote(1, [link(1), "text", link(4)])
+    assert tracker.next_number(note) == 5
+    assert tracker.next_number(FakeNote(2, ["", ""])) == 1
+
+
+def test_reserve_before_fields_change() -> None:
+    tracker = AppendixTracker()
+    note = FakeNote(1, [link(2), ""])
+    assert tracker.reserve(note) == 3
+    assert tracker.reserve(note) == 4
+    # The first link lands while the second one is still pending
+    note.fields[1] = link(3)
+    assert tracker.reserve(note) == 5
+    # Removing a link releases the reservations
+    note.fields[1] = ""
+    assert tracker.next_number(note) == 3
+
+
+def test_reservation_survives_unrelated_edits() -> None:
+    tracker = AppendixTracker()
+    note = FakeNote(1, [link(1), ""])
+    assert tracker.reserve(note) == 2
+    note.fields[1] = "typing"
+    assert tracker.next_number(note) == 3
+    # Moving a link to another field removes nothing
+    note.fields = ["", link(1)]
+    assert tracker.next_number(note) == 3
+
+
+def test_next_number_does_not_reserve() -> None:
+    tracker = AppendixTracker()
+    note = FakeNote(1, [link(1)])
+    assert tracker.next_number(note) == 2
+    assert tracker.next_number(note) == 2
+    tracker.mark_used(note, 2)
+    assert tracker.next_number(note) == 3
+
+
+def test_lru_eviction() -> None:
+    tracker = AppendixTracker(max_notes=2)
+    notes = [FakeNote(i, [link(i)]) for i in range(1, 4)]
+    for note in notes:
+        tracker.reserve(note)
+    assert tracker.next_number(notes[2]) == 5
+    assert tracker.next_number(notes[0]) == 2
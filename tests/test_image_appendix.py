@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from typing import Any, cast
+
+import pytest
+
+pytest.importorskip("anki")
+
+from src.image_appendix import (  # noqa: E402
+    appendices_to_images,
+    appendix_link_html,
+    convert_note,
+)
+
+PICS = ["png", "jpg"]
+
+
+class FakeNote:
+    def __init__(self, **fields: str) -> None:
+        self.names = list(fields)
+        self.fields = list(fields.values())
+
+    def keys(self) -> list[str]:
+        return self.names
+
+
+def test_convert_note_numbers_after_existing_appendices() -> None:
+    note = FakeNote(
+        Front=appendix_link_html("a.png", 1) + '<img src="b.png"> <img src="c.png">',
+        Back='<img src="https://example.com/d.png"><img src="e.jpg">',
+    )
+    assert convert_note(cast(Any, note), None, True, PICS)
+    assert note.fields == [
+        appendix_link_html("a.png", 1)
+        + appendix_link_html("b.png", 2)
+        + " "
+        + appendix_link_html("c.png", 3),
+        '<img src="https://example.com/d.png">' + appendix_link_html("e.jpg", 4),
+    ]
+    assert not convert_note(cast(Any, note), None, True, PICS)
+
+
+def test_convert_note_only_converts_the_chosen_field() -> None:
+    note = FakeNote(Front='<img src="a.png">', Back='<img src="b.png">')
+    assert convert_note(cast(Any, note), "Back", True, PICS)
+    assert note.fields == ['<img src="a.png">', appendix_link_html("b.png", 1)]
+
+
+def test_appendices_to_images() -> None:
+    html = appendix_link_html("a.png", 1) + appendix_link_html("b.pdf", 2)
+    assert appendices_to_images(html, PICS) == '<img src="a.png">' + (
+        appendix_link_html("b.pdf", 2)
+    )
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import zlib
+from pathlib import Path
+from typing import Any, cast
+
+from src.integrity import (
+    PROBLEM_MISSING_FILE,
+    PROBLEM_PAGE_OUT_OF_RANGE,
+    PROBLEM_UNUSED_PDF,
+    IntegrityChecker,
+    iter_appendix_links,
+)
+from src.pdf_meta import PdfMetadataCache, read_page_count
+
+from .test_media_refs import FakeCollection
+
+
+def make_pdf(pages: int) -> bytes:
+    return (
+        b"%PDF-1.4\n1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n"
+        b"2 0 obj\n<< /Kids [3 0 R] /Resources << /Font << >> >> "
+        b"/Type /Pages /Count " + str(pages).encode() + b" >>\nendobj\n"
+        b"3 0 obj\n<< /Type /Page /Parent 2 0 R >>\nendobj\n%%EOF\n"
+    )
+
+
+def appendix(href: str) -> str:
+    return f'<a href="{href}" class="appendix-link">🔗Appendix 1</a>'
+
+
+def test_read_page_count(tmp_path: Path) -> None:
+    path = tmp_path / "a.pdf"
+    path.write_bytes(make_pdf(12))
+    assert read_page_count(str(path)) == 12
+
+    stream = zlib.compress(b"2 0 << /Type /Pages /Kids [3 0 R] /Count 7 >>")
+    path.write_bytes(
+        b"%PDF-1.5\n4 0 obj\n<< /Type /ObjStm /Filter /FlateDecode >>\nstream\n"
+        + stream
+        + b"\nendstream\nendobj\n"
+    )
+    assert read_page_count(str(path)) == 7
+
+    path.write_bytes(b"not a pdf")
+    assert read_page_count(str(path)) is None
+
+
+def test_pdf_metadata_cache(tmp_path: Path) -> None:
+    (tmp_path / "a.pdf").write_bytes(make_pdf(3))
+    cache = PdfMetadataCache(str(tmp_path), tmp_path / "cache" / "metadata.json")
+    assert cache.page_count("a.pdf") == 3
+    assert cache.get("missing.pdf") is None
+    cache.save()
+    reloaded = PdfMetadataCache(str(tmp_path), tmp_path / "cache" / "metadata.json")
+    assert "a.pdf" in reloaded.entries
+    assert reloaded.page_count("a.pdf") == 3
+    assert not reloaded.dirty
+
+
+def test_iter_appendix_links() -> None:
+    html = appendix("a%20b.pdf?page=4") + appendix("c.png") + '<a href="x.pdf">x</a>'
+    assert list(iter_appendix_links(html)) == [("a b.pdf", 4), ("c.png", None)]
+
+
+def test_checker_reports_problems(tmp_path: Path) -> None:
+    (tmp_path / "a.pdf").write_bytes(make_pdf(3))
+    (tmp_path / "unused.pdf").write_bytes(make_pdf(1))
+    (tmp_path / "plain.pdf").write_bytes(make_pdf(1))
+    col = FakeCollection()
+    col.set_note(1, 0, appendix("a.pdf?page=2"), appendix("a.pdf?page=5"))
+    col.set_note(2, 0, appendix("gone.pdf"))
+    col.set_note(3, 0, '<a href="plain.pdf">plain</a>')
+    col.set_note(4, 0, "no links")
+    cache = PdfMetadataCache(str(tmp_path), tmp_path / "metadata.json")
+    checker = IntegrityChecker(
+        str(tmp_path), ["a.pdf", "plain.pdf", "unused.pdf"], cache
+    )
+    issues: list[Any] = []
+    assert checker.run(cast(Any, col), issues.extend)
+    assert [(i.problem, i.file, i.note_id, i.field_ord) for i in issues] == [
+        (PROBLEM_PAGE_OUT_OF_RANGE, "a.pdf", 1, 1),
+        (PROBLEM_MISSING_FILE, "gone.pdf", 2, 0),
+        (PROBLEM_UNUSED_PDF, "unused.pdf", None, None),
+    ]
+    assert checker.checked_notes == 3
+    assert not checker.run(cast(Any, col), issues.extend, lambda: True)
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+from typing import Any, cast
+
+from src.media_refs import MediaRefIndex, extract_references
+
+
+class FakeDB:
+    def __init__(self) -> None:
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute(
+            "create table notes (id integer primary key, mod int, usn int, flds text)"
+        )
+        self.conn.execute("create index ix_notes_usn on notes (usn)")
+
+    def all(self, sql: str, *args: Any) -> list[Any]:
+        return self.conn.execute(sql, args).fetchall()
+
+    def list(self, sql: str, *args: Any) -> list[Any]:
+        return [row[0] for row in self.all(sql, *args)]
+
+
+class FakeCollection:
+    def __init__(self) -> None:
+        self.db = FakeDB()
+
+    def set_note(self, nid: int, mod: int, *fields: str, usn: int = -1) -> None:
+        self.db.conn.execute(
+            "insert or replace into notes values (?, ?, ?, ?)",
+            (nid, mod, usn, "\x1f".join(fields)),
+        )
+
+
+def link(name: str) -> str:
+    return f'<a href="{name}?page=2" class="appendix-link">🔗Appendix 1</a>'
+
+
+def test_extract_references() -> None:
+    html = (
+        link("a%20b.pdf")
+        + "<img src='c.png'><a href=\"https://example.com/d.pdf\">x</a>"
+    )
+    assert extract_references(html) == {"a b.pdf", "c.png"}
+    assert extract_references("no links") == set()
+
+
+def test_catch_up_indexes_changes(tmp_path: Path) -> None:
+    col = FakeCollection()
+    col.set_note(1, 100, link("a.pdf"), link("b.pdf"))
+    col.set_note(2, 100, "plain", link("a.pdf"))
+    index = MediaRefIndex(tmp_path / "refs.sqlite")
+    assert index.catch_up(cast(Any, col)) == 2
+    assert index.notes_referencing(["a.pdf"]) == [1, 2]
+    assert index.usages("b.pdf") == [(1, 1)]
+    assert index.usage_counts(["a.pdf", "x.pdf"]) == {"a.pdf": 2, "x.pdf": 0}
+
+    col.set_note(2, 200, "plain", "unlinked")
+    assert index.catch_up(cast(Any, col)) == 1
+    assert index.notes_referencing(["a.pdf"]) == [1]
+
+
+def test_full_catch_up_finds_restored_and_deleted_notes(tmp_path: Path) -> None:
+    col = FakeCollection()
+    col.set_note(1, 200, link("a.pdf"))
+    col.set_note(2, 200, link("b.pdf"))
+    index = MediaRefIndex(tmp_path / "refs.sqlite")
+    index.catch_up(cast(Any, col))
+
+    # An undo restores the note's old modification time
+    col.set_note(1, 100, link("c.pdf"))
+    col.db.conn.execute("delete from notes where id = 2")
+    assert index.catch_up(cast(Any, col)) == 0
+    assert index.catch_up(cast(Any, col), full=True) == 1
+    assert index.notes_referencing(["c.pdf"]) == [1]
+    assert index.notes_referencing(["a.pdf", "b.pdf"]) == []
+
+    reopened = MediaRefIndex(tmp_path / "refs.sqlite")
+    assert reopened.built
+    assert reopened.usage_counts() == {"c.pdf": 1}
+
+
+def test_catch_up_finds_notes_from_the_same_second(tmp_path: Path) -> None:
+    col = FakeCollection()
+    col.set_note(1, 100, link("a.pdf"))
+    index = MediaRefIndex(tmp_path / "refs.sqlite")
+    index.catch_up(cast(Any, col))
+    col.set_note(2, 100, link("a.pdf"))
+    assert index.catch_up(cast(Any, col)) == 1
+    assert index.notes_referencing(["a.pdf"]) == [1, 2]
+    assert index.catch_up(cast(Any, col)) == 0
+
+
+def test_catch_up_finds_synced_notes(tmp_path: Path) -> None:
+    col = FakeCollection()
+    col.set_note(1, 100, link("a.pdf"), usn=5)
+    index = MediaRefIndex(tmp_path / "refs.sqlite")
+    index.catch_up(cast(Any, col))
+    # Arrives from a sync with an older modification time
+    col.set_note(2, 50, link("a.pdf"), usn=6)
+    assert index.catch_up(cast(Any, col)) == 1
+    assert index.notes_referencing(["a.pdf"]) == [1, 2]
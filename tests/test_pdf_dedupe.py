@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from src.pdf_dedupe import DuplicateFinder, find_duplicate_groups
+from src.pdf_index import PdfIndex
+
+
+def make_media(tmp_path: Path) -> tuple[Path, PdfIndex]:
+    media_dir = tmp_path / "media"
+    media_dir.mkdir()
+    (media_dir / "lecture.pdf").write_bytes(b"lecture")
+    (media_dir / "other.pdf").write_bytes(b"another")
+    (media_dir / "lecture copy.pdf").write_bytes(b"lecture")
+    os.utime(media_dir / "lecture copy.pdf", ns=(2_000_000_000, 2_000_000_000))
+    os.utime(media_dir / "lecture.pdf", ns=(1_000_000_000, 1_000_000_000))
+    index = PdfIndex(str(media_dir), tmp_path / "index.json")
+    index.refresh()
+    return media_dir, index
+
+
+def test_duplicate_finder(tmp_path: Path) -> None:
+    media_dir, index = make_media(tmp_path)
+    source = tmp_path / "new.pdf"
+    source.write_bytes(b"another")
+    finder = DuplicateFinder(str(media_dir), index.snapshot())
+    assert finder.find(str(source)) == "other.pdf"
+    source.write_bytes(b"unique!")
+    assert finder.find(str(source)) is None
+    source.write_bytes(b"x")
+    assert finder.find(str(source)) is None
+
+    index.set_hashes(finder.hashed)
+    assert all(entry.sha1 for entry in index.entries.values())
+    # Hashes survive a rescan of unchanged files
+    index.dir_mtime = 0
+    assert not index.refresh()
+    assert all(entry.sha1 for entry in index.entries.values())
+
+
+def test_find_duplicate_groups(tmp_path: Path) -> None:
+    media_dir, index = make_media(tmp_path)
+    groups, hashed = find_duplicate_groups(str(media_dir), index.snapshot())
+    assert [[entry.name for entry in group] for group in groups] == [
+        ["lecture.pdf", "lecture copy.pdf"]
+    ]
+    assert len(hashed) == 3
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from src.pdf_import import ImportResult, PdfImporter, find_conflicts, plan_import
+
+
+def test_import_copies_files(tmp_path: Path) -> None:
+    source_dir = tmp_path / "source"
+    media_dir = tmp_path / "media"
+    source_dir.mkdir()
+    media_dir.mkdir()
+    paths = []
+    for i in range(5):
+        path = source_dir / f"{i}.pdf"
+        path.write_bytes(bytes([i]) * 1000)
+        paths.append(str(path))
+    (media_dir / "0.pdf").write_bytes(b"old")
+
+    jobs = plan_import([*paths, paths[0], str(source_dir / "missing.pdf")])
+    assert [job.filename for job in jobs] == [f"{i}.pdf" for i in range(5)]
+    assert [job.filename for job in find_conflicts(jobs, str(media_dir))] == ["0.pdf"]
+
+    seen: list[ImportResult] = []
+    results = PdfImporter(str(media_dir), max_workers=2).run(jobs, seen.append)
+    assert len(results) == len(seen) == 5
+    assert all(result.error is None for result in results)
+    assert (media_dir / "0.pdf").read_bytes() == bytes([0]) * 1000
+    assert sorted(p.name for p in media_dir.iterdir()) == [f"{i}.pdf" for i in range(5)]
+
+
+def test_cancelled_import_leaves_no_files(tmp_path: Path) -> None:
+    source = tmp_path / "a.pdf"
+    source.write_bytes(b"a")
+    media_dir = tmp_path / "media"
+    media_dir.mkdir()
+    importer = PdfImporter(str(media_dir))
+    importer.cancel()
+    assert importer.run(plan_import([str(source)])) == []
+    assert list(media_dir.iterdir()) == []
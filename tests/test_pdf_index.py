@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from src.pdf_index import PdfIndex, get_dir_mtime
+
+
+def make_index(tmp_path: Path) -> tuple[Path, PdfIndex]:
+    media_dir = tmp_path / "collection.media"
+    media_dir.mkdir()
+    return media_dir, PdfIndex(str(media_dir), tmp_path / "index.json")
+
+
+def test_refresh_lists_pdfs(tmp_path: Path) -> None:
+    media_dir, index = make_index(tmp_path)
+    (media_dir / "b.PDF").write_bytes(b"b")
+    (media_dir / "a.pdf").write_bytes(b"aa")
+    (media_dir / "c.png").write_bytes(b"c")
+    assert index.refresh()
+    assert index.names() == ["a.pdf", "b.PDF"]
+    assert index.entries["a.pdf"].size == 2
+    assert not index.is_stale()
+    assert not index.refresh()
+
+
+def test_index_is_persisted(tmp_path: Path) -> None:
+    media_dir, index = make_index(tmp_path)
+    (media_dir / "a.pdf").write_bytes(b"a")
+    index.refresh()
+    reloaded = PdfIndex(str(media_dir), tmp_path / "index.json")
+    assert reloaded.names() == ["a.pdf"]
+    assert not reloaded.is_stale()
+
+
+def test_update_in_place(tmp_path: Path) -> None:
+    media_dir, index = make_index(tmp_path)
+    (media_dir / "a.pdf").write_bytes(b"a")
+    index.refresh()
+    dir_mtime = get_dir_mtime(str(media_dir))
+    os.rename(media_dir / "a.pdf", media_dir / "b.pdf")
+    (media_dir / "c.pdf").write_bytes(b"c")
+    index.update_files(["a.pdf", "b.pdf", "c.pdf"], dir_mtime)
+    assert index.names() == ["b.pdf", "c.pdf"]
+    assert not index.is_stale()
+    assert not PdfIndex(str(media_dir), tmp_path / "index.json").is_stale()
+
+
+def test_update_in_place_keeps_other_changes_stale(tmp_path: Path) -> None:
+    media_dir, index = make_index(tmp_path)
+    index.refresh()
+    # Added by something else, e.g. a sync
+    (media_dir / "synced.pdf").write_bytes(b"s")
+    os.utime(media_dir, ns=(1, 1))
+    dir_mtime = get_dir_mtime(str(media_dir))
+    (media_dir / "a.pdf").write_bytes(b"a")
+    index.update_files(["a.pdf"], dir_mtime)
+    assert index.names() == ["a.pdf"]
+    assert index.is_stale()
+    assert index.refresh()
+    assert index.names() == ["a.pdf", "synced.pdf"]
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import struct
+import zlib
+from pathlib import Path
+
+import pytest
+
+from src.pdf_meta import OutlineItem, PdfMetadata, read_pdf_metadata
+
+
+def build_pdf(objects: list[bytes], trailer: bytes) -> bytes:
+    """Build a PDF with a cross-reference table from the bodies of objects 1..n."""
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n%s\nendobj\n" % (num, body)
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    data += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n%s\nstartxref\n%d\n%%%%EOF\n" % (trailer, xref)
+    return data
+
+
+def outlined_pdf_objects() -> list[bytes]:
+    return [
+        b"<< /Type /Catalog /Pages 2 0 R /Outlines 6 0 R /Names << /Dests 10 0 R >> >>",
+        b"<< /Type /Pages /Kids [3 0 R 4 0 R] /Count 3 >>",
+        b"<< /Type /Page /Parent 2 0 R >>",
+        b"<< /Type /Pages /Parent 2 0 R /Kids [5 0 R 11 0 R] /Count 2 >>",
+        b"<< /Type /Page /Parent 4 0 R >>",
+        b"<< /Type /Outlines /First 7 0 R /Last 9 0 R /Count 3 >>",
+        b"<< /Title (Intro \\(part 1\\)) /Parent 6 0 R /Next 9 0 R /First 8 0 R "
+        b"/Dest [3 0 R /Fit] >>",
+        b"<< /Title <FEFF00C9007400E9> /Parent 7 0 R "
+        b"/A << /S /GoTo /D [11 0 R /XYZ 0 0 0] >> >>",
+        b"<< /Title (Named) /Parent 6 0 R /Dest (chapter2) >>",
+        b"<< /Names [(chapter2) << /D [5 0 R /Fit] >>] >>",
+        b"<< /Type /Page /Parent 4 0 R >>",
+        b"<< /Title (Example\\040Deck) >>",
+    ]
+
+
+EXPECTED_OUTLINE = [
+    OutlineItem("Intro (part 1)", 1, 0),
+    OutlineItem("Été", 3, 1),
+    OutlineItem("Named", 2, 0),
+]
+
+
+def test_read_metadata_from_xref_table(tmp_path: Path) -> None:
+    path = tmp_path / "a.pdf"
+    path.write_bytes(
+        build_pdf(outlined_pdf_objects(), b"<< /Size 13 /Root 1 0 R /Info 12 0 R >>")
+    )
+    metadata = read_pdf_metadata(str(path))
+    assert metadata == PdfMetadata(3, "Example Deck", EXPECTED_OUTLINE)
+    assert PdfMetadata.from_json(metadata.to_json()) == metadata
+
+
+# A wrong /Size must not make the reader loop past the end of the xref data
+@pytest.mark.parametrize("size", [15, 10**12])
+def test_read_metadata_from_object_streams(tmp_path: Path, size: int) -> None:
+    objects = outlined_pdf_objects()
+    # Objects 2-12 go into object stream 13, and the xref stream is object 14
+    offsets = []
+    body = b""
+    for obj in objects[1:]:
+        offsets.append(len(body))
+        body += obj + b"\n"
+    header = b" ".join(
+        b"%d %d" % (num, offset) for num, offset in enumerate(offsets, 2)
+    )
+    stream = zlib.compress(header + b"\n" + body)
+    data = b"%PDF-1.5\n"
+    catalog_offset = len(data)
+    data += b"1 0 obj\n" + objects[0] + b"\nendobj\n"
+    objstm_offset = len(data)
+    data += (
+        b"13 0 obj\n<< /Type /ObjStm /N 11 /First %d /Filter /FlateDecode "
+        b"/Length %d >>\nstream\n"
+        % (len(header) + 1, len(stream))
+        + stream
+        + b"\nendstream\nendobj\n"
+    )
+    xref_offset = len(data)
+    rows = [(0, 0, 0), (1, catalog_offset, 0)]
+    rows += [(2, 13, index) for index in range(11)]
+    rows += [(1, objstm_offset, 0), (1, xref_offset, 0)]
+    # Encode the rows with the PNG Up predictor, as most writers do
+    raw = b""
+    previous = bytes(7)
+    for row in rows:
+        packed = struct.pack(">BIH", *row)
+        raw += b"\x02" + bytes((a - b) & 0xFF for a, b in zip(packed, previous))
+        previous = packed
+    xref = zlib.compress(raw)
+    data += (
+        b"14 0 obj\n<< /Type /XRef /Size %d /W [1 4 2] /Root 1 0 R /Info 12 0 R "
+        b"/Filter /FlateDecode /DecodeParms << /Columns 7 /Predictor 12 >> "
+        b"/Length %d >>\nstream\n"
+        % (size, len(xref))
+        + xref
+        + b"\nendstream\nendobj\nstartxref\n%d\n%%%%EOF\n" % xref_offset
+    )
+    path = tmp_path / "a.pdf"
+    path.write_bytes(data)
+    assert read_pdf_metadata(str(path)) == PdfMetadata(
+        3, "Example Deck", EXPECTED_OUTLINE
+    )
+
+
+def test_broken_xref_falls_back_to_page_count(tmp_path: Path) -> None:
+    path = tmp_path / "a.pdf"
+    path.write_bytes(
+        b"%PDF-1.4\n1 0 obj\n<< /Type /Pages /Count 5 >>\nendobj\n"
+        b"startxref\n999\n%%EOF\n"
+    )
+    assert read_pdf_metadata(str(path)) == PdfMetadata(5)
+
+    path.write_bytes(b"")
+    assert read_pdf_metadata(str(path)) is None
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from src.pdf_search import PdfSearchEngine
+
+NAMES = [
+    "Anatomy Chapter 1.pdf",
+    "chapter-2 physiology.pdf",
+    "Biochem.pdf",
+    "my_chapter_3.pdf",
+    "Cardiology handout.pdf",
+]
+
+
+def search(engine: PdfSearchEngine, query: str) -> list[str]:
+    return [engine.names[i] for i in engine.search(query)]
+
+
+def test_empty_query_returns_everything() -> None:
+    engine = PdfSearchEngine(NAMES)
+    assert search(engine, "") == NAMES
+
+
+def test_substring_matches_are_ranked() -> None:
+    engine = PdfSearchEngine(NAMES)
+    assert search(engine, "chap")[:3] == [
+        "chapter-2 physiology.pdf",
+        "my_chapter_3.pdf",
+        "Anatomy Chapter 1.pdf",
+    ]
+
+
+def test_fuzzy_matches_come_last() -> None:
+    engine = PdfSearchEngine(NAMES)
+    results = search(engine, "chy")
+    assert results[-1] == "chapter-2 physiology.pdf"
+    assert "Biochem.pdf" not in results
+    assert search(engine, "bchm") == ["Biochem.pdf"]
+
+
+def test_narrowing_matches_full_search() -> None:
+    engine = PdfSearchEngine(NAMES)
+    narrowed = [search(engine, query) for query in ("c", "ca", "car", "card")]
+    fresh = [
+        search(PdfSearchEngine(NAMES), query) for query in ("c", "ca", "car", "card")
+    ]
+    assert narrowed == fresh
+    assert narrowed[-1][0] == "Cardiology handout.pdf"
+    # Deleting characters searches all names again
+    assert search(engine, "c") == fresh[0]
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from src.pdf_index import PdfEntry
+from src.pdf_text_index import PdfTextIndex, TextMatch, build_match_query
+
+TEXTS = {
+    "anatomy.pdf": ["Intro", "The femur is the longest bone", ""],
+    "physiology.pdf": ["Cardiac output", "Bone remodeling and calcium"],
+}
+
+
+def test_build_match_query() -> None:
+    assert build_match_query('long "bone') == '"long" "bone"*'
+    assert build_match_query("  ") == ""
+
+
+def test_update_and_search(tmp_path: Path) -> None:
+    index = PdfTextIndex(tmp_path / "text.sqlite")
+    extracted: list[str] = []
+
+    def extract(path: str) -> list[str] | None:
+        name = os.path.basename(path)
+        extracted.append(name)
+        return TEXTS.get(name)
+
+    entries = {
+        "anatomy.pdf": PdfEntry("anatomy.pdf", 10, 1),
+        "physiology.pdf": PdfEntry("physiology.pdf", 20, 1),
+        "broken.pdf": PdfEntry("broken.pdf", 5, 1),
+    }
+    assert index.update("media", entries, extract)
+    assert sorted(extracted) == ["anatomy.pdf", "broken.pdf", "physiology.pdf"]
+    assert index.search("femur long") == [
+        TextMatch("anatomy.pdf", 2, "The [femur] is the [longest] bone")
+    ]
+    assert {(m.name, m.page) for m in index.search("bone")} == {
+        ("anatomy.pdf", 2),
+        ("physiology.pdf", 2),
+    }
+
+    # Only changed files are extracted again, and removed ones are dropped
+    extracted.clear()
+    entries["anatomy.pdf"] = PdfEntry("anatomy.pdf", 11, 2)
+    del entries["physiology.pdf"]
+    assert index.update("media", entries, extract)
+    assert extracted == ["anatomy.pdf"]
+    assert [m.name for m in index.search("bone")] == ["anatomy.pdf"]
+
+    entries["new.pdf"] = PdfEntry("new.pdf", 1, 1)
+    assert not index.update("media", entries, extract, cancelled=lambda: True)
+    assert index.changed_files(entries) == ([entries["new.pdf"]], [])
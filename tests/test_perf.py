@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from src.perf import PerfStats, RollingHistogram, TimingSummary, stats, timed
+
+
+def test_rolling_histogram_summary() -> None:
+    histogram = RollingHistogram(window=100)
+    for ms in range(1, 201):
+        histogram.add(ms / 1000)
+    summary = histogram.summary("op")
+    # Only the last 100 calls are summarized
+    assert summary.calls == 200
+    assert summary.max_ms == 200
+    assert summary.p50_ms == 151
+    assert summary.p95_ms == 196
+    assert sum(summary.buckets) == 100
+    assert summary.buckets[5] == 100
+
+    empty = RollingHistogram().summary("empty")
+    assert (empty.calls, empty.max_ms) == (0, 0)
+
+
+def test_summaries_are_logged_periodically() -> None:
+    now = 0.0
+    perf_stats = PerfStats(log_interval=60, clock=lambda: now)
+    logged: list[list[TimingSummary]] = []
+    perf_stats.on_summary = logged.append
+    perf_stats.record("a", 0.01)
+    now = 30
+    perf_stats.record("b", 0.02)
+    assert not logged
+    now = 61
+    perf_stats.record("a", 0.03)
+    assert [[s.name for s in summaries] for summaries in logged] == [["a", "b"]]
+    now = 200
+    perf_stats.record("a", 0.01)
+    assert [s.name for s in logged[-1]] == ["a"]
+    assert logged[-1][0].calls == 3
+
+    perf_stats.reset()
+    assert perf_stats.summaries() == []
+
+
+def test_timed_only_records_when_enabled() -> None:
+    @timed("test.double")
+    def double(x: int) -> int:
+        return 2 * x
+
+    stats.reset()
+    assert double(2) == 4
+    assert stats.summaries() == []
+    stats.enabled = True
+    try:
+        assert double(3) == 6
+    finally:
+        stats.enabled = False
+    assert [(s.name, s.calls) for s in stats.summaries()] == [("test.double", 1)]
+    stats.reset()
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import re
+from collections.abc import Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("anki")
+
+from anki.collection import OpChangesWithCount  # noqa: E402
+
+from src.rename import (  # noqa: E402
+    apply_rename_template,
+    build_reference_regex,
+    parse_rename_mapping,
+    rename_files,
+    rewrite_references,
+    rust_regex_escape,
+    update_notes_with_renamed_pdfs,
+)
+
+
+@dataclass
+class FakeNote:
+    id: int
+    fields: list[str]
+
+
+class FakeCollection:
+    """Just enough of a collection for the rename rewrite paths."""
+
+    def __init__(self, fields: list[str]) -> None:
+        self.notes = {i: FakeNote(i, [field]) for i, field in enumerate(fields)}
+
+    def add_custom_undo_entry(self, name: str) -> int:
+        return 1
+
+    def merge_undo_entries(self, target: int) -> None:
+        return None
+
+    def find_notes(self, query: str) -> list[int]:
+        return list(self.notes)
+
+    def get_note(self, note_id: int) -> FakeNote:
+        note = self.notes[note_id]
+        return FakeNote(note.id, list(note.fields))
+
+    def update_notes(self, notes: list[FakeNote]) -> None:
+        for note in notes:
+            self.notes[note.id] = note
+
+    def find_and_replace(  # noqa: PLR0913
+        self,
+        *,
+        note_ids: Sequence[int],
+        search: str,
+        replacement: str,
+        regex: bool,
+        match_case: bool,
+    ) -> OpChangesWithCount:
+        # The backend's ${n} and $$ replacement syntax, in Python's
+        python_replacement = re.sub(
+            r"\$\{(\d+)\}|\$\$",
+            lambda m: rf"\g<{m[1]}>" if m[1] else "$",
+            replacement,
+        )
+        count = 0
+        for note_id in note_ids:
+            note = self.notes[note_id]
+            new_fields = [
+                re.sub(search, python_replacement, field) for field in note.fields
+            ]
+            if new_fields != note.fields:
+                note.fields = new_fields
+                count += 1
+        return OpChangesWithCount(changes=None, count=count)
+
+    def fields(self) -> list[str]:
+        return [note.fields[0] for note in self.notes.values()]
+
+
+def test_apply_rename_template() -> None:
+    assert apply_rename_template("{n:02} {name}", ["a.pdf", "b.pdf"]) == {
+        "a.pdf": "01 a.pdf",
+        "b.pdf": "02 b.pdf",
+    }
+
+
+def test_parse_rename_mapping() -> None:
+    assert parse_rename_mapping("a.pdf => x\n\nb.pdf=>y.pdf") == {
+        "a.pdf": "x.pdf",
+        "b.pdf": "y.pdf",
+    }
+
+
+def test_rewrite_references() -> None:
+    mapping = {"a.pdf": "x.pdf", "ab.pdf": "y.pdf"}
+    regex = build_reference_regex(list(mapping))
+    html = (
+        '<a href="a.pdf?page=3" class="appendix-link">🔗Appendix 1'
+        '<img src="a.pdf" style="display: none;"></a>'
+        "<a href='ab.pdf'>x</a><a href=\"c.pdf\">y</a>"
+    )
+    assert rewrite_references(html, regex, mapping) == (
+        '<a href="x.pdf?page=3" class="appendix-link">🔗Appendix 1'
+        '<img src="x.pdf" style="display: none;"></a>'
+        "<a href='y.pdf'>x</a><a href=\"c.pdf\">y</a>"
+    )
+
+
+def test_rust_regex_escape() -> None:
+    assert rust_regex_escape("a (1).pdf") == r"a \(1\)\.pdf"
+    assert rust_regex_escape("a-b_c$.pdf") == r"a\-b_c\$\.pdf"
+
+
+@pytest.mark.parametrize("use_backend", [True, False], ids=["backend", "python"])
+def test_update_notes_with_renamed_pdfs(use_backend: bool) -> None:
+    col = FakeCollection(
+        [
+            "<a href=\"a.pdf?page=2\">x</a><img src='a.pdf'>",
+            "<a href=a.pdf>unquoted</a>",
+            '<a href="b.pdf">y</a>',
+        ]
+    )
+    changes = update_notes_with_renamed_pdfs(
+        col,  # type: ignore[arg-type]
+        {"a.pdf": "c $1.pdf"},
+        use_backend=use_backend,
+    )
+    assert changes.count == 1
+    assert col.fields() == [
+        "<a href=\"c $1.pdf?page=2\">x</a><img src='c $1.pdf'>",
+        "<a href=a.pdf>unquoted</a>",
+        '<a href="b.pdf">y</a>',
+    ]
+
+
+@pytest.mark.parametrize("use_backend", [True, False], ids=["backend", "python"])
+def test_update_notes_with_swapped_pdfs(use_backend: bool) -> None:
+    col = FakeCollection(['<a href="a.pdf">x</a>', '<a href="b.pdf">y</a>'])
+    changes = update_notes_with_renamed_pdfs(
+        col,  # type: ignore[arg-type]
+        {"a.pdf": "b.pdf", "b.pdf": "a.pdf"},
+        use_backend=use_backend,
+    )
+    assert changes.count == 2
+    assert col.fields() == ['<a href="b.pdf">x</a>', '<a href="a.pdf">y</a>']
+
+
+@pytest.mark.parametrize("use_backend", [True, False], ids=["backend", "python"])
+def test_update_notes_with_chained_pdfs(use_backend: bool) -> None:
+    col = FakeCollection(['<a href="a.pdf">x</a><a href="b.pdf">y</a>'])
+    changes = update_notes_with_renamed_pdfs(
+        col,  # type: ignore[arg-type]
+        {"a.pdf": "b.pdf", "b.pdf": "c.pdf"},
+        use_backend=use_backend,
+    )
+    assert changes.count == 1
+    assert col.fields() == ['<a href="b.pdf">x</a><a href="c.pdf">y</a>']
+
+
+def test_rename_files_swaps(tmp_path: Path) -> None:
+    (tmp_path / "a.pdf").write_bytes(b"a")
+    (tmp_path / "b.pdf").write_bytes(b"b")
+    rename_files({"a.pdf": "b.pdf", "b.pdf": "a.pdf"}, str(tmp_path))
+    assert (tmp_path / "a.pdf").read_bytes() == b"b"
+    assert (tmp_path / "b.pdf").read_bytes() == b"a"
+
+
+def test_rename_files_rolls_back_on_failure(tmp_path: Path) -> None:
+    (tmp_path / "a.pdf").write_bytes(b"a")
+    (tmp_path / "b.pdf").write_bytes(b"b")
+    # Renaming onto an existing directory fails after the first file moved
+    (tmp_path / "y.pdf").mkdir()
+    (tmp_path / "y.pdf" / "keep").write_bytes(b"")
+    with pytest.raises(OSError):
+        rename_files({"a.pdf": "x.pdf", "b.pdf": "y.pdf"}, str(tmp_path))
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "a.pdf",
+        "b.pdf",
+        "y.pdf",
+    ]
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("anki")
+
+from src.renumber import renumber_note_fields  # noqa: E402
+
+
+def link(number: int, suffix: str = "") -> str:
+    return f'<a href="a.pdf" class="appendix-link">🔗Appendix {number}{suffix}</a>'
+
+
+def test_renumber_note_fields() -> None:
+    fields = [
+        link(4) + " text " + link(7, " (p.3)"),
+        "no appendices",
+        link(1),
+    ]
+    assert renumber_note_fields(fields)
+    assert fields == [
+        link(1) + " text " + link(2, " (p.3)"),
+        "no appendices",
+        link(3),
+    ]
+    assert not renumber_note_fields(fields)
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from src.thumbnails import ThumbnailCache
+
+
+def test_thumbnails_are_cached_by_file_state(tmp_path: Path) -> None:
+    media = tmp_path / "media"
+    media.mkdir()
+    (media / "a.pdf").write_bytes(b"%PDF-1.4")
+    cache = ThumbnailCache(tmp_path / "thumbnails")
+    renders: list[tuple[str, int, tuple[int, int]]] = []
+
+    def render(path: str, page: int, size: tuple[int, int]) -> bytes:
+        renders.append((os.path.basename(path), page, size))
+        return b"png"
+
+    first = cache.thumbnail(str(media), "a.pdf", 0, (64, 80), render)
+    assert first and first.read_bytes() == b"png"
+    assert cache.thumbnail(str(media), "a.pdf", 0, (64, 80), render) == first
+    assert len(renders) == 1
+
+    cache.thumbnail(str(media), "a.pdf", 2, (64, 80), render)
+    (media / "a.pdf").write_bytes(b"%PDF-1.4 changed")
+    assert cache.thumbnail(str(media), "a.pdf", 0, (64, 80), render) != first
+    assert [page for _, page, _ in renders] == [0, 2, 0]
+
+    assert cache.thumbnail(str(media), "missing.pdf", 0, (64, 80), render) is None
+    assert cache.thumbnail(str(media), "a.pdf", 1, (64, 80), lambda *_: None) is None
+
+
+def test_least_recently_used_thumbnails_are_evicted(tmp_path: Path) -> None:
+    cache = ThumbnailCache(tmp_path, max_bytes=250)
+    paths = [cache.add(f"{i}.png", b"x" * 100) for i in range(2)]
+    os.utime(paths[0], (1, 1))
+    os.utime(paths[1], (2, 2))
+    # Reading the older thumbnail makes the other one the least recently used
+    assert cache.get("0.png") == paths[0]
+    cache.add("2.png", b"x" * 100)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["0.png", "2.png"]
+    assert cache.get("1.png") is None
+
+
+def test_overwriting_a_thumbnail_does_not_grow_the_total(tmp_path: Path) -> None:
+    cache = ThumbnailCache(tmp_path, max_bytes=1000)
+    cache.add("0.png", b"x" * 100)
+    for _ in range(3):
+        cache.add("1.png", b"x" * 100)
+    assert cache._total_bytes == 200
@@ -1,7 +1,16 @@
+import type { DocumentCache } from "./document-cache";
+import type { MobilePDFViewer } from "./pdf-viewer";
+
 export {};
 
 declare global {
     interface Window {
         lightbox: { [name: string]: any };
+        appendixDocumentCache?: DocumentCache;
+        appendixScripts?: { [src: string]: Promise<void> };
+        appendixViewer?: { processLinks: () => void };
+        appendixPdfViewer?: MobilePDFViewer;
+        // Set by the lazily loaded PDF viewer script
+        AppendixPdfViewer?: { MobilePDFViewer: typeof MobilePDFViewer };
     }
 }
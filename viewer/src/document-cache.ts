@@ -0,0 +1,72 @@
+const MIB = 1024 * 1024;
+
+export interface DocumentLoad {
+    promise: Promise<any>;
+    destroy: () => unknown;
+}
+
+interface CachedDocument extends DocumentLoad {
+    // Size of the PDF file, once known
+    bytes: number;
+}
+
+/**
+ * LRU of loaded PDF documents keyed by URL, so links to the same file on
+ * different cards do not fetch and parse it again. Documents are evicted
+ * oldest first once there are too many or they are too large in total, but
+ * the most recently used one is always kept.
+ */
+export class DocumentCache {
+    private documents = new Map<string, CachedDocument>();
+    private maxDocuments: number;
+    private maxBytes: number;
+
+    constructor(maxDocuments = 4, maxBytes = 128 * MIB) {
+        this.maxDocuments = maxDocuments;
+        this.maxBytes = maxBytes;
+    }
+
+    get(url: string, load: (url: string) => DocumentLoad): Promise<any> {
+        let cached = this.documents.get(url);
+        if (cached) {
+            // Move to the most recently used end
+            this.documents.delete(url);
+        } else {
+            cached = { ...load(url), bytes: 0 };
+            const entry = cached;
+            entry.promise.then(
+                async (doc) => {
+                    const info = await doc.getDownloadInfo();
+                    entry.bytes = info.length;
+                    this.evict();
+                },
+                () => {
+                    // Let a retry load the document again
+                    if (this.documents.get(url) === entry) {
+                        this.documents.delete(url);
+                    }
+                },
+            );
+        }
+        this.documents.set(url, cached);
+        this.evict();
+        return cached.promise;
+    }
+
+    private totalBytes(): number {
+        let total = 0;
+        this.documents.forEach((doc) => (total += doc.bytes));
+        return total;
+    }
+
+    private evict() {
+        while (
+            this.documents.size > 1
+            && (this.documents.size > this.maxDocuments || this.totalBytes() > this.maxBytes)
+        ) {
+            const [oldestUrl, oldest] = this.documents.entries().next().value!;
+            this.documents.delete(oldestUrl);
+            oldest.destroy();
+        }
+    }
+}
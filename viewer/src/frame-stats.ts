@@ -0,0 +1,78 @@
+const SAMPLE_SIZE = 60;
+const UPDATE_INTERVAL_MS = 500;
+
+// Debug mode is enabled with localStorage.setItem("appendixViewerDebug", "1")
+export function isDebugEnabled(): boolean {
+    try {
+        return window.localStorage.getItem("appendixViewerDebug") === "1";
+    } catch {
+        return false;
+    }
+}
+
+function average(values: number[]): number {
+    return values.length ? values.reduce((a, b) => a + b, 0) / values.length : 0;
+}
+
+/**
+ * Debug counter showing the average frame time while the viewer is open, and
+ * the time taken by the last page renders.
+ */
+export class FrameStats {
+    private element: HTMLElement;
+    private frameTimes: number[] = [];
+    private renderTimes: number[] = [];
+    private lastFrame = 0;
+    private lastUpdate = 0;
+    private frameHandle: number | null = null;
+
+    constructor(parent: HTMLElement) {
+        this.element = document.createElement("div");
+        this.element.className = "pdf-debug";
+        parent.appendChild(this.element);
+    }
+
+    start() {
+        if (this.frameHandle !== null) return;
+        this.lastFrame = 0;
+        const onFrame = (time: number) => {
+            if (this.lastFrame) {
+                this.push(this.frameTimes, time - this.lastFrame);
+            }
+            this.lastFrame = time;
+            if (time - this.lastUpdate > UPDATE_INTERVAL_MS) {
+                this.lastUpdate = time;
+                this.update();
+            }
+            this.frameHandle = window.requestAnimationFrame(onFrame);
+        };
+        this.frameHandle = window.requestAnimationFrame(onFrame);
+    }
+
+    stop() {
+        if (this.frameHandle !== null) {
+            window.cancelAnimationFrame(this.frameHandle);
+            this.frameHandle = null;
+        }
+    }
+
+    recordRender(ms: number) {
+        this.push(this.renderTimes, ms);
+        this.update();
+    }
+
+    private push(values: number[], value: number) {
+        values.push(value);
+        if (values.length > SAMPLE_SIZE) {
+            values.shift();
+        }
+    }
+
+    private update() {
+        const frameTime = average(this.frameTimes);
+        const fps = frameTime ? Math.round(1000 / frameTime) : 0;
+        const lastRender = this.renderTimes[this.renderTimes.length - 1] ?? 0;
+        this.element.textContent = `frame ${frameTime.toFixed(1)}ms (${fps} fps) · `
+            + `render ${lastRender.toFixed(0)}ms, avg ${average(this.renderTimes).toFixed(0)}ms`;
+    }
+}
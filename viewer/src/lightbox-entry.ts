@@ -0,0 +1,2 @@
+import "lightbox2/dist/css/lightbox.min.css";
+import "lightbox2/dist/js/lightbox-plus-jquery.min.js";
@@ -1,25 +1,53 @@
-import "lightbox2/dist/css/lightbox.min.css";
-import "lightbox2/dist/js/lightbox-plus-jquery.min.js";
-import { MobilePDFViewer } from "./pdf-viewer";
-import "./style.css";
+// Small card script: pdf.js and lightbox are only loaded when a card needs them.
+// The add-on replaces these names with the content-hashed names of the media files.
+const PDF_VIEWER_SCRIPT = "_appendix-pdf-viewer.js";
+const LIGHTBOX_SCRIPT = "_appendix-lightbox.js";
 
-// Create the PDF viewer instance
-const pdfViewer = new MobilePDFViewer();
-
-// Process appendix links
-document.querySelectorAll<HTMLAnchorElement>(".appendix-link").forEach((el) => {
-    if (el.classList.contains("processed")) {
-        return;
+// Kept on the window so a script is only loaded once, even though this runs on every card
+function loadScript(src: string): Promise<void> {
+    const scripts = (window.appendixScripts ??= {});
+    if (!scripts[src]) {
+        scripts[src] = new Promise<void>((resolve, reject) => {
+            const script = document.createElement("script");
+            script.src = src;
+            script.onload = () => resolve();
+            script.onerror = () => {
+                delete scripts[src];
+                reject(new Error(`Failed to load ${src}`));
+            };
+            document.head.appendChild(script);
+        });
     }
+    return scripts[src];
+}
+
+async function openPdf(url: string) {
+    await loadScript(PDF_VIEWER_SCRIPT);
+    window.AppendixPdfViewer!.MobilePDFViewer.getInstance().open(url);
+}
+
+// Set up the links of the current card; links that were already set up are skipped
+function processLinks() {
+    document.querySelectorAll<HTMLAnchorElement>(".appendix-link:not(.processed)").forEach(processLink);
+}
+
+function processLink(el: HTMLAnchorElement) {
     const url = new URL(el.href);
     if (url.pathname.endsWith(".pdf")) {
         el.addEventListener("click", (e) => {
             e.preventDefault();
-            pdfViewer.open(el.href);
+            openPdf(el.href).catch((error) => console.error("Error opening PDF:", error));
         });
     } else {
         el.dataset.lightbox = "image";
         el.dataset.title = el.textContent!!;
+        loadScript(LIGHTBOX_SCRIPT).catch((error) => console.error("Error loading lightbox:", error));
     }
     el.classList.add("processed");
-});
+}
+
+// This script runs again on every card, but the runtime is only set up once per webview
+if (!window.appendixViewer) {
+    window.appendixViewer = { processLinks };
+}
+window.appendixViewer.processLinks();
@@ -0,0 +1,111 @@
+export interface RenderedPage {
+    canvas: HTMLCanvasElement;
+    // Size of the page in CSS pixels
+    width: number;
+    height: number;
+}
+
+const BYTES_PER_PIXEL = 4;
+const MIB = 1024 * 1024;
+
+// Budget for rendered pages, based on the device memory when the browser reports it
+export function defaultPageCacheBudget(): number {
+    // navigator.deviceMemory is in GiB and is only available in Chromium-based browsers
+    const deviceMemory = (navigator as Navigator & { deviceMemory?: number }).deviceMemory ?? 2;
+    return Math.min(128, Math.max(24, deviceMemory * 16)) * MIB;
+}
+
+function pageBytes(page: RenderedPage): number {
+    return page.canvas.width * page.canvas.height * BYTES_PER_PIXEL;
+}
+
+function releasePage(page: RenderedPage) {
+    // Shrinking the canvas frees its backing store right away on iOS
+    page.canvas.width = 0;
+    page.canvas.height = 0;
+}
+
+/**
+ * LRU of pages rendered at one scale and rotation, bounded by memory use.
+ * Renders of the same page are shared, so a page being prerendered is not
+ * rendered again when it is requested.
+ */
+export class PageCache {
+    private pages = new Map<number, RenderedPage>();
+    private pending = new Map<number, Promise<RenderedPage>>();
+    private bytes = 0;
+    private key = "";
+    private maxBytes: number;
+
+    constructor(maxBytes = defaultPageCacheBudget()) {
+        this.maxBytes = maxBytes;
+    }
+
+    // Set the render settings the pages are for, dropping pages rendered with others
+    setKey(key: string) {
+        if (key !== this.key) {
+            this.clear();
+            this.key = key;
+        }
+    }
+
+    has(num: number): boolean {
+        return this.pages.has(num) || this.pending.has(num);
+    }
+
+    get(num: number, render: () => Promise<RenderedPage>): Promise<RenderedPage> {
+        const cached = this.pages.get(num);
+        if (cached) {
+            // Move to the most recently used end
+            this.pages.delete(num);
+            this.pages.set(num, cached);
+            return Promise.resolve(cached);
+        }
+        let promise = this.pending.get(num);
+        if (!promise) {
+            const key = this.key;
+            const rendering: Promise<RenderedPage> = render().then(
+                (page) => {
+                    if (this.pending.get(num) === rendering) {
+                        this.pending.delete(num);
+                        if (this.key === key) {
+                            this.add(num, page);
+                        }
+                    }
+                    return page;
+                },
+                (error) => {
+                    if (this.pending.get(num) === rendering) {
+                        this.pending.delete(num);
+                    }
+                    throw error;
+                },
+            );
+            this.pending.set(num, rendering);
+            promise = rendering;
+        }
+        return promise;
+    }
+
+    private add(num: number, page: RenderedPage) {
+        const size = pageBytes(page);
+        if (size > this.maxBytes) {
+            return;
+        }
+        while (this.bytes + size > this.maxBytes && this.pages.size > 0) {
+            const [oldestNum, oldest] = this.pages.entries().next().value!;
+            this.pages.delete(oldestNum);
+            this.bytes -= pageBytes(oldest);
+            releasePage(oldest);
+        }
+        this.pages.set(num, page);
+        this.bytes += size;
+    }
+
+    clear() {
+        this.pages.forEach(releasePage);
+        this.pages.clear();
+        this.pending.clear();
+        this.bytes = 0;
+    }
+}
@@ -0,0 +1,3 @@
+import "./style.css";
+
+export { MobilePDFViewer } from "./pdf-viewer";
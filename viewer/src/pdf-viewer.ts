@@ -1,5 +1,8 @@
 import * as pdfjsLib from "pdfjs-dist";
 import pdfjsWorker from "pdfjs-dist/build/pdf.worker.min.js?url";
+import { DocumentCache } from "./document-cache";
+import { FrameStats, isDebugEnabled } from "./frame-stats";
+import { PageCache, RenderedPage } from "./page-cache";
 
 // Type declaration for Promise.withResolvers polyfill
 interface PromiseWithResolvers<T> {
@@ -30,16 +33,32 @@ if (!Promise.withResolvers) {
 // Configure PDF.js worker
 pdfjsLib.GlobalWorkerOptions.workerSrc = pdfjsWorker;
 
+// Re-render at the final scale once wheel/pinch zooming pauses for this long
+const GESTURE_IDLE_MS = 150;
+
+// Kept on the window so documents survive the card script running again on the next card
+function getDocumentCache(): DocumentCache {
+    if (!window.appendixDocumentCache) {
+        window.appendixDocumentCache = new DocumentCache();
+    }
+    return window.appendixDocumentCache;
+}
+
 export class MobilePDFViewer {
     private overlay!: HTMLElement;
     private container!: HTMLElement;
     private canvas!: HTMLCanvasElement;
     private ctx!: CanvasRenderingContext2D;
     private pdfDoc: any = null;
+    private pdfUrl = "";
     private pageNum = 1;
     private pageRendering = false;
     private pageNumPending: number | null = null;
     private scale = 1.0;
+    // Scale of the page on the canvas; it is scaled with CSS until re-rendered
+    private renderedScale = 1.0;
+    private gestureRenderTimer: number | null = null;
+    private frameStats: FrameStats | null = null;
     private initialScale = 1.0;
     private rotation = 0;
     private lastTouchDistance = 0;
@@ -52,13 +71,35 @@ export class MobilePDFViewer {
     private pageInfo!: HTMLElement;
     private loadingIndicator!: HTMLElement;
     private errorMessage!: HTMLElement;
+    private pageCache = new PageCache();
+    private prerenderHandle: number | null = null;
 
-    constructor() {
+    private constructor() {
         this.createOverlay();
         this.setupEventListeners();
     }
 
+    // Return the viewer of this webview, creating it on first use
+    static getInstance(): MobilePDFViewer {
+        const viewer = window.appendixPdfViewer;
+        if (viewer) {
+            viewer.attachOverlay();
+            return viewer;
+        }
+        return (window.appendixPdfViewer = new MobilePDFViewer());
+    }
+
+    // Put the overlay back if the page content was replaced
+    private attachOverlay() {
+        if (!this.overlay.isConnected) {
+            document.body.appendChild(this.overlay);
+        }
+    }
+
     private createOverlay() {
+        // Overlay left by an older version of the script
+        document.getElementById("appendix-pdf-overlay")?.remove();
+
         this.overlay = document.createElement("div");
         this.overlay.id = "appendix-pdf-overlay";
         this.overlay.className = "pdf-overlay";
@@ -112,6 +153,10 @@ export class MobilePDFViewer {
         this.overlay.appendChild(this.container);
         this.overlay.appendChild(this.controls);
 
+        if (isDebugEnabled()) {
+            this.frameStats = new FrameStats(this.overlay);
+        }
+
         document.body.appendChild(this.overlay);
     }
 
@@ -180,8 +225,7 @@ export class MobilePDFViewer {
             const distance = this.getTouchDistance(e.touches);
             if (this.lastTouchDistance > 0) {
                 const ratio = distance / this.lastTouchDistance;
-                this.scale = Math.max(0.5, Math.min(5, this.scale * ratio));
-                this.renderPage(this.pageNum);
+                this.zoomDuringGesture(this.scale * ratio);
             }
             this.lastTouchDistance = distance;
         } else if (e.touches.length === 1 && this.isPanning) {
@@ -193,6 +237,10 @@ export class MobilePDFViewer {
     }
 
     private handleTouchEnd(e: TouchEvent) {
+        if (e.touches.length < 2 && this.lastTouchDistance > 0) {
+            // Pinch ended
+            this.finishGestureZoom();
+        }
         if (e.touches.length === 0) {
             this.isPanning = false;
             this.lastTouchDistance = 0;
@@ -202,8 +250,27 @@ export class MobilePDFViewer {
     private handleWheel(e: WheelEvent) {
         e.preventDefault();
         const zoomFactor = e.deltaY > 0 ? 0.9 : 1.1;
-        this.scale = Math.max(0.5, Math.min(5, this.scale * zoomFactor));
-        this.renderPage(this.pageNum);
+        this.zoomDuringGesture(this.scale * zoomFactor);
+    }
+
+    // Scale the current rendering with CSS, and only re-render once the gesture pauses
+    private zoomDuringGesture(scale: number) {
+        this.scale = Math.max(0.5, Math.min(5, scale));
+        this.updateCanvasTransform();
+        if (this.gestureRenderTimer !== null) {
+            window.clearTimeout(this.gestureRenderTimer);
+        }
+        this.gestureRenderTimer = window.setTimeout(() => this.finishGestureZoom(), GESTURE_IDLE_MS);
+    }
+
+    private finishGestureZoom() {
+        if (this.gestureRenderTimer !== null) {
+            window.clearTimeout(this.gestureRenderTimer);
+            this.gestureRenderTimer = null;
+        }
+        if (this.pdfDoc && this.scale !== this.renderedScale) {
+            this.renderPage(this.pageNum);
+        }
     }
 
     private handleMouseDown(e: MouseEvent) {
@@ -262,8 +329,9 @@ export class MobilePDFViewer {
     }
 
     private updateCanvasTransform() {
-        this.canvas.style.transform =
-            `translate(${this.panCurrentX}px, ${this.panCurrentY}px) rotate(${this.rotation}deg)`;
+        const gestureScale = this.scale / this.renderedScale;
+        this.canvas.style.transform = `translate(${this.panCurrentX}px, ${this.panCurrentY}px) `
+            + `rotate(${this.rotation}deg) scale(${gestureScale})`;
     }
 
     private parsePageFromUrl(url: string): number {
@@ -303,8 +371,11 @@ export class MobilePDFViewer {
             const requestedPage = this.parsePageFromUrl(url);
             const cleanUrl = this.getCleanPdfUrl(url);
 
-            const loadingTask = pdfjsLib.getDocument(cleanUrl);
-            this.pdfDoc = await loadingTask.promise;
+            this.pdfDoc = await getDocumentCache().get(cleanUrl, (url) => {
+                const loadingTask = pdfjsLib.getDocument(url);
+                return { promise: loadingTask.promise, destroy: () => loadingTask.destroy() };
+            });
+            this.pdfUrl = cleanUrl;
 
             // Validate and set the starting page
             const maxPages = this.pdfDoc.numPages;
@@ -313,12 +384,14 @@ export class MobilePDFViewer {
             // Calculate initial scale using actual PDF dimensions
             this.scale = await this.calculateInitialScaleWithPdf();
             this.initialScale = this.scale;
+            this.renderedScale = this.scale;
             this.rotation = 0;
             this.panCurrentX = 0;
             this.panCurrentY = 0;
 
             this.renderPage(this.pageNum);
             this.hideLoading();
+            this.frameStats?.start();
         } catch (error) {
             console.error("Error loading PDF:", error);
             this.showError();
@@ -432,6 +505,49 @@ export class MobilePDFViewer {
         }
     }
 
+    // Key of the settings rendered pages depend on
+    private renderKey(): string {
+        return `${this.pdfUrl}:${this.scale}:${this.rotation}:${window.devicePixelRatio || 1}`;
+    }
+
+    private async renderPageToCanvas(num: number): Promise<RenderedPage> {
+        const page = await this.pdfDoc.getPage(num);
+        const viewport = page.getViewport({ scale: this.scale, rotation: this.rotation });
+        // For high-DPI displays (like iOS), render more pixels for better quality
+        const devicePixelRatio = window.devicePixelRatio || 1;
+        const canvas = document.createElement("canvas");
+        canvas.width = Math.floor(viewport.width * devicePixelRatio);
+        canvas.height = Math.floor(viewport.height * devicePixelRatio);
+        const ctx = canvas.getContext("2d")!;
+        if (devicePixelRatio > 1) {
+            ctx.scale(devicePixelRatio, devicePixelRatio);
+        }
+        await page.render({ canvasContext: ctx, viewport: viewport }).promise;
+        return { canvas, width: viewport.width, height: viewport.height };
+    }
+
+    private showRenderedPage(rendered: RenderedPage) {
+        this.canvas.width = rendered.canvas.width;
+        this.canvas.height = rendered.canvas.height;
+        this.canvas.style.width = rendered.width + "px";
+        this.canvas.style.height = rendered.height + "px";
+
+        // For mobile devices, ensure canvas takes up significant screen space
+        if (window.innerWidth < 768) {
+            const minWidth = window.innerWidth * 0.95;
+            const minHeight = (window.innerHeight - 80) * 0.95; // Account for controls
+
+            if (rendered.width < minWidth) {
+                this.canvas.style.width = minWidth + "px";
+            }
+            if (rendered.height < minHeight) {
+                this.canvas.style.height = minHeight + "px";
+            }
+        }
+
+        this.ctx.drawImage(rendered.canvas, 0, 0);
+    }
+
     private async renderPage(num: number) {
         if (this.pageRendering) {
             this.pageNumPending = num;
@@ -439,48 +555,21 @@ export class MobilePDFViewer {
         }
 
         this.pageRendering = true;
+        const scale = this.scale;
+        const startTime = performance.now();
 
         try {
-            const page = await this.pdfDoc.getPage(num);
-            const viewport = page.getViewport({ scale: this.scale, rotation: this.rotation });
-
-            // Set canvas dimensions to match viewport
-            this.canvas.height = viewport.height;
-            this.canvas.width = viewport.width;
-
-            // For mobile devices, ensure canvas takes up significant screen space
-            if (window.innerWidth < 768) {
-                const minWidth = window.innerWidth * 0.95;
-                const minHeight = (window.innerHeight - 80) * 0.95; // Account for controls
-
-                if (viewport.width < minWidth) {
-                    this.canvas.style.width = minWidth + "px";
-                }
-                if (viewport.height < minHeight) {
-                    this.canvas.style.height = minHeight + "px";
-                }
+            // Zooming or rotating drops the pages rendered with the old settings
+            this.pageCache.setKey(this.renderKey());
+            let rendered = await this.pageCache.get(num, () => this.renderPageToCanvas(num));
+            if (rendered.canvas.width === 0) {
+                // Evicted while we were waiting for it
+                rendered = await this.renderPageToCanvas(num);
             }
-
-            // For high-DPI displays (like iOS), scale the canvas for better quality
-            const devicePixelRatio = window.devicePixelRatio || 1;
-            if (devicePixelRatio > 1) {
-                if (!this.canvas.style.width) {
-                    this.canvas.style.width = viewport.width + "px";
-                }
-                if (!this.canvas.style.height) {
-                    this.canvas.style.height = viewport.height + "px";
-                }
-                this.canvas.width = viewport.width * devicePixelRatio;
-                this.canvas.height = viewport.height * devicePixelRatio;
-                this.ctx.scale(devicePixelRatio, devicePixelRatio);
-            }
-
-            const renderContext = {
-                canvasContext: this.ctx,
-                viewport: viewport,
-            };
-
-            await page.render(renderContext).promise;
+            this.showRenderedPage(rendered);
+            this.renderedScale = scale;
+            this.updateCanvasTransform();
+            this.frameStats?.recordRender(performance.now() - startTime);
 
             this.pageRendering = false;
 
@@ -490,12 +579,49 @@ export class MobilePDFViewer {
             }
 
             this.updatePageInfo();
+            this.schedulePrerender();
         } catch (error) {
             console.error("Error rendering page:", error);
             this.pageRendering = false;
         }
     }
 
+    private schedulePrerender() {
+        this.cancelPrerender();
+        const run = () => {
+            this.prerenderHandle = null;
+            this.prerenderAdjacentPages();
+        };
+        this.prerenderHandle = window.requestIdleCallback
+            ? window.requestIdleCallback(run, { timeout: 1000 })
+            : window.setTimeout(run, 200);
+    }
+
+    private cancelPrerender() {
+        if (this.prerenderHandle === null) return;
+        if (window.cancelIdleCallback) {
+            window.cancelIdleCallback(this.prerenderHandle);
+        } else {
+            window.clearTimeout(this.prerenderHandle);
+        }
+        this.prerenderHandle = null;
+    }
+
+    // Render the pages before and after the current one, so turning pages is instant
+    private async prerenderAdjacentPages() {
+        const pdfDoc = this.pdfDoc;
+        const key = this.renderKey();
+        for (const num of [this.pageNum + 1, this.pageNum - 1]) {
+            if (!pdfDoc || pdfDoc !== this.pdfDoc || key !== this.renderKey()) return;
+            if (num < 1 || num > pdfDoc.numPages || this.pageCache.has(num)) continue;
+            try {
+                await this.pageCache.get(num, () => this.renderPageToCanvas(num));
+            } catch (error) {
+                console.warn("Error prerendering page:", error);
+            }
+        }
+    }
+
     private updatePageInfo() {
         this.pageInfo.textContent = `${this.pageNum} / ${this.pdfDoc.numPages}`;
     }
@@ -514,11 +640,13 @@ export class MobilePDFViewer {
 
     private zoomIn() {
         this.scale = Math.min(5, this.scale * 1.2);
+        this.updateCanvasTransform();
         this.renderPage(this.pageNum);
     }
 
     private zoomOut() {
         this.scale = Math.max(0.5, this.scale / 1.2);
+        this.updateCanvasTransform();
         this.renderPage(this.pageNum);
     }
 
@@ -538,9 +666,16 @@ export class MobilePDFViewer {
 
     private close() {
         this.overlay.classList.remove("active");
+        this.cancelPrerender();
+        this.frameStats?.stop();
+        if (this.gestureRenderTimer !== null) {
+            window.clearTimeout(this.gestureRenderTimer);
+            this.gestureRenderTimer = null;
+        }
         this.pdfDoc = null;
         this.pageNum = 1;
         this.scale = 1.0;
+        this.renderedScale = 1.0;
         this.rotation = 0;
         this.panCurrentX = 0;
         this.panCurrentY = 0;
@@ -1,20 +1,45 @@
 import { defineConfig } from "vite";
 import cssInjectedByJsPlugin from "vite-plugin-css-injected-by-js";
 
-export default defineConfig({
-    plugins: [cssInjectedByJsPlugin()],
-    build: {
-        lib: {
-            entry: "src/main.ts",
-            name: "AppendixViewer",
-            fileName: (format) => `appendix-viewer.js`,
-            formats: ["umd"],
-        },
-        rollupOptions: {
-            external: ["jquery"],
-            output: {
-                globals: { jquery: "$" },
+// Each script is built separately (`vite build --mode <name>`), as UMD bundles
+// can't be split. The card script loads the others on demand.
+const scripts = {
+    "card": {
+        entry: "src/main.ts",
+        name: "AppendixViewer",
+        fileName: "_appendix-viewer.js",
+    },
+    "pdf-viewer": {
+        entry: "src/pdf-viewer-entry.ts",
+        name: "AppendixPdfViewer",
+        fileName: "_appendix-pdf-viewer.js",
+    },
+    "lightbox": {
+        entry: "src/lightbox-entry.ts",
+        name: "AppendixLightbox",
+        fileName: "_appendix-lightbox.js",
+    },
+};
+
+export default defineConfig(({ mode }) => {
+    const script = scripts[mode] ?? scripts.card;
+    return {
+        plugins: [cssInjectedByJsPlugin()],
+        build: {
+            // The card script is built first
+            emptyOutDir: script === scripts.card,
+            lib: {
+                entry: script.entry,
+                name: script.name,
+                fileName: () => script.fileName,
+                formats: ["umd"],
+            },
+            rollupOptions: {
+                external: ["jquery"],
+                output: {
+                    globals: { jquery: "$" },
+                },
             },
         },
-    },
+    };
 });